@@ -3,32 +3,31 @@ PDF Toolkit Web Application
 A Flask-based web application for various PDF operations
 """
 
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, g, request, send_file, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 import os
+import hashlib
+import json
+import mimetypes
 import uuid
 from datetime import datetime, timedelta
 import threading
 import time
-from io import BytesIO
 from dotenv import load_dotenv
 
 # Load .env file
 load_dotenv()
 
 # Import utility modules
-from utils.pdf_converter import (
-    pdf_to_word, pdf_to_text, pdf_to_images,
-    word_to_pdf, text_to_pdf, images_to_pdf,
-    extract_images_from_pdf, reverse_pdf, merge_pdfs,
-    split_pdf, compress_pdf, rotate_pdf, add_watermark, remove_pages,
-    pdf_to_powerpoint, 
-    add_page_numbers, repair_pdf
-)
+from utils.pdf_converter import RENDER_FORMATS
+from utils.operations import ALLOWED_EXTENSIONS, ParamError, get_operation, list_operations
+from utils import admission, compression, metrics, ocr_cache, progress, render, singleflight, uploads, watchdog
 
 # Import Azure storage utility
 from utils.azure_storage import get_azure_storage
+from utils.executor import JobLimitError, run_conversion
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
@@ -39,6 +38,16 @@ app.config['OUTPUT_FOLDER'] = 'outputs'
 # Enable CORS for API endpoints
 CORS(app)
 
+# Behind reverse proxies, take the client address (used for fair scheduling) from
+# X-Forwarded-For; set to the number of proxies in front of the app
+PROXY_COUNT = int(os.getenv('PROXY_COUNT', '0'))
+if PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_COUNT, x_proto=PROXY_COUNT)
+
+# Progress event streams hold a request open for as long as they run, which only gevent
+# workers can afford; under sync workers clients poll /api/progress/<job_id> instead
+PROGRESS_STREAM = os.getenv('SERVER_MODE', 'sync').lower() == 'async'
+
 # Initialize Azure storage if enabled
 USE_AZURE = os.getenv('USE_AZURE_STORAGE', 'false').lower() == 'true'
 azure_storage = get_azure_storage() if USE_AZURE else None
@@ -47,15 +56,6 @@ azure_storage = get_azure_storage() if USE_AZURE else None
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
-# Allowed file extensions
-ALLOWED_EXTENSIONS = {
-    'pdf': ['pdf'],
-    'word': ['doc', 'docx'],
-    'text': ['txt'],
-    'image': ['png', 'jpg', 'jpeg', 'bmp', 'gif', 'tiff', 'tif', 'webp', 'svg', 'ico']
-}
-
-
 def allowed_file(filename, file_type):
     """Check if file extension is allowed"""
     return '.' in filename and \
@@ -108,16 +108,19 @@ def save_output_file_to_storage(local_filepath, unique_id):
             app.logger.error(f"Failed to upload output to Azure: {str(e)}")
             # Return local path if Azure fails
             return filename, None
-    
-    # Delete local file after successfully uploading to Azure
-    try:
-        if os.path.exists(local_filepath):
-            os.remove(local_filepath)
-            app.logger.info(f"Deleted local temp file: {local_filepath}")
-    except Exception as e:
-        app.logger.warning(f"Failed to delete temp file: {str(e)}")
-    
-    return filename, blob_name if USE_AZURE else None
+
+        # Delete local file after successfully uploading to Azure
+        try:
+            if os.path.exists(local_filepath):
+                os.remove(local_filepath)
+                app.logger.info(f"Deleted local temp file: {local_filepath}")
+        except Exception as e:
+            app.logger.warning(f"Failed to delete temp file: {str(e)}")
+
+        return filename, blob_name
+
+    # Local storage only: keep the file so /api/download can serve it
+    return filename, None
 
 
 def smart_rename_output(output_file, base_name):
@@ -154,12 +157,77 @@ def smart_rename_output(output_file, base_name):
         return output_file
 
 
+def run_operation(operation, input_paths, unique_id, base_name, form, job_id=None, upload_paths=None,
+                  options=None):
+    """
+    Run a registered operation on already-saved input files
+    
+    Args:
+        operation: Operation descriptor from utils.operations
+        input_paths: Saved input file paths (only the first is used unless operation.multiple)
+        unique_id: Unique identifier for this request
+        base_name: Input base name used for smart output naming
+        form: Request form data holding the operation's parameters
+        job_id: Optional client job id; progress is published under it
+        upload_paths: Saved paths of the operation's extra uploads, keyed by converter argument
+        options: Further converter keyword arguments set by the endpoint (e.g. with_report)
+    
+    Returns:
+        Path to the output file, or (path, details) for converters that return both
+    """
+    converter = operation.resolve_converter()
+    source = input_paths if operation.multiple else input_paths[0]
+    params = operation.parse_params(form)
+    params.update(upload_paths or {})
+    params.update(options or {})
+    if job_id:
+        progress.report(job_id, 0, 0)
+        if operation.progress:
+            params['progress'] = progress.callback(job_id)
+    
+    start = time.perf_counter()
+    ok = False
+    try:
+        with watchdog.track(operation.id):
+            result = run_conversion(converter, source, app.config['OUTPUT_FOLDER'], unique_id,
+                                    executor=operation.executor, **params)
+        # e.g. repair_pdf(..., with_report=True) returns the report with the path
+        output_file, details = result if isinstance(result, tuple) else (result, None)
+        ok = bool(output_file) and os.path.exists(output_file)
+    except Exception as e:
+        # Success is reported by the caller, once the download URL is known
+        if job_id:
+            progress.finish(job_id, False, error=str(e))
+        raise
+    finally:
+        metrics.record(operation.id, time.perf_counter() - start, ok)
+    
+    if operation.output_suffix is not None:
+        output_file = smart_rename_output(output_file, f"{base_name}{operation.output_suffix}")
+    return output_file if details is None else (output_file, details)
+
+
+def request_job_id(form):
+    """The client's job id for /api/progress/<job_id>, if any; raises ParamError if malformed"""
+    job_id = form.get('job_id')
+    if job_id and not progress.valid_job_id(job_id):
+        raise ParamError('Invalid job_id')
+    return job_id or None
+
+
+def finish_job(job_id, output_file):
+    """Publish a tool endpoint's finished job (failures are published by run_operation)"""
+    if job_id:
+        progress.finish(job_id, download_url=f'/api/download/{os.path.basename(output_file)}')
+
+
 def cleanup_old_files():
     """Remove files older than 1 hour from uploads and outputs folders"""
     while True:
         try:
             current_time = time.time()
-            for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']]:
+            for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'], progress.PROGRESS_DIR,
+                           render.RENDER_DIR, singleflight.SINGLEFLIGHT_DIR]:
                 if os.path.exists(folder):
                     for filename in os.listdir(folder):
                         filepath = os.path.join(folder, filename)
@@ -168,48 +236,217 @@ def cleanup_old_files():
                             if file_age > 3600:  # 1 hour
                                 os.remove(filepath)
                                 print(f"Deleted old file: {filepath}")
+            removed = ocr_cache.cleanup()
+            if removed:
+                print(f"Deleted {removed} expired OCR cache entries")
+            removed = uploads.cleanup(storage=azure_storage)
+            if removed:
+                print(f"Deleted {removed} expired chunked uploads")
         except Exception as e:
             print(f"Error during cleanup: {str(e)}")
         
         time.sleep(1800)  # Run cleanup every 30 minutes
 
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
-cleanup_thread.start()
+def start_cleanup_thread():
+    """Start the background cleanup thread for this process"""
+    cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
+    cleanup_thread.start()
+    return cleanup_thread
+
+
+# Start cleanup thread. Under gunicorn with GUNICORN_PRELOAD the app is imported in the
+# master, whose threads don't survive fork, so gunicorn.conf.py starts it per worker instead.
+if os.getenv('GUNICORN_PRELOAD', 'false').lower() != 'true':
+    start_cleanup_thread()
+
+
+# Conversion endpoints and the operation each one runs (/api/convert names it in the form)
+ENDPOINT_OPERATIONS = {
+    'merge': 'merge_pdfs',
+    'split': 'split_pdf',
+    'compress': 'compress_pdf',
+    'rotate': 'rotate_pdf',
+    'watermark': 'add_watermark',
+    'remove': 'remove_pages',
+    'pdf_to_word_endpoint': 'pdf_to_word',
+    'pdf_to_text_endpoint': 'pdf_to_text',
+    'word_to_pdf_endpoint': 'word_to_pdf',
+    'text_to_pdf_endpoint': 'text_to_pdf',
+    'pdf_to_powerpoint_endpoint': 'pdf_to_powerpoint',
+    'add_page_numbers_endpoint': 'add_page_numbers',
+    'repair_pdf_endpoint': 'repair_pdf',
+    'powerpoint_to_pdf_endpoint': 'powerpoint_to_pdf',
+    'excel_to_pdf_endpoint': 'excel_to_pdf',
+}
+
+
+@app.before_request
+def admit_conversion():
+    """
+    Admit conversion requests against the node's cost budget (429 when over it)
+    
+    Requests are queued per tenant (X-API-Key header, else client address); clients
+    submitting bulk work mark it with an X-Priority: batch header (or priority form field).
+    """
+    if request.method != 'POST':
+        return None
+    # Arrival time, before any wait for budget (identical requests queued meanwhile share a result)
+    g.arrived = time.time()
+    if request.endpoint == 'convert_file':
+        operation = get_operation(request.form.get('operation'))
+    else:
+        operation = get_operation(ENDPOINT_OPERATIONS.get(request.endpoint))
+    if operation is None:
+        return None
+    
+    files = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+    upload_paths = [uploads.path(upload_id, azure_storage) for upload_id in request.form.getlist('upload_id')
+                    if uploads.valid_upload_id(upload_id)]
+    upload_paths = [path for path in upload_paths if path]
+    if not files and not upload_paths:
+        return None
+    
+    priority = request.headers.get('X-Priority') or request.form.get('priority')
+    if priority and priority not in admission.PRIORITIES:
+        return jsonify({'error': f"priority must be one of {', '.join(admission.PRIORITIES)}"}), 400
+    tenant = admission.tenant_id(request.headers.get('X-API-Key'), request.remote_addr)
+    
+    cost, pages = admission.estimate_cost(operation, files, upload_paths)
+    # Kept for readmit_conversion
+    g.admission_request = (cost, tenant, priority)
+    try:
+        g.admission_lease = admission.acquire(cost, tenant=tenant, priority=priority)
+    except admission.Overloaded as e:
+        app.logger.warning(f"Rejected {operation.id} for {tenant} ({pages} pages, cost {cost:.2f}): "
+                           f"node over budget")
+        return overloaded_response(e)
+    return None
+
+
+def overloaded_response(error):
+    """429 response for a request that wasn't admitted"""
+    response = jsonify({'error': 'Server is busy, please retry shortly', 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+def readmit_conversion():
+    """Take budget again for a request that gave it back to wait, then has to convert itself"""
+    if 'admission_request' in g and 'admission_lease' not in g:
+        cost, tenant, priority = g.admission_request
+        g.admission_lease = admission.acquire(cost, tenant=tenant, priority=priority)
+
+
+@app.teardown_request
+def release_admission(exc=None):
+    """Give the request's admission budget back (also called early by waiting requests)"""
+    lease = g.pop('admission_lease', None)
+    if lease:
+        admission.release(lease)
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint for Docker and monitoring"""
+    """Health check endpoint for Docker and monitoring (load is the node's admission state)"""
     return jsonify({
         'status': 'healthy',
         'service': 'PDF Toolkit API',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'load': admission.load()
     }), 200
 
 
+# Bodies of responses that don't change while the process runs, built on first request
+_static_responses = {}
+
+
+def static_json(key, build):
+    """
+    Serve a JSON body that is built once per process, with an ETag and compressed variants
+    
+    Args:
+        key: Cache key for the response
+        build: Callable returning the JSON-serializable body
+    """
+    entry = _static_responses.get(key)
+    if entry is None:
+        body = json.dumps(build(), separators=(',', ':')).encode()
+        entry = {'body': body, 'etag': f'"{hashlib.sha1(body).hexdigest()[:20]}"', 'encoded': {}}
+        _static_responses[key] = entry
+    
+    etag = entry['etag']
+    headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'public, max-age=60'}
+    encoding = compression.negotiate(request.headers.get('Accept-Encoding'))
+    if len(entry['body']) < compression.COMPRESS_MIN_SIZE:
+        encoding = None
+    if encoding:
+        # Each encoding is a representation of its own, with an ETag of its own
+        etag = f'{etag[:-1]}-{encoding}"'
+    headers['ETag'] = etag
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+    
+    body = entry['body']
+    if encoding:
+        if encoding not in entry['encoded']:
+            entry['encoded'][encoding] = compression.compress_bytes(body, encoding)
+        body = entry['encoded'][encoding]
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def _download_encoding(mimetype):
+    """Content-Encoding to send a download with, or None"""
+    if not compression.compressible(mimetype):
+        return None
+    return compression.negotiate(request.headers.get('Accept-Encoding'))
+
+
+def _azure_precompressed(blob_path, encoding):
+    """Blob name of a compressed copy of an output blob, created on first use (None if not smaller)"""
+    variant = compression.compressed_path(blob_path, encoding)
+    if azure_storage.file_exists(variant):
+        return variant
+    local_path = os.path.join(app.config['OUTPUT_FOLDER'], f"{uuid.uuid4()}_{os.path.basename(blob_path)}")
+    try:
+        azure_storage.download_file(blob_path, local_path)
+        compressed = compression.precompressed(local_path, encoding)
+        if compressed is None:
+            return None
+        azure_storage.upload_file(compressed, variant)
+        return variant
+    finally:
+        for path in (local_path, compression.compressed_path(local_path, encoding)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
 @app.route('/')
 def index():
     """API information endpoint"""
-    return jsonify({
+    return static_json('index', _api_info)
+
+
+def _api_info():
+    return {
         'name': 'PDF Toolkit API',
         'version': '2.0',
         'description': 'RESTful API for PDF and document conversion operations',
         'endpoints': {
             'PDF Operations': {
                 'POST /api/merge': 'Merge multiple PDFs',
-                'POST /api/split': 'Split PDF (params: start_page, end_page)',
+                'POST /api/split': 'Split PDF (params: start_page, end_page or mode, ranges, every)',
                 'POST /api/compress': 'Compress PDF',
                 'POST /api/rotate': 'Rotate PDF (param: rotation angle)',
-                'POST /api/watermark': 'Add watermark (param: watermark text)',
+                'POST /api/watermark': 'Add watermark (params: watermark text or watermark_image, opacity, rotation)',
                 'POST /api/remove-pages': 'Remove pages (param: pages comma-separated)',
                 'POST /api/add-page-numbers': 'Add page numbers',
                 'POST /api/repair-pdf': 'Repair damaged PDF',
             },
             'Conversions': {
                 'POST /api/pdf-to-word': 'Convert PDF to Word (.docx)',
-                'POST /api/pdf-to-text': 'Convert PDF to Text (.txt)',
+                'POST /api/pdf-to-text': 'Convert PDF to Text (.txt, or .json with format=json)',
                 'POST /api/pdf-to-powerpoint': 'Convert PDF to PowerPoint (.pptx)',
                 'POST /api/word-to-pdf': 'Convert Word to PDF',
                 'POST /api/text-to-pdf': 'Convert Text to PDF',
@@ -219,158 +456,136 @@ def index():
             'Utilities': {
                 'GET /api/download/<filename>': 'Download converted file',
                 'GET /api/operations': 'Get list of available operations',
+                'GET /api/metrics': 'Per-operation run counts and timings, per-tenant queue depth and waits',
+                'GET /api/progress/<job_id>': 'Progress of a /api/convert call made with job_id',
+                'GET /api/jobs/<job_id>/events': 'Server-sent progress, ETA and completion events for a job_id',
+                'POST /api/uploads': 'Start a resumable chunked upload (JSON: filename, size)',
+                'PUT /api/uploads/<upload_id>?offset=<n>': 'Upload one chunk (raw body, optional X-Chunk-Sha256)',
+                'GET /api/uploads/<upload_id>': 'Upload state, including offsets of missing chunks',
+                'POST /api/uploads/<upload_id>/finalize': 'Verify and finish an upload (JSON: sha256 or chunks_sha256); '
+                                                         'then pass upload_id to /api/convert instead of files',
+                'POST /api/render': 'Upload a PDF for page previews (params: width, dpi, format)',
+                'GET /api/render/<document>/<page>': 'Render one page as JPEG/WebP (params: width, dpi, format, quality)',
             }
         }
-    })
+    }
 
 
 @app.route('/api/convert', methods=['POST'])
 def convert_file():
     """Handle file conversion requests"""
+    saved_files = []
     try:
-        # Check if files were uploaded
-        if 'files' not in request.files:
+        # Files come in the request, or as ids of finalized chunked uploads (/api/uploads)
+        upload_ids = request.form.getlist('upload_id')
+        if 'files' not in request.files and not upload_ids:
             return jsonify({'error': 'No file uploaded'}), 400
         
         files = request.files.getlist('files')
-        operation = request.form.get('operation')
+        operation_id = request.form.get('operation')
         
-        if not files or files[0].filename == '':
+        if not upload_ids and (not files or files[0].filename == ''):
             return jsonify({'error': 'No file selected'}), 400
         
-        if not operation:
+        upload_names = []
+        for upload_id in upload_ids:
+            state = uploads.status(upload_id, azure_storage) if uploads.valid_upload_id(upload_id) else None
+            if state is None or not state['finalized']:
+                return jsonify({'error': f'Unknown or unfinished upload: {upload_id}'}), 400
+            upload_names.append(state['filename'])
+        
+        if not operation_id:
             return jsonify({'error': 'No operation specified'}), 400
         
+        operation = get_operation(operation_id)
+        if operation is None:
+            return jsonify({'error': 'Invalid operation'}), 400
+        
+        # Optional client-chosen id for polling /api/progress/<job_id>
+        job_id = request.form.get('job_id')
+        if job_id and not progress.valid_job_id(job_id):
+            return jsonify({'error': 'Invalid job_id'}), 400
+        
+        # Reject unparseable parameters before saving anything
+        try:
+            operation.parse_params(request.form)
+        except ParamError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Generate unique identifier for this operation
         unique_id = str(uuid.uuid4())
         
         # Extract base filename from first file for smart naming
-        base_filename = secure_filename(files[0].filename)
+        base_filename = secure_filename(upload_names[0] if upload_ids else files[0].filename)
         base_name = os.path.splitext(base_filename)[0]  # Remove extension
         
         # Save uploaded files (to local storage and Azure)
-        saved_files = []
-        for file in files:
-            filepath = save_uploaded_file_to_storage(file, unique_id, app.config)
-            saved_files.append(filepath)
-        
-        # Perform the requested operation
-        output_file = None
-        
-        if operation == 'pdf_to_word':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = pdf_to_word(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_word")
-        
-        elif operation == 'pdf_to_text':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = pdf_to_text(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_text")
-        
-        elif operation == 'pdf_to_images':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = pdf_to_images(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-        
-        elif operation == 'word_to_pdf':
-            if not allowed_file(saved_files[0], 'word'):
-                return jsonify({'error': 'Invalid file type. Please upload a Word document.'}), 400
-            output_file = word_to_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}")
-        
-        elif operation == 'text_to_pdf':
-            if not allowed_file(saved_files[0], 'text'):
-                return jsonify({'error': 'Invalid file type. Please upload a text file.'}), 400
-            output_file = text_to_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}")
-        
-        elif operation == 'images_to_pdf':
-            for file in saved_files:
-                if not allowed_file(file, 'image'):
-                    return jsonify({'error': 'Invalid file type. Please upload image files.'}), 400
-            output_file = images_to_pdf(saved_files, app.config['OUTPUT_FOLDER'], unique_id)
-        
-        elif operation == 'extract_images':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = extract_images_from_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-        
-        elif operation == 'reverse_pdf':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = reverse_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_reversed")
-        
-        elif operation == 'merge_pdfs':
-            for file in saved_files:
-                if not allowed_file(file, 'pdf'):
-                    return jsonify({'error': 'Invalid file type. Please upload PDF files only.'}), 400
-            output_file = merge_pdfs(saved_files, app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_merged")
-        
-        elif operation == 'split_pdf':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            start_page = request.form.get('start_page', 1, type=int)
-            end_page = request.form.get('end_page', 1, type=int)
-            output_file = split_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id, start_page, end_page)
-            output_file = smart_rename_output(output_file, f"{base_name}_split")
-        
-        elif operation == 'compress_pdf':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = compress_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_compressed")
-        
-        elif operation == 'rotate_pdf':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            rotation = request.form.get('rotation', 90, type=int)
-            output_file = rotate_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id, rotation)
-            output_file = smart_rename_output(output_file, f"{base_name}_rotated")
-        
-        elif operation == 'add_watermark':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            watermark_text = request.form.get('watermark', 'Watermark')
-            output_file = add_watermark(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id, watermark_text)
-            output_file = smart_rename_output(output_file, f"{base_name}_watermarked")
-        
-        elif operation == 'remove_pages':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            pages = request.form.get('pages', '1')
-            pages_to_remove = [int(p.strip()) for p in pages.split(',') if p.strip()]
-            output_file = remove_pages(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id, pages_to_remove)
-            output_file = smart_rename_output(output_file, f"{base_name}_removed")
-        
-        elif operation == 'pdf_to_powerpoint':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = pdf_to_powerpoint(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_presentation")
-        
-        elif operation == 'add_page_numbers':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = add_page_numbers(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_numbered")
-        
-        elif operation == 'repair_pdf':
-            if not allowed_file(saved_files[0], 'pdf'):
-                return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
-            output_file = repair_pdf(saved_files[0], app.config['OUTPUT_FOLDER'], unique_id)
-            output_file = smart_rename_output(output_file, f"{base_name}_repaired")
-        
+        if upload_ids:
+            # Chunked uploads are already stored (and staged in Azure); link them in
+            for upload_id, name in zip(upload_ids, upload_names):
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{secure_filename(name)}")
+                saved_files.append(uploads.link(upload_id, filepath, azure_storage))
         else:
-            return jsonify({'error': 'Invalid operation'}), 400
+            for file in files:
+                filepath = save_uploaded_file_to_storage(file, unique_id, app.config)
+                saved_files.append(filepath)
         
-        if output_file and os.path.exists(output_file):
+        # Validate inputs against the operation's accepted file type
+        inputs = saved_files if operation.multiple else saved_files[:1]
+        for file in inputs:
+            if not allowed_file(file, operation.file_type):
+                for saved_file in saved_files:
+                    if os.path.exists(saved_file):
+                        os.remove(saved_file)
+                return jsonify({'error': operation.invalid_message}), 400
+        
+        # Extra files (e.g. a watermark image) are passed to the converter by path
+        input_count = len(saved_files)
+        upload_paths = {}
+        for upload in operation.uploads:
+            extra = request.files.get(upload.name)
+            if not extra or extra.filename == '':
+                continue
+            if not allowed_file(extra.filename, upload.file_type):
+                for saved_file in saved_files:
+                    if os.path.exists(saved_file):
+                        os.remove(saved_file)
+                return jsonify({'error': f'Invalid file type for {upload.name}'}), 400
+            extra_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{secure_filename(extra.filename)}")
+            extra.save(extra_path)
+            saved_files.append(extra_path)
+            upload_paths[upload.arg] = extra_path
+        
+        def convert():
+            """Run the operation and store its output; returns the download path or None"""
+            output_file = run_operation(operation, saved_files[:input_count], unique_id, base_name, request.form,
+                                        job_id, upload_paths)
+            if not output_file or not os.path.exists(output_file):
+                return None
             # Upload output to Azure if enabled
             filename, blob_name = save_output_file_to_storage(output_file, unique_id)
-            
+            # Use Azure blob path for download if available
+            return blob_name if blob_name else filename
+        
+        # Perform the requested operation, sharing the output of an identical request
+        # (same operation, parameters and content) that is already running on this node
+        if operation.cacheable:
+            key = singleflight.request_key(operation, request.form, saved_files[:input_count], upload_paths)
+            download_path, shared = singleflight.run(key, convert, since=g.get('arrived'),
+                                                      on_wait=release_admission,
+                                                      on_resume=readmit_conversion)
+            if shared:
+                app.logger.info(f"Shared in-flight {operation.id} result for {base_filename}")
+        else:
+            download_path = convert()
+        
+        if job_id:
+            if download_path:
+                progress.finish(job_id, download_url=f'/api/download/{download_path}')
+            else:
+                progress.finish(job_id, False, error='Conversion failed')
+        
+        if download_path:
             # Clean up input files after processing
             for saved_file in saved_files:
                 try:
@@ -380,9 +595,6 @@ def convert_file():
                 except Exception as e:
                     app.logger.warning(f"Failed to delete input temp file: {str(e)}")
             
-            # Use Azure blob path for download if available
-            download_path = blob_name if blob_name else filename
-            
             return jsonify({
                 'success': True,
                 'message': 'Conversion completed successfully',
@@ -399,6 +611,19 @@ def convert_file():
             
             return jsonify({'error': 'Conversion failed'}), 500
     
+    except admission.Overloaded as e:
+        # Gave its budget back to wait for an identical request, then couldn't get it again
+        for saved_file in saved_files:
+            if os.path.exists(saved_file):
+                os.remove(saved_file)
+        return overloaded_response(e)
+    except JobLimitError as e:
+        # The document needs more CPU, memory or time than a conversion is allowed
+        app.logger.warning(f"Conversion stopped by sandbox limit: {str(e)}")
+        for saved_file in saved_files:
+            if os.path.exists(saved_file):
+                os.remove(saved_file)
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Error during conversion: {str(e)}")
         # Try to clean up any temp files
@@ -421,19 +646,23 @@ def download_file(blob_path):
             # If blob_path contains /, it's an Azure blob path
             if '/' in blob_path:
                 try:
-                    # Download from Azure directly to memory (BytesIO)
+                    # Stream from Azure chunk by chunk instead of buffering the whole blob;
+                    # under async workers each chunk read/write yields to other connections
                     filename = os.path.basename(blob_path)
-                    app.logger.info(f"Downloading {blob_path} from Azure...")
+                    app.logger.info(f"Streaming {blob_path} from Azure...")
                     
-                    blob_data = azure_storage.download_blob_to_bytes(blob_path)
-                    app.logger.info(f"Downloaded {blob_path} from Azure successfully ({len(blob_data)} bytes)")
+                    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+                    encoding = _download_encoding(mimetype)
+                    variant = _azure_precompressed(blob_path, encoding) if encoding else None
+                    if variant:
+                        headers['Content-Encoding'] = encoding
+                    if compression.compressible(mimetype):
+                        headers['Vary'] = 'Accept-Encoding'
                     
-                    # Send file directly from memory without creating temp file
-                    return send_file(
-                        BytesIO(blob_data),
-                        as_attachment=True,
-                        download_name=filename
-                    )
+                    size, chunks = azure_storage.download_blob_stream(variant or blob_path)
+                    headers['Content-Length'] = str(size)
+                    return Response(chunks, mimetype=mimetype, headers=headers)
                 except Exception as e:
                     app.logger.error(f"Failed to download from Azure: {str(e)}")
                     return jsonify({'error': f'Failed to download from Azure: {str(e)}'}), 500
@@ -441,7 +670,21 @@ def download_file(blob_path):
         # Fallback to local storage
         filepath = os.path.join(app.config['OUTPUT_FOLDER'], os.path.basename(blob_path))
         if os.path.exists(filepath):
-            return send_file(filepath, as_attachment=True)
+            # Text-like outputs go out compressed; the compressed copy is made once and kept
+            mimetype = mimetypes.guess_type(filepath)[0] or 'application/octet-stream'
+            encoding = _download_encoding(mimetype)
+            if encoding and os.path.getsize(filepath) >= compression.COMPRESS_MIN_SIZE:
+                compressed = compression.precompressed(filepath, encoding)
+                if compressed:
+                    response = send_file(compressed, mimetype=mimetype, as_attachment=True,
+                                         download_name=os.path.basename(filepath))
+                    response.headers['Content-Encoding'] = encoding
+                    response.headers['Vary'] = 'Accept-Encoding'
+                    return response
+            response = send_file(filepath, as_attachment=True)
+            if compression.compressible(mimetype):
+                response.headers['Vary'] = 'Accept-Encoding'
+            return response
         else:
             return jsonify({'error': 'File not found'}), 404
             
@@ -460,6 +703,9 @@ def merge():
             return jsonify({'error': 'Please upload at least 2 PDF files'}), 400
         
         files = request.files.getlist('files')
+        operation = get_operation('merge_pdfs')
+        operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(files[0].filename))[0]
         
@@ -473,14 +719,16 @@ def merge():
         if not saved_files:
             return jsonify({'error': 'No valid PDF files uploaded'}), 400
         
-        output_file = merge_pdfs(saved_files, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_merged")
+        output_file = run_operation(operation, saved_files, unique_id, base_name, request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDFs merged successfully',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error merging PDFs: {str(e)}")
         return jsonify({'error': f'Merge failed: {str(e)}'}), 500
@@ -494,8 +742,9 @@ def split():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
-        start_page = int(request.form.get('start_page', 1))
-        end_page = int(request.form.get('end_page', 1))
+        operation = get_operation('split_pdf')
+        params = operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -505,14 +754,20 @@ def split():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = split_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id, start_page, end_page)
-        output_file = smart_rename_output(output_file, f"{base_name}_split")
+        output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id)
+        finish_job(job_id, output_file)
         
+        if params['mode'] == 'range':
+            message = f"Pages {params['start_page']}-{params['end_page']} extracted"
+        else:
+            message = 'PDF split into parts'
         return jsonify({
             'success': True,
-            'message': f'Pages {start_page}-{end_page} extracted',
+            'message': message,
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error splitting PDF: {str(e)}")
         return jsonify({'error': f'Split failed: {str(e)}'}), 500
@@ -526,6 +781,7 @@ def compress():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -535,14 +791,17 @@ def compress():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = compress_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_compressed")
+        output_file = run_operation(get_operation('compress_pdf'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDF compressed successfully',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error compressing PDF: {str(e)}")
         return jsonify({'error': f'Compression failed: {str(e)}'}), 500
@@ -556,7 +815,9 @@ def rotate():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
-        rotation = int(request.form.get('rotation', 90))
+        operation = get_operation('rotate_pdf')
+        params = operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -566,14 +827,16 @@ def rotate():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = rotate_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id, rotation)
-        output_file = smart_rename_output(output_file, f"{base_name}_rotated")
+        output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
-            'message': f'PDF rotated {rotation}°',
+            'message': f"PDF rotated {params['rotation']}°",
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error rotating PDF: {str(e)}")
         return jsonify({'error': f'Rotation failed: {str(e)}'}), 500
@@ -587,24 +850,40 @@ def watermark():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
-        watermark_text = request.form.get('watermark', 'Watermark')
+        operation = get_operation('add_watermark')
+        operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
         if not allowed_file(file.filename, 'pdf'):
             return jsonify({'error': 'Invalid file type'}), 400
         
+        upload_paths = {}
+        for upload in operation.uploads:
+            image = request.files.get(upload.name)
+            if not image or not image.filename:
+                continue
+            if not allowed_file(image.filename, upload.file_type):
+                return jsonify({'error': 'Invalid watermark image type'}), 400
+            upload_paths[upload.arg] = os.path.join(app.config['UPLOAD_FOLDER'],
+                                                    f"{unique_id}_{secure_filename(image.filename)}")
+            image.save(upload_paths[upload.arg])
+        
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = add_watermark(filepath, app.config['OUTPUT_FOLDER'], unique_id, watermark_text)
-        output_file = smart_rename_output(output_file, f"{base_name}_watermarked")
+        output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id,
+                                    upload_paths)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'Watermark added',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error adding watermark: {str(e)}")
         return jsonify({'error': f'Watermark failed: {str(e)}'}), 500
@@ -618,8 +897,9 @@ def remove():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
-        pages = request.form.get('pages', '1')
-        pages_to_remove = [int(p.strip()) for p in pages.split(',') if p.strip()]
+        operation = get_operation('remove_pages')
+        params = operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -629,14 +909,17 @@ def remove():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = remove_pages(filepath, app.config['OUTPUT_FOLDER'], unique_id, pages_to_remove)
-        output_file = smart_rename_output(output_file, f"{base_name}_removed")
+        output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id)
+        finish_job(job_id, output_file)
+        pages = ','.join(str(page) for page in params['pages_to_remove'])
         
         return jsonify({
             'success': True,
             'message': f'Pages {pages} removed',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error removing pages: {str(e)}")
         return jsonify({'error': f'Remove failed: {str(e)}'}), 500
@@ -650,6 +933,7 @@ def pdf_to_word_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -659,14 +943,17 @@ def pdf_to_word_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = pdf_to_word(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_word")
+        output_file = run_operation(get_operation('pdf_to_word'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDF converted to Word',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error converting to Word: {str(e)}")
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
@@ -680,6 +967,9 @@ def pdf_to_text_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        operation = get_operation('pdf_to_text')
+        operation.parse_params(request.form)
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -689,14 +979,16 @@ def pdf_to_text_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = pdf_to_text(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_text")
+        output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDF converted to Text',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error converting to Text: {str(e)}")
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
@@ -710,6 +1002,7 @@ def word_to_pdf_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -719,14 +1012,17 @@ def word_to_pdf_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = word_to_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}")
+        output_file = run_operation(get_operation('word_to_pdf'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'Word converted to PDF',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error converting to PDF: {str(e)}")
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
@@ -740,6 +1036,7 @@ def text_to_pdf_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -749,14 +1046,17 @@ def text_to_pdf_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = text_to_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}")
+        output_file = run_operation(get_operation('text_to_pdf'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'Text converted to PDF',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error converting to PDF: {str(e)}")
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
@@ -770,6 +1070,7 @@ def pdf_to_powerpoint_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -779,14 +1080,17 @@ def pdf_to_powerpoint_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = pdf_to_powerpoint(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_presentation")
+        output_file = run_operation(get_operation('pdf_to_powerpoint'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDF converted to PowerPoint',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error converting to PowerPoint: {str(e)}")
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
@@ -801,6 +1105,7 @@ def add_page_numbers_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -810,14 +1115,17 @@ def add_page_numbers_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = add_page_numbers(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_numbered")
+        output_file = run_operation(get_operation('add_page_numbers'), [filepath], unique_id, base_name,
+                                    request.form, job_id)
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'Page numbers added',
             'download_url': f'/api/download/{os.path.basename(output_file)}'
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error adding page numbers: {str(e)}")
         return jsonify({'error': f'Failed: {str(e)}'}), 500
@@ -831,6 +1139,7 @@ def repair_pdf_endpoint():
             return jsonify({'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        job_id = request_job_id(request.form)
         unique_id = str(uuid.uuid4())
         base_name = os.path.splitext(secure_filename(file.filename))[0]
         
@@ -840,164 +1149,279 @@ def repair_pdf_endpoint():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{file.filename}")
         file.save(filepath)
         
-        output_file = repair_pdf(filepath, app.config['OUTPUT_FOLDER'], unique_id)
-        output_file = smart_rename_output(output_file, f"{base_name}_repaired")
+        # The report comes back with the path: a sandboxed job can't fill in a dict of ours
+        output_file, report = run_operation(get_operation('repair_pdf'), [filepath], unique_id, base_name,
+                                            request.form, job_id, options={'with_report': True})
+        finish_job(job_id, output_file)
         
         return jsonify({
             'success': True,
             'message': 'PDF repaired',
-            'download_url': f'/api/download/{os.path.basename(output_file)}'
+            'download_url': f'/api/download/{os.path.basename(output_file)}',
+            'report': report
         })
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error repairing PDF: {str(e)}")
         return jsonify({'error': f'Repair failed: {str(e)}'}), 500
 
+
+def _office_to_pdf(operation_id, message):
+    """Shared handler for the LibreOffice-backed conversion endpoints"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    operation = get_operation(operation_id)
+    file = request.files['file']
+    job_id = request_job_id(request.form)
+    unique_id = str(uuid.uuid4())
+    base_name = os.path.splitext(secure_filename(file.filename))[0]
+    
+    if not allowed_file(file.filename, operation.file_type):
+        return jsonify({'error': operation.invalid_message}), 400
+    
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{secure_filename(file.filename)}")
+    file.save(filepath)
+    
+    output_file = run_operation(operation, [filepath], unique_id, base_name, request.form, job_id)
+    finish_job(job_id, output_file)
+    
+    return jsonify({
+        'success': True,
+        'message': message,
+        'download_url': f'/api/download/{os.path.basename(output_file)}'
+    })
+
+
+@app.route('/api/powerpoint-to-pdf', methods=['POST'])
+def powerpoint_to_pdf_endpoint():
+    """Convert PowerPoint to PDF"""
+    try:
+        return _office_to_pdf('powerpoint_to_pdf', 'PowerPoint converted to PDF')
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error converting PowerPoint to PDF: {str(e)}")
+        return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
+
+
+@app.route('/api/excel-to-pdf', methods=['POST'])
+def excel_to_pdf_endpoint():
+    """Convert Excel to PDF"""
+    try:
+        return _office_to_pdf('excel_to_pdf', 'Excel converted to PDF')
+    except ParamError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error converting Excel to PDF: {str(e)}")
+        return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
+
+def _render_options(values):
+    """
+    Parse preview options from request args or form data
+    
+    Returns:
+        Tuple of (options dict for render.render, error message or None)
+    """
+    options = {
+        'width': values.get('width', type=int),
+        'dpi': values.get('dpi', type=int),
+        'image_format': values.get('format', 'jpeg').lower(),
+        'quality': values.get('quality', 80, type=int),
+    }
+    if not options['width'] and not options['dpi']:
+        options['width'] = 160
+    if options['width'] and not render.WIDTH_RANGE[0] <= options['width'] <= render.WIDTH_RANGE[1]:
+        return options, f"width must be between {render.WIDTH_RANGE[0]} and {render.WIDTH_RANGE[1]}"
+    if options['dpi'] and not render.DPI_RANGE[0] <= options['dpi'] <= render.DPI_RANGE[1]:
+        return options, f"dpi must be between {render.DPI_RANGE[0]} and {render.DPI_RANGE[1]}"
+    if options['image_format'] not in RENDER_FORMATS:
+        return options, f"format must be one of {', '.join(RENDER_FORMATS)}"
+    if not render.QUALITY_RANGE[0] <= options['quality'] <= render.QUALITY_RANGE[1]:
+        return options, "quality must be between 1 and 100"
+    return options, None
+
+
+@app.route('/api/render', methods=['POST'])
+def render_upload():
+    """Store a PDF for previews and return a render URL for each page"""
+    filepath = None
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        if file.filename == '' or not allowed_file(file.filename, 'pdf'):
+            return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
+        
+        options, error = _render_options(request.form)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_preview.pdf")
+        file.save(filepath)
+        document_id, page_count = render.store_document(filepath)
+        
+        query = f"format={options['image_format']}&quality={options['quality']}"
+        query += f"&width={options['width']}" if options['width'] else f"&dpi={options['dpi']}"
+        return jsonify({
+            'document': document_id,
+            'page_count': page_count,
+            'pages': [{'page': page, 'url': f'/api/render/{document_id}/{page}?{query}'}
+                      for page in range(1, page_count + 1)],
+        })
+    except Exception as e:
+        print(f"Error storing preview document: {str(e)}")
+        if filepath and os.path.exists(filepath):
+            os.remove(filepath)
+        return jsonify({'error': f'Preview failed: {str(e)}'}), 500
+
+
+@app.route('/api/render/<document_id>/<int:page>')
+def render_page_image(document_id, page):
+    """Render one page of a stored PDF as a JPEG or WebP image"""
+    if not render.valid_document_id(document_id):
+        return jsonify({'error': 'Unknown document'}), 404
+    
+    options, error = _render_options(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # A (document, page, options) tuple always renders to the same bytes
+    etag = '"{}-{}-{}-{}-{}-{}"'.format(document_id[:16], page, options['width'], options['dpi'],
+                                        options['image_format'], options['quality'])
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers={'ETag': etag})
+    
+    try:
+        # Always in the worker: the rendered-page cache lives in this process
+        data = run_conversion(render.render, document_id, page, executor='thread', **options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Render error: {str(e)}")
+        return jsonify({'error': f'Render failed: {str(e)}'}), 500
+    if data is None:
+        return jsonify({'error': 'Unknown document'}), 404
+    
+    return Response(data, mimetype=f"image/{options['image_format']}", headers={
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=86400, immutable',
+    })
+
+
 @app.route('/api/operations')
 def get_operations():
     """Return list of available operations"""
-    operations = [
-        {
-            'id': 'pdf_to_word',
-            'name': 'PDF to Word',
-            'description': 'Convert PDF files to editable Word documents',
-            'accepts': 'PDF',
-            'produces': 'DOCX',
-            'multiple': False
-        },
-        {
-            'id': 'pdf_to_text',
-            'name': 'PDF to Text',
-            'description': 'Extract text content from PDF files',
-            'accepts': 'PDF',
-            'produces': 'TXT',
-            'multiple': False
-        },
-        {
-            'id': 'pdf_to_images',
-            'name': 'PDF to Images',
-            'description': 'Convert PDF pages to image files (ZIP)',
-            'accepts': 'PDF',
-            'produces': 'ZIP',
-            'multiple': False
-        },
-        {
-            'id': 'word_to_pdf',
-            'name': 'Word to PDF',
-            'description': 'Convert Word documents to PDF format',
-            'accepts': 'DOCX',
-            'produces': 'PDF',
-            'multiple': False
-        },
-        {
-            'id': 'text_to_pdf',
-            'name': 'Text to PDF',
-            'description': 'Convert text files to PDF format',
-            'accepts': 'TXT',
-            'produces': 'PDF',
-            'multiple': False
-        },
-        {
-            'id': 'images_to_pdf',
-            'name': 'Images to PDF',
-            'description': 'Combine multiple images into a single PDF',
-            'accepts': 'Images',
-            'produces': 'PDF',
-            'multiple': True
-        },
-        {
-            'id': 'extract_images',
-            'name': 'Extract Images',
-            'description': 'Extract all images from a PDF file (ZIP)',
-            'accepts': 'PDF',
-            'produces': 'ZIP',
-            'multiple': False
-        },
-        {
-            'id': 'reverse_pdf',
-            'name': 'Reverse PDF',
-            'description': 'Reverse the page order of a PDF file',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False
-        },
-        {
-            'id': 'merge_pdfs',
-            'name': 'Merge PDFs',
-            'description': 'Combine multiple PDF files into one',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': True
-        },
-        {
-            'id': 'split_pdf',
-            'name': 'Split PDF',
-            'description': 'Extract a range of pages from a PDF',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False,
-            'params': {'start_page': 'integer', 'end_page': 'integer'}
-        },
-        {
-            'id': 'compress_pdf',
-            'name': 'Compress PDF',
-            'description': 'Reduce PDF file size while maintaining readability',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False
-        },
-        {
-            'id': 'rotate_pdf',
-            'name': 'Rotate PDF',
-            'description': 'Rotate all pages in a PDF (90°, 180°, 270°)',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False,
-            'params': {'rotation': 'integer (90, 180, 270)'}
-        },
-        {
-            'id': 'add_watermark',
-            'name': 'Add Watermark',
-            'description': 'Add text watermark to all PDF pages',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False,
-            'params': {'watermark': 'string'}
-        },
-        {
-            'id': 'remove_pages',
-            'name': 'Remove Pages',
-            'description': 'Remove specific pages from a PDF',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False,
-            'params': {'pages': 'comma-separated page numbers (e.g., 1,3,5)'}
-        },
-        {
-            'id': 'pdf_to_powerpoint',
-            'name': 'PDF to PowerPoint',
-            'description': 'Convert PDF pages to PowerPoint presentation',
-            'accepts': 'PDF',
-            'produces': 'PPTX',
-            'multiple': False
-        },
-        {
-            'id': 'add_page_numbers',
-            'name': 'Add Page Numbers',
-            'description': 'Add page numbers to PDF document',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False
-        },
-        {
-            'id': 'repair_pdf',
-            'name': 'Repair PDF',
-            'description': 'Repair damaged or corrupt PDF files',
-            'accepts': 'PDF',
-            'produces': 'PDF',
-            'multiple': False
-        }
-    ]
-    return jsonify(operations)
+    # progress_stream tells the client whether to follow progress over /api/jobs/<job_id>/events
+    return static_json('operations', lambda: [
+        dict(operation, progress_stream=operation['progress'] and PROGRESS_STREAM)
+        for operation in list_operations()
+    ])
+
+
+@app.route('/api/progress/<job_id>')
+def get_progress(job_id):
+    """Return progress for a conversion started with a job_id"""
+    state = progress.get(job_id) if progress.valid_job_id(job_id) else None
+    if state is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(state)
+
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream progress, ETA and completion of a conversion started with a job_id (SSE)"""
+    if not progress.valid_job_id(job_id):
+        return jsonify({'error': 'Unknown job'}), 404
+    # Sync workers send the current state and end the stream at once: a client that
+    # subscribes anyway reconnects every second, polling without holding a worker
+    duration = None if PROGRESS_STREAM else 0
+    return Response(progress.events(job_id, duration), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx and similar proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable chunked upload for a large input"""
+    data = request.get_json(silent=True) or {}
+    size = data.get('size')
+    try:
+        state = uploads.create(secure_filename(data.get('filename') or ''),
+                               size if type(size) is int else None, azure_storage)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Upload create error: {str(e)}")
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    return jsonify(state), 201
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Return the state of a chunked upload (which chunks are still missing)"""
+    state = uploads.status(upload_id, azure_storage) if uploads.valid_upload_id(upload_id) else None
+    if state is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(state)
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    """Store one chunk of a chunked upload; the body is the raw chunk"""
+    if not uploads.valid_upload_id(upload_id):
+        return jsonify({'error': 'Unknown upload'}), 404
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'offset is required'}), 400
+    try:
+        state = uploads.write_chunk(upload_id, offset, request.get_data(cache=False),
+                                    request.headers.get('X-Chunk-Sha256'), azure_storage)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Upload chunk error: {str(e)}")
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    if state is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(state)
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Check a chunked upload against its hash so it can be used as an input"""
+    if not uploads.valid_upload_id(upload_id):
+        return jsonify({'error': 'Unknown upload'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        state = uploads.finalize(upload_id, data.get('sha256'), data.get('chunks_sha256'), azure_storage)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Upload finalize error: {str(e)}")
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    if state is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(state)
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abandon a chunked upload"""
+    if uploads.valid_upload_id(upload_id):
+        uploads.delete(upload_id, azure_storage)
+    return '', 204
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Return per-operation counters for this worker process, and the node's queueing metrics"""
+    return jsonify({'pid': os.getpid(), 'operations': metrics.snapshot(), 'render_cache': render.stats(),
+                    'memory': watchdog.stats(), 'scheduling': admission.scheduling_stats()})
 
 
 if __name__ == '__main__':
@@ -0,0 +1,301 @@
+"""
+Deterministic synthetic corpus for benchmarks
+Every document is generated from a fixed seed so runs on different commits
+measure exactly the same inputs
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import zipfile
+from datetime import datetime
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+CORPUS_VERSION = 1
+DEFAULT_SEED = 1234
+
+# Page counts / object counts per scale. 'quick' keeps CI runs short.
+SCALES = {
+    'quick': {
+        'text_pages': 5,
+        'image_pages': 3,
+        'images_per_page': 2,
+        'many_pages': 60,
+        'small_object_pages': 2,
+        'small_objects_per_page': 500,
+        'docx_paragraphs': 60,
+        'txt_lines': 5000,
+        'loose_images': 3,
+    },
+    'default': {
+        'text_pages': 40,
+        'image_pages': 20,
+        'images_per_page': 3,
+        'many_pages': 500,
+        'small_object_pages': 10,
+        'small_objects_per_page': 3000,
+        'docx_paragraphs': 600,
+        'txt_lines': 100000,
+        'loose_images': 10,
+    },
+}
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est"
+).split()
+
+# Fixed metadata so PyMuPDF does not stamp the current time into the files
+FIXED_METADATA = {
+    'title': 'benchmark corpus',
+    'author': 'pdf-toolkit benchmarks',
+    'subject': '',
+    'keywords': '',
+    'creator': 'benchmarks/corpus.py',
+    'producer': 'benchmarks/corpus.py',
+    'creationDate': 'D:20240101000000',
+    'modDate': 'D:20240101000000',
+}
+
+
+def _sentence(rng, min_words=6, max_words=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng, sentences=5):
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def _noise_image(rng, width, height):
+    """Build a deterministic RGB image with gradients and noise (compresses like a photo)"""
+    base = bytes(rng.getrandbits(8) for _ in range(width * height * 3 // 16))
+    img = Image.frombytes('RGB', (width // 4, height // 4), base)
+    img = img.resize((width, height), Image.BILINEAR)
+    return img
+
+
+def _image_bytes(img, fmt='PNG'):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _normalize_zip(path):
+    """Rewrite an Office (zip) container with fixed entry timestamps"""
+    with zipfile.ZipFile(path) as source:
+        entries = [(info, source.read(info.filename)) for info in source.infolist()]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info, data in entries:
+            if info.filename == 'docProps/core.xml':
+                # Some writers (openpyxl) always stamp "modified" with the current time
+                data = re.sub(rb'(<dcterms:modified[^>]*>)[^<]*', rb'\g<1>2024-01-01T00:00:00Z', data)
+            fixed = zipfile.ZipInfo(info.filename, date_time=(2024, 1, 1, 0, 0, 0))
+            fixed.compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(fixed, data)
+
+
+def _save_pdf(doc, path):
+    doc.set_metadata(FIXED_METADATA)
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def make_text_heavy_pdf(path, rng, pages):
+    """Dense multi-column prose on every page"""
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        rect = fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50)
+        text = "\n\n".join(_paragraph(rng, 6) for _ in range(8))
+        page.insert_textbox(rect, text, fontsize=9, fontname='helv')
+    _save_pdf(doc, path)
+
+
+def make_image_heavy_pdf(path, rng, pages, images_per_page):
+    """Pages covered by distinct raster images plus one logo repeated on every page"""
+    doc = fitz.open()
+    logo = _image_bytes(_noise_image(rng, 128, 64))
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(40, 20, 168, 84), stream=logo)
+        slot_height = (page.rect.height - 140) / images_per_page
+        for index in range(images_per_page):
+            top = 100 + index * slot_height
+            img = _noise_image(rng, 800, 500)
+            page.insert_image(
+                fitz.Rect(50, top, page.rect.width - 50, top + slot_height - 10),
+                stream=_image_bytes(img, 'JPEG'),
+            )
+    _save_pdf(doc, path)
+
+
+def make_many_page_pdf(path, rng, pages):
+    """Many short pages - stresses per-page overhead"""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Section {number + 1}", fontsize=16)
+        page.insert_text((72, 110), _sentence(rng), fontsize=10)
+    _save_pdf(doc, path)
+
+
+def make_small_objects_pdf(path, rng, pages, objects_per_page):
+    """Thousands of tiny vector shapes and text snippets per page"""
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        shape = page.new_shape()
+        for _ in range(objects_per_page):
+            x = rng.uniform(20, page.rect.width - 30)
+            y = rng.uniform(20, page.rect.height - 30)
+            shape.draw_rect(fitz.Rect(x, y, x + rng.uniform(2, 10), y + rng.uniform(2, 10)))
+            shape.finish(color=(0, 0, 0), fill=(rng.random(), rng.random(), rng.random()), width=0.3)
+        shape.commit()
+        for _ in range(objects_per_page // 10):
+            x = rng.uniform(20, page.rect.width - 60)
+            y = rng.uniform(20, page.rect.height - 20)
+            page.insert_text((x, y), rng.choice(WORDS), fontsize=5)
+    _save_pdf(doc, path)
+
+
+def make_docx(path, rng, paragraphs):
+    """Word document with headings and body paragraphs"""
+    from docx import Document
+
+    document = Document()
+    core = document.core_properties
+    core.created = core.modified = datetime(2024, 1, 1)
+    core.author = FIXED_METADATA['author']
+    for index in range(paragraphs):
+        if index % 20 == 0:
+            document.add_heading(f"Chapter {index // 20 + 1}", level=1)
+        document.add_paragraph(_paragraph(rng, 4))
+    document.save(path)
+    _normalize_zip(path)
+
+
+def make_txt(path, rng, lines):
+    """Log-style text file with a mix of short and over-long lines"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for number in range(lines):
+            if number % 7 == 0:
+                f.write(f"[{number:08d}] " + " ".join(_sentence(rng) for _ in range(4)) + "\n")
+            else:
+                f.write(f"[{number:08d}] INFO {_sentence(rng, 3, 10)}\n")
+
+
+def make_pptx(path, rng, slides):
+    """Simple text deck for LibreOffice-backed conversions"""
+    from pptx import Presentation
+
+    presentation = Presentation()
+    core = presentation.core_properties
+    core.author = FIXED_METADATA['author']
+    core.created = core.modified = core.last_printed = datetime(2024, 1, 1)
+    for index in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {index + 1}"
+        slide.placeholders[1].text = _sentence(rng)
+    presentation.save(path)
+    _normalize_zip(path)
+
+
+def make_xlsx(path, rng, rows):
+    """Numeric spreadsheet for LibreOffice-backed conversions"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.properties.created = datetime(2024, 1, 1)
+    sheet = workbook.active
+    sheet.append(['id', 'name', 'value', 'ratio'])
+    for index in range(rows):
+        sheet.append([index, rng.choice(WORDS), rng.randint(0, 10000), round(rng.random(), 4)])
+    workbook.save(path)
+    _normalize_zip(path)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _page_count(path):
+    if not path.endswith('.pdf'):
+        return None
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def build_corpus(corpus_dir, scale='default', seed=DEFAULT_SEED):
+    """
+    Generate (or reuse) the synthetic corpus
+
+    Args:
+        corpus_dir: Directory to write corpus files into
+        scale: Key of SCALES ('quick' or 'default')
+        seed: Random seed; the same seed always yields the same documents
+
+    Returns:
+        Dict mapping corpus item name to {'path', 'bytes', 'pages', 'sha256'}
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown corpus scale: {scale}")
+
+    sizes = SCALES[scale]
+    target_dir = os.path.join(corpus_dir, f"v{CORPUS_VERSION}_{scale}_{seed}")
+    manifest_path = os.path.join(target_dir, 'manifest.json')
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if all(os.path.exists(item['path']) for item in manifest.values()):
+            return manifest
+
+    os.makedirs(target_dir, exist_ok=True)
+
+    # One generator per item keeps every document independent of the others
+    builders = {
+        'text_heavy.pdf': lambda p, r: make_text_heavy_pdf(p, r, sizes['text_pages']),
+        'image_heavy.pdf': lambda p, r: make_image_heavy_pdf(p, r, sizes['image_pages'], sizes['images_per_page']),
+        'many_pages.pdf': lambda p, r: make_many_page_pdf(p, r, sizes['many_pages']),
+        'small_objects.pdf': lambda p, r: make_small_objects_pdf(
+            p, r, sizes['small_object_pages'], sizes['small_objects_per_page']),
+        'document.docx': lambda p, r: make_docx(p, r, sizes['docx_paragraphs']),
+        'log.txt': lambda p, r: make_txt(p, r, sizes['txt_lines']),
+        'deck.pptx': lambda p, r: make_pptx(p, r, max(3, sizes['text_pages'] // 2)),
+        'sheet.xlsx': lambda p, r: make_xlsx(p, r, sizes['txt_lines'] // 10),
+    }
+    for index in range(sizes['loose_images']):
+        fmt = 'PNG' if index % 2 == 0 else 'JPEG'
+        ext = 'png' if fmt == 'PNG' else 'jpg'
+        builders[f"photo_{index + 1}.{ext}"] = (
+            lambda p, r, fmt=fmt: _noise_image(r, 1200, 900).save(p, format=fmt)
+        )
+
+    manifest = {}
+    for offset, (name, builder) in enumerate(sorted(builders.items())):
+        path = os.path.join(target_dir, name)
+        builder(path, random.Random(seed + offset))
+        manifest[name] = {
+            'path': path,
+            'bytes': os.path.getsize(path),
+            'pages': _page_count(path),
+            'sha256': _sha256(path),
+        }
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
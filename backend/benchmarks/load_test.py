@@ -0,0 +1,405 @@
+"""
+HTTP load test for the PDF Toolkit API
+Starts the app under gunicorn (same flags as backend/Dockerfile) with Azure replaced
+by a local blob directory, drives /api/convert, /api/merge, /api/download and the
+static endpoints with closed-loop clients, and sweeps concurrency levels.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --mix heavy --concurrency 1,2,4,8,16 --duration 20
+    python -m benchmarks.load_test --mix pdf_to_images:1 --workers 4 --output load.json
+    python -m benchmarks.load_test --url http://localhost:5000 --mix interactive
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import DEFAULT_SEED, build_corpus  # noqa: E402
+
+# Request kinds: (method, route, corpus inputs, form params). Convert requests are
+# followed by a download of the produced file, recorded separately as 'download'.
+REQUESTS = {
+    'pdf_to_images': ('POST', '/api/convert', 'text_heavy.pdf', {'operation': 'pdf_to_images'}),
+    'pdf_to_word': ('POST', '/api/convert', 'text_heavy.pdf', {'operation': 'pdf_to_word'}),
+    'pdf_to_text': ('POST', '/api/convert', 'text_heavy.pdf', {'operation': 'pdf_to_text'}),
+    'pdf_to_powerpoint': ('POST', '/api/convert', 'text_heavy.pdf', {'operation': 'pdf_to_powerpoint'}),
+    'text_to_pdf': ('POST', '/api/convert', 'log.txt', {'operation': 'text_to_pdf'}),
+    'compress_pdf': ('POST', '/api/convert', 'image_heavy.pdf', {'operation': 'compress_pdf'}),
+    'rotate_pdf': ('POST', '/api/convert', 'text_heavy.pdf', {'operation': 'rotate_pdf', 'rotation': '90'}),
+    'split_pdf': ('POST', '/api/convert', 'many_pages.pdf',
+                  {'operation': 'split_pdf', 'start_page': '1', 'end_page': '10'}),
+    'extract_images': ('POST', '/api/convert', 'image_heavy.pdf', {'operation': 'extract_images'}),
+    'merge': ('POST', '/api/merge', ('text_heavy.pdf', 'many_pages.pdf'), {}),
+    'operations': ('GET', '/api/operations', None, {}),
+    'health': ('GET', '/health', None, {}),
+}
+
+# Named operation mixes (weights are relative)
+MIXES = {
+    'interactive': {'pdf_to_text': 3, 'rotate_pdf': 2, 'split_pdf': 2, 'compress_pdf': 2, 'operations': 1},
+    'heavy': {'pdf_to_images': 2, 'pdf_to_word': 1, 'pdf_to_powerpoint': 1},
+    'mixed': {'pdf_to_images': 2, 'pdf_to_word': 1, 'pdf_to_text': 3, 'merge': 1, 'split_pdf': 2,
+              'compress_pdf': 1, 'extract_images': 1, 'text_to_pdf': 1, 'operations': 1},
+    'static': {'operations': 1, 'health': 1},
+}
+
+
+def parse_mix(value):
+    """
+    Parse a mix name or 'kind:weight,kind:weight' spec
+
+    Returns:
+        Dict mapping request kind to weight
+    """
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition(':')
+        kind = kind.strip()
+        if kind not in REQUESTS:
+            raise ValueError(f"Unknown request kind '{kind}'. Choose from: {', '.join(sorted(REQUESTS))}")
+        mix[kind] = float(weight) if weight else 1.0
+    return mix
+
+
+def _encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class LoadClient:
+    """Issues API requests and records (kind, latency, status, bytes) samples"""
+
+    def __init__(self, base_url, corpus, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.bodies = {}
+        for kind, (method, route, spec, params) in REQUESTS.items():
+            if spec is None:
+                continue
+            names = spec if isinstance(spec, tuple) else (spec,)
+            field = 'files'
+            files = []
+            for name in names:
+                with open(corpus[name]['path'], 'rb') as f:
+                    files.append((field, name, f.read()))
+            self.bodies[kind] = _encode_multipart(params, files)
+
+    def _call(self, method, url, body=None, content_type=None):
+        request = urllib.request.Request(url, data=body, method=method)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def run(self, kind):
+        """
+        Execute one logical request (plus its download for conversions)
+
+        Returns:
+            List of sample dicts
+        """
+        method, route, spec, params = REQUESTS[kind]
+        samples = []
+        body, content_type = self.bodies.get(kind, (None, None))
+        start = time.perf_counter()
+        try:
+            status, payload = self._call(method, self.base_url + route, body, content_type)
+        except Exception as e:
+            samples.append({'kind': kind, 'latency': time.perf_counter() - start, 'status': 0, 'error': str(e)})
+            return samples
+        samples.append({'kind': kind, 'latency': time.perf_counter() - start, 'status': status,
+                        'bytes': len(payload)})
+
+        if status == 200 and method == 'POST':
+            try:
+                download_url = json.loads(payload)['download_url']
+            except (ValueError, KeyError):
+                samples[-1]['status'] = 0
+                samples[-1]['error'] = 'response had no download_url'
+                return samples
+            start = time.perf_counter()
+            try:
+                status, data = self._call('GET', self.base_url + download_url)
+                samples.append({'kind': 'download', 'latency': time.perf_counter() - start,
+                                'status': status, 'bytes': len(data)})
+            except Exception as e:
+                samples.append({'kind': 'download', 'latency': time.perf_counter() - start,
+                                'status': 0, 'error': str(e)})
+        return samples
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles, throughput and error rate for a list of samples"""
+    latencies = sorted(s['latency'] for s in samples)
+    errors = sum(1 for s in samples if s['status'] != 200)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 3) if elapsed > 0 else None,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 1) if latencies else None,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def run_level(client, mix, concurrency, duration, seed):
+    """
+    Drive the API with `concurrency` closed-loop clients for `duration` seconds
+
+    Returns:
+        Dict with overall and per-kind summaries
+    """
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        local = []
+        while time.perf_counter() < deadline:
+            local.extend(client.run(rng.choices(kinds, weights)[0]))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Overall figures count logical requests (conversions without their download leg)
+    logical = [s for s in samples if s['kind'] != 'download']
+    result = {
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 2),
+        'overall': summarize(logical, elapsed),
+        'by_kind': {},
+        'sample_errors': sorted({s['error'] for s in samples if s.get('error')})[:5],
+    }
+    for kind in sorted({s['kind'] for s in samples}):
+        result['by_kind'][kind] = summarize([s for s in samples if s['kind'] == kind], elapsed)
+    return result
+
+
+def find_saturation(levels, max_error_rate=0.01, min_gain=0.10):
+    """
+    Pick the saturation point of a concurrency sweep
+
+    The node is saturated at the first level where throughput improves by less than
+    `min_gain` over the previous level, or where the error rate exceeds `max_error_rate`.
+
+    Returns:
+        Dict with the saturating concurrency and the reason, or None if never saturated
+    """
+    for previous, current in zip(levels, levels[1:]):
+        overall = current['overall']
+        if overall['error_rate'] > max_error_rate:
+            return {'concurrency': current['concurrency'], 'reason': 'error_rate',
+                    'best_throughput_rps': previous['overall']['throughput_rps']}
+        before = previous['overall']['throughput_rps'] or 0
+        after = overall['throughput_rps'] or 0
+        if before and after < before * (1 + min_gain):
+            return {'concurrency': current['concurrency'], 'reason': 'throughput_plateau',
+                    'best_throughput_rps': max(before, after)}
+    if levels and levels[0]['overall']['error_rate'] > max_error_rate:
+        return {'concurrency': levels[0]['concurrency'], 'reason': 'error_rate', 'best_throughput_rps': None}
+    return None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_health(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            time.sleep(0.05)
+    return False
+
+
+def start_server(work_dir, workers, timeout, extra_args=(), server_mode='sync', preload=False):
+    """
+    Start gunicorn against a scratch directory with the local blob stand-in
+
+    Returns:
+        (process, base_url)
+    """
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        'USE_AZURE_STORAGE': 'true',
+        'AZURE_STORAGE_LOCAL_PATH': os.path.join(work_dir, 'blobs'),
+        'SERVER_MODE': server_mode,
+        'GUNICORN_PRELOAD': 'true' if preload else 'false',
+        'PYTHONPATH': BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+    })
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--config', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--timeout', str(timeout),
+        '--chdir', work_dir,
+        '--log-level', 'warning',
+        *extra_args,
+        'app:app',
+    ]
+    log = open(os.path.join(work_dir, 'gunicorn.log'), 'wb')
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    if not _wait_for_health(base_url):
+        stop_server(process)
+        with open(os.path.join(work_dir, 'gunicorn.log'), 'r', errors='replace') as f:
+            raise RuntimeError(f"gunicorn did not become healthy:\n{f.read()[-2000:]}")
+    return process, base_url
+
+
+def stop_server(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the PDF Toolkit API with concurrency sweeps')
+    parser.add_argument('--mix', default='mixed',
+                        help=f"mix name ({', '.join(MIXES)}) or 'kind:weight,...' "
+                             f"(kinds: {', '.join(sorted(REQUESTS))})")
+    parser.add_argument('--concurrency', default='1,2,4,8,16',
+                        help='comma-separated concurrency levels to sweep')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per concurrency level')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers (Dockerfile uses 4)')
+    parser.add_argument('--server-timeout', type=int, default=120, help='gunicorn --timeout')
+    parser.add_argument('--server-mode', choices=['sync', 'async'], default='sync',
+                        help='SERVER_MODE for gunicorn.conf.py (async = gevent workers)')
+    parser.add_argument('--preload', action='store_true',
+                        help='GUNICORN_PRELOAD=true: import app and converter dependencies in the master')
+    parser.add_argument('--gunicorn-arg', action='append', default=[],
+                        help='extra argument passed to gunicorn (repeatable)')
+    parser.add_argument('--request-timeout', type=float, default=180)
+    parser.add_argument('--url', help='target an already running server instead of starting gunicorn')
+    parser.add_argument('--scale', choices=['quick', 'default'], default='quick')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--corpus-dir', default=os.path.join(BACKEND_DIR, 'benchmarks', '.corpus'))
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    corpus = build_corpus(args.corpus_dir, args.scale, args.seed)
+
+    work_dir = tempfile.mkdtemp(prefix='pdf_toolkit_load_')
+    process = None
+    try:
+        if args.url:
+            base_url = args.url
+        else:
+            print(f"Starting gunicorn with {args.workers} {args.server_mode} workers...")
+            process, base_url = start_server(work_dir, args.workers, args.server_timeout, args.gunicorn_arg,
+                                             args.server_mode, args.preload)
+
+        client = LoadClient(base_url, corpus, args.request_timeout)
+        print(f"Mix: {mix}")
+        print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        results = []
+        for concurrency in levels:
+            level = run_level(client, mix, concurrency, args.duration, args.seed)
+            results.append(level)
+            o = level['overall']
+            print(f"{concurrency:>5} {o['throughput_rps'] or 0:>8.2f} {o['p50_ms'] or 0:>9.1f} "
+                  f"{o['p95_ms'] or 0:>9.1f} {o['p99_ms'] or 0:>9.1f} {o['error_rate']:>7.1%}")
+
+        saturation = find_saturation(results)
+        if saturation:
+            print(f"Saturation at concurrency {saturation['concurrency']} ({saturation['reason']}), "
+                  f"best throughput {saturation['best_throughput_rps']} req/s")
+        else:
+            print("No saturation detected in the sweep")
+
+        report = {
+            'started_at': datetime.now().isoformat(),
+            'target': args.url or 'gunicorn',
+            'server': None if args.url else {'mode': args.server_mode, 'workers': args.workers,
+                                             'timeout': args.server_timeout, 'preload': args.preload,
+                                             'extra_args': args.gunicorn_arg},
+            'mix': mix,
+            'duration_s': args.duration,
+            'corpus': {'scale': args.scale, 'seed': args.seed},
+            'cpu_count': os.cpu_count(),
+            'levels': results,
+            'saturation': saturation,
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {args.output}")
+    finally:
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,683 @@
+"""
+Benchmark harness for PDF Toolkit
+Times app startup (fresh-interpreter import and gunicorn boot), every converter in
+utils/pdf_converter.py and every HTTP endpoint (via the Flask test client) against
+the deterministic corpus, and writes JSON results that can be compared across commits.
+
+Usage (from the backend directory):
+    python -m benchmarks.run_benchmarks --scale quick --output bench.json
+    python -m benchmarks.run_benchmarks --only pdf_to_text --repeat 5
+    python -m benchmarks.run_benchmarks --compare baseline.json --output new.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import CORPUS_VERSION, DEFAULT_SEED, build_corpus  # noqa: E402
+
+SCHEMA_VERSION = 1
+PDF_INPUTS = ['text_heavy.pdf', 'image_heavy.pdf', 'many_pages.pdf', 'small_objects.pdf']
+PACKAGES = ['PyPDF2', 'PyMuPDF', 'pdf2docx', 'reportlab', 'Pillow', 'python-pptx', 'python-docx', 'Flask']
+
+
+# ===== CASE TABLES =====
+# Each converter case: (function name, corpus inputs, extra positional args).
+# Inputs listed as a tuple are passed to the converter as one list argument.
+
+def _converter_cases():
+    cases = []
+    for name in PDF_INPUTS:
+        cases += [
+            ('pdf_to_text', name, ()),
+            ('pdf_to_images', name, ()),
+            ('pdf_to_word', name, ()),
+            ('pdf_to_powerpoint', name, ()),
+            ('reverse_pdf', name, ()),
+            ('split_pdf', name, (1, 3)),
+            ('compress_pdf', name, ()),
+            ('rotate_pdf', name, (90,)),
+            ('add_watermark', name, ('CONFIDENTIAL',)),
+            ('remove_pages', name, ([1, 2],)),
+            ('add_page_numbers', name, ()),
+            ('repair_pdf', name, ()),
+        ]
+    cases += [
+        ('extract_images_from_pdf', 'image_heavy.pdf', ()),
+        ('merge_pdfs', tuple(PDF_INPUTS), ()),
+        ('text_to_pdf', 'log.txt', ()),
+        ('word_to_pdf', 'document.docx', ()),
+        ('powerpoint_to_pdf', 'deck.pptx', ()),
+        ('excel_to_pdf', 'sheet.xlsx', ()),
+        ('images_to_pdf', 'photos', ()),
+    ]
+    return cases
+
+
+# /api/convert operations: (operation, corpus inputs, form params)
+CONVERT_CASES = [
+    ('pdf_to_word', 'text_heavy.pdf', {}),
+    ('pdf_to_text', 'text_heavy.pdf', {}),
+    ('pdf_to_images', 'text_heavy.pdf', {}),
+    ('word_to_pdf', 'document.docx', {}),
+    ('text_to_pdf', 'log.txt', {}),
+    ('images_to_pdf', 'photos', {}),
+    ('extract_images', 'image_heavy.pdf', {}),
+    ('reverse_pdf', 'text_heavy.pdf', {}),
+    ('merge_pdfs', ('text_heavy.pdf', 'many_pages.pdf'), {}),
+    ('split_pdf', 'text_heavy.pdf', {'start_page': '1', 'end_page': '3'}),
+    ('compress_pdf', 'image_heavy.pdf', {}),
+    ('rotate_pdf', 'text_heavy.pdf', {'rotation': '90'}),
+    ('add_watermark', 'text_heavy.pdf', {'watermark': 'CONFIDENTIAL'}),
+    ('remove_pages', 'text_heavy.pdf', {'pages': '1,2'}),
+    ('pdf_to_powerpoint', 'text_heavy.pdf', {}),
+    ('powerpoint_to_pdf', 'deck.pptx', {}),
+    ('excel_to_pdf', 'sheet.xlsx', {}),
+    ('add_page_numbers', 'text_heavy.pdf', {}),
+    ('repair_pdf', 'text_heavy.pdf', {}),
+]
+
+# Dedicated endpoints: (route, corpus inputs, form params). Multi-file routes use 'files'.
+ENDPOINT_CASES = [
+    ('/api/merge', ('text_heavy.pdf', 'many_pages.pdf'), {}),
+    ('/api/split', 'text_heavy.pdf', {'start_page': '1', 'end_page': '3'}),
+    ('/api/compress', 'image_heavy.pdf', {}),
+    ('/api/rotate', 'text_heavy.pdf', {'rotation': '90'}),
+    ('/api/watermark', 'text_heavy.pdf', {'watermark': 'CONFIDENTIAL'}),
+    ('/api/remove-pages', 'text_heavy.pdf', {'pages': '1,2'}),
+    ('/api/pdf-to-word', 'text_heavy.pdf', {}),
+    ('/api/pdf-to-text', 'text_heavy.pdf', {}),
+    ('/api/word-to-pdf', 'document.docx', {}),
+    ('/api/text-to-pdf', 'log.txt', {}),
+    ('/api/pdf-to-powerpoint', 'text_heavy.pdf', {}),
+    ('/api/powerpoint-to-pdf', 'deck.pptx', {}),
+    ('/api/excel-to-pdf', 'sheet.xlsx', {}),
+    ('/api/add-page-numbers', 'text_heavy.pdf', {}),
+    ('/api/repair-pdf', 'text_heavy.pdf', {}),
+]
+
+STATIC_ROUTES = ['/health', '/', '/api/operations', '/api/metrics']
+
+# Cases that shell out to LibreOffice are reported as skipped when it isn't installed
+LIBREOFFICE_FUNCTIONS = {'word_to_pdf', 'powerpoint_to_pdf', 'excel_to_pdf'}
+LIBREOFFICE_ROUTES = {'/api/word-to-pdf', '/api/powerpoint-to-pdf', '/api/excel-to-pdf'}
+
+
+# ===== HELPERS =====
+
+def _resolve_inputs(corpus, spec):
+    """Map a corpus spec (name, tuple of names, or 'photos') to file paths"""
+    if spec == 'photos':
+        return sorted(item['path'] for name, item in corpus.items() if name.startswith('photo_'))
+    if isinstance(spec, tuple):
+        return [corpus[name]['path'] for name in spec]
+    return corpus[spec]['path']
+
+
+def _input_stats(corpus, paths):
+    if not isinstance(paths, list):
+        paths = [paths]
+    by_path = {item['path']: item for item in corpus.values()}
+    total_bytes = sum(by_path[p]['bytes'] for p in paths)
+    pages = [by_path[p]['pages'] for p in paths]
+    total_pages = sum(pages) if all(p is not None for p in pages) else None
+    return total_bytes, total_pages
+
+
+def _output_stats(path):
+    if not path or not os.path.exists(path):
+        return None, None
+    size = os.path.getsize(path)
+    if path.endswith('.pdf'):
+        try:
+            import fitz
+            with fitz.open(path) as doc:
+                return size, doc.page_count
+        except Exception:
+            pass
+    return size, None
+
+
+def _current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+
+def _timed_runs(run_once, repeats):
+    """
+    Run a benchmark body once as warm-up and then `repeats` timed iterations
+
+    Args:
+        run_once: Callable returning the output path (or None)
+        repeats: Number of timed iterations
+
+    Returns:
+        Dict with timing, memory and output details
+    """
+    rss_before = _current_rss_mb()
+    output_path = run_once()
+    output_bytes, output_pages = _output_stats(output_path)
+
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_once()
+        durations.append(time.perf_counter() - start)
+
+    peak = _peak_rss_mb()
+    return {
+        'durations': durations,
+        'output_bytes': output_bytes,
+        'output_pages': output_pages,
+        'peak_rss_mb': round(peak, 2) if peak is not None else None,
+        'peak_rss_delta_mb': round(peak - rss_before, 2) if peak is not None and rss_before is not None else None,
+    }
+
+
+def _child_main(conn, run_factory, repeats):
+    try:
+        conn.send({'status': 'ok', **_timed_runs(run_factory(), repeats)})
+    except Exception as e:
+        conn.send({'status': 'error', 'error': str(e), 'traceback': traceback.format_exc(limit=5)})
+    finally:
+        conn.close()
+
+
+def _measure(run_factory, repeats, timeout):
+    """
+    Measure a case in a forked child so native memory peaks don't bleed between cases
+
+    Falls back to in-process measurement on platforms without fork.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        try:
+            return {'status': 'ok', **_timed_runs(run_factory(), repeats)}
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+
+    ctx = multiprocessing.get_context('fork')
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child_main, args=(child_conn, run_factory, repeats))
+    process.start()
+    child_conn.close()
+    if parent_conn.poll(timeout):
+        try:
+            result = parent_conn.recv()
+        except EOFError:
+            result = {'status': 'error', 'error': 'benchmark process exited without a result'}
+    else:
+        process.kill()
+        result = {'status': 'error', 'error': f'timed out after {timeout}s'}
+    process.join()
+    if process.exitcode not in (0, None) and result.get('status') == 'ok':
+        result = {'status': 'error', 'error': f'benchmark process exited with code {process.exitcode}'}
+    return result
+
+
+def _summarize(name, kind, result, input_bytes, input_pages):
+    entry = {'kind': kind, 'name': name, 'status': result['status']}
+    if result['status'] != 'ok':
+        entry['error'] = result.get('error')
+        return entry
+
+    durations = result['durations']
+    median = statistics.median(durations)
+    pages = input_pages or result.get('output_pages')
+    entry.update({
+        'repeats': len(durations),
+        'seconds': {
+            'min': round(min(durations), 6),
+            'median': round(median, 6),
+            'mean': round(statistics.mean(durations), 6),
+        },
+        'input_bytes': input_bytes,
+        'input_pages': input_pages,
+        'output_bytes': result.get('output_bytes'),
+        'output_pages': result.get('output_pages'),
+        'pages_per_s': round(pages / median, 3) if pages and median > 0 else None,
+        'mb_per_s': round(input_bytes / (1024 * 1024) / median, 3) if input_bytes and median > 0 else None,
+        'peak_rss_mb': result.get('peak_rss_mb'),
+        'peak_rss_delta_mb': result.get('peak_rss_delta_mb'),
+    })
+    return entry
+
+
+def _quiet_logging():
+    # pdf2docx and the app log every page/file at INFO, which drowns the report. pdf2docx is
+    # imported lazily and calls basicConfig(level=INFO); configuring first makes that a no-op
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+
+def _libreoffice_available():
+    return any(shutil.which(name) for name in ('libreoffice', 'soffice'))
+
+
+def _fresh_dir(root, name):
+    path = os.path.join(root, re.sub(r'[^A-Za-z0-9_.-]+', '_', name))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+# ===== CONVERTER BENCHMARKS =====
+
+def _converter_factory(function_name, inputs, extra_args, work_dir):
+    def factory():
+        from utils import pdf_converter
+        func = getattr(pdf_converter, function_name)
+        _quiet_logging()
+
+        def run_once():
+            out_dir = _fresh_dir(work_dir, 'out')
+            if not isinstance(inputs, list):
+                # Converters such as word_to_pdf derive names from the input; keep a private copy
+                source = os.path.join(work_dir, os.path.basename(inputs))
+                if not os.path.exists(source):
+                    shutil.copy(inputs, source)
+            else:
+                source = inputs
+            return func(source, out_dir, 'bench', *extra_args)
+        return run_once
+    return factory
+
+
+def run_converter_benchmarks(corpus, work_root, repeats, timeout, only=None):
+    results = []
+    for function_name, spec, extra_args in _converter_cases():
+        label = spec if isinstance(spec, str) else '+'.join(spec)
+        name = f"{function_name}[{label}]"
+        if only and not re.search(only, name):
+            continue
+        if function_name in LIBREOFFICE_FUNCTIONS and not _libreoffice_available():
+            entry = {'kind': 'converter', 'name': name, 'function': function_name,
+                     'status': 'skipped', 'error': 'LibreOffice is not installed'}
+            results.append(entry)
+            _print_entry(entry)
+            continue
+        inputs = _resolve_inputs(corpus, spec)
+        input_bytes, input_pages = _input_stats(corpus, inputs)
+        work_dir = _fresh_dir(work_root, name)
+        result = _measure(_converter_factory(function_name, inputs, extra_args, work_dir), repeats, timeout)
+        entry = _summarize(name, 'converter', result, input_bytes, input_pages)
+        entry['function'] = function_name
+        results.append(entry)
+        _print_entry(entry)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+# ===== HTTP BENCHMARKS =====
+
+def _load_app(work_dir):
+    # Benchmarks never talk to Azure; set before app import (load_dotenv won't override)
+    os.environ['USE_AZURE_STORAGE'] = 'false'
+    import app as app_module
+    _quiet_logging()
+    app_module.app.config['UPLOAD_FOLDER'] = os.path.join(work_dir, 'uploads')
+    app_module.app.config['OUTPUT_FOLDER'] = os.path.join(work_dir, 'outputs')
+    os.makedirs(app_module.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app_module.app.config['OUTPUT_FOLDER'], exist_ok=True)
+    return app_module.app
+
+
+def _form_data(paths, field, params):
+    data = dict(params)
+    paths = paths if isinstance(paths, list) else [paths]
+    files = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            files.append((io.BytesIO(f.read()), os.path.basename(path)))
+    data[field] = files if len(files) > 1 else files[0]
+    return data
+
+
+def _http_factory(route, inputs, field, params, work_dir):
+    def factory():
+        client = _load_app(work_dir).test_client()
+
+        def run_once():
+            response = client.post(route, data=_form_data(inputs, field, params),
+                                   content_type='multipart/form-data')
+            payload = response.get_json(silent=True) or {}
+            if response.status_code != 200 or 'download_url' not in payload:
+                raise Exception(f"{route} returned {response.status_code}: {payload.get('error')}")
+            download = client.get(payload['download_url'])
+            if download.status_code != 200:
+                raise Exception(f"download returned {download.status_code}")
+            output_path = os.path.join(work_dir, 'last_download' + os.path.splitext(payload['download_url'])[1])
+            with open(output_path, 'wb') as f:
+                f.write(download.data)
+            download.close()
+            return output_path
+        return run_once
+    return factory
+
+
+def _static_factory(route, work_dir, iterations=50):
+    def factory():
+        client = _load_app(work_dir).test_client()
+
+        def run_once():
+            for _ in range(iterations):
+                response = client.get(route)
+                if response.status_code != 200:
+                    raise Exception(f"{route} returned {response.status_code}")
+            return None
+        return run_once
+    return factory
+
+
+def run_http_benchmarks(corpus, work_root, repeats, timeout, only=None):
+    results = []
+    cases = [(f"POST /api/convert[{op}]", '/api/convert', spec, 'files', dict(params, operation=op),
+              op in LIBREOFFICE_FUNCTIONS)
+             for op, spec, params in CONVERT_CASES]
+    cases += [(f"POST {route}", route, spec, 'files' if isinstance(spec, tuple) else 'file', params,
+               route in LIBREOFFICE_ROUTES)
+              for route, spec, params in ENDPOINT_CASES]
+
+    for name, route, spec, field, params, needs_libreoffice in cases:
+        if only and not re.search(only, name):
+            continue
+        if needs_libreoffice and not _libreoffice_available():
+            entry = {'kind': 'http', 'name': name, 'status': 'skipped', 'error': 'LibreOffice is not installed'}
+            results.append(entry)
+            _print_entry(entry)
+            continue
+        inputs = _resolve_inputs(corpus, spec)
+        input_bytes, input_pages = _input_stats(corpus, inputs)
+        work_dir = _fresh_dir(work_root, name)
+        result = _measure(_http_factory(route, inputs, field, params, work_dir), repeats, timeout)
+        entry = _summarize(name, 'http', result, input_bytes, input_pages)
+        results.append(entry)
+        _print_entry(entry)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for route in STATIC_ROUTES:
+        name = f"GET {route} x50"
+        if only and not re.search(only, name):
+            continue
+        work_dir = _fresh_dir(work_root, name)
+        entry = _summarize(name, 'http', _measure(_static_factory(route, work_dir), repeats, timeout), None, None)
+        results.append(entry)
+        _print_entry(entry)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+# ===== STARTUP BENCHMARKS =====
+
+# Snippets timed in a fresh interpreter: (name, code run after the clock starts)
+STARTUP_CASES = [
+    ('import app', 'import app'),
+    ('import app + preload',
+     'import app\nfrom utils.pdf_converter import preload_dependencies\npreload_dependencies()'),
+]
+
+_STARTUP_TEMPLATE = '''
+import json, os, resource, sys, time
+os.environ['USE_AZURE_STORAGE'] = 'false'
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+json.dump({{'seconds': seconds, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}, sys.stdout)
+'''
+
+
+def _run_startup_case(code, repeats, timeout):
+    work_dir = tempfile.mkdtemp(prefix='pdf_toolkit_startup_')
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    samples = []
+    try:
+        # First run warms the OS page cache and .pyc files; it isn't recorded
+        for _ in range(repeats + 1):
+            completed = subprocess.run([sys.executable, '-c', _STARTUP_TEMPLATE.format(code=code)],
+                                       cwd=work_dir, env=env, capture_output=True, text=True, timeout=timeout)
+            if completed.returncode != 0:
+                return {'status': 'error', 'error': completed.stderr.strip()[-500:]}
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    samples = samples[1:]
+    peak = max(s['rss_kb'] for s in samples) / 1024
+    return {'status': 'ok', 'durations': [s['seconds'] for s in samples], 'peak_rss_mb': round(peak, 2)}
+
+
+def _pss_mb(pids):
+    """Proportional set size of a process tree; shared (copy-on-write) pages are split between processes"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                total += sum(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except OSError:
+            return None
+    return round(total / 1024, 2)
+
+
+def _gunicorn_pids(process):
+    try:
+        with open(f'/proc/{process.pid}/task/{process.pid}/children') as f:
+            return [process.pid] + [int(pid) for pid in f.read().split()]
+    except OSError:
+        return [process.pid]
+
+
+def _run_gunicorn_boot_case(workers, preload, repeats):
+    from benchmarks.load_test import start_server, stop_server
+
+    durations, pss = [], []
+    for _ in range(repeats):
+        work_dir = tempfile.mkdtemp(prefix='pdf_toolkit_boot_')
+        process = None
+        try:
+            start = time.perf_counter()
+            process, _ = start_server(work_dir, workers, 120, preload=preload)
+            durations.append(time.perf_counter() - start)
+            time.sleep(1)  # let every worker finish booting before sampling memory
+            pss.append(_pss_mb(_gunicorn_pids(process)))
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+        finally:
+            if process is not None:
+                stop_server(process)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {'status': 'ok', 'durations': durations,
+            'total_pss_mb': max(pss) if all(p is not None for p in pss) else None}
+
+
+def run_startup_benchmarks(repeats, timeout, only=None, workers=4):
+    """Time app import in a fresh interpreter and gunicorn boot until /health answers"""
+    results = []
+    for label, code in STARTUP_CASES:
+        name = f"startup[{label}]"
+        if only and not re.search(only, name):
+            continue
+        entry = _summarize(name, 'startup', _run_startup_case(code, repeats, timeout), None, None)
+        results.append(entry)
+        _print_entry(entry)
+
+    for preload in (False, True):
+        name = f"startup[gunicorn {workers} workers{' preload' if preload else ''}]"
+        if only and not re.search(only, name):
+            continue
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            entry = {'kind': 'startup', 'name': name, 'status': 'skipped', 'error': 'gunicorn is not installed'}
+        else:
+            result = _run_gunicorn_boot_case(workers, preload, repeats)
+            entry = _summarize(name, 'startup', result, None, None)
+            if result['status'] == 'ok':
+                entry['total_pss_mb'] = result['total_pss_mb']
+        results.append(entry)
+        _print_entry(entry)
+    return results
+
+
+# ===== REPORTING =====
+
+def _print_entry(entry):
+    if entry['status'] != 'ok':
+        print(f"  {entry['name']:<55} {entry['status'].upper()}: {entry.get('error')}")
+        return
+    extras = []
+    if entry.get('pages_per_s'):
+        extras.append(f"{entry['pages_per_s']:.1f} pages/s")
+    if entry.get('mb_per_s'):
+        extras.append(f"{entry['mb_per_s']:.2f} MB/s")
+    if entry.get('peak_rss_delta_mb') is not None:
+        extras.append(f"+{entry['peak_rss_delta_mb']:.1f} MB peak")
+    elif entry.get('peak_rss_mb') is not None:
+        extras.append(f"{entry['peak_rss_mb']:.1f} MB peak")
+    if entry.get('total_pss_mb') is not None:
+        extras.append(f"{entry['total_pss_mb']:.1f} MB PSS (all processes)")
+    print(f"  {entry['name']:<55} {entry['seconds']['median'] * 1000:10.1f} ms  {'  '.join(extras)}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _package_versions():
+    from importlib import metadata
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def compare_results(baseline, current):
+    """
+    Print median-time ratios between two result files (current / baseline)
+
+    Returns:
+        List of (name, baseline_seconds, current_seconds, ratio) for cases present in both
+    """
+    old = {e['name']: e for e in baseline['results'] if e['status'] == 'ok'}
+    rows = []
+    for entry in current['results']:
+        if entry['status'] != 'ok' or entry['name'] not in old:
+            continue
+        before = old[entry['name']]['seconds']['median']
+        after = entry['seconds']['median']
+        rows.append((entry['name'], before, after, after / before if before else None))
+
+    if baseline.get('corpus', {}).get('files') != current.get('corpus', {}).get('files'):
+        print("WARNING: corpus differs between runs; timings are not directly comparable")
+    print(f"\n{'case':<55} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for name, before, after, ratio in rows:
+        print(f"{name:<55} {before * 1000:10.1f} {after * 1000:10.1f} {ratio:7.2f}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark PDF Toolkit converters and HTTP endpoints')
+    parser.add_argument('--scale', choices=['quick', 'default'], default='default')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=3, help='timed iterations per case (after one warm-up)')
+    parser.add_argument('--timeout', type=int, default=600, help='seconds allowed per case')
+    parser.add_argument('--only', help='regex selecting case names to run')
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--skip-converters', action='store_true')
+    parser.add_argument('--skip-startup', action='store_true')
+    parser.add_argument('--corpus-dir', default=os.path.join(BACKEND_DIR, 'benchmarks', '.corpus'))
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    print(f"Building corpus ({args.scale}, seed={args.seed})...", file=sys.stderr)
+    corpus = build_corpus(args.corpus_dir, args.scale, args.seed)
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'started_at': datetime.now().isoformat(),
+        'environment': {
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'packages': _package_versions(),
+        },
+        'corpus': {
+            'version': CORPUS_VERSION,
+            'scale': args.scale,
+            'seed': args.seed,
+            'files': {name: {k: item[k] for k in ('bytes', 'pages', 'sha256')} for name, item in corpus.items()},
+        },
+        'settings': {'repeat': args.repeat, 'only': args.only},
+        'results': [],
+    }
+
+    work_root = tempfile.mkdtemp(prefix='pdf_toolkit_bench_')
+    # Keep stdout clean for the JSON report; progress goes to stderr
+    real_stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        if not args.skip_startup:
+            print("Startup:")
+            report['results'] += run_startup_benchmarks(args.repeat, args.timeout, args.only)
+        if not args.skip_converters:
+            print("Converters:")
+            report['results'] += run_converter_benchmarks(corpus, work_root, args.repeat, args.timeout, args.only)
+        if not args.skip_http:
+            print("HTTP endpoints:")
+            report['results'] += run_http_benchmarks(corpus, work_root, args.repeat, args.timeout, args.only)
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                compare_results(json.load(f), report)
+    finally:
+        sys.stdout = real_stdout
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    report['finished_at'] = datetime.now().isoformat()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+PDF Toolkit command line
+Runs any operation of the web app on local files, directories or glob patterns with
+a process pool and no HTTP in between. Outputs that are already up to date are
+skipped, so an interrupted run resumes by running it again (see utils/batch.py).
+
+Usage (from the backend directory):
+    python cli.py list
+    python cli.py pdf_to_text scans/ --out text/ --jobs 8
+    python cli.py reverse_pdf "inbox/**/*.pdf" --out reversed/
+    python cli.py pdf_to_text report.pdf --out text/ --param format=json
+    python cli.py add_watermark docs/ --out marked/ --param watermark=DRAFT --param watermark_image=logo.png
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils import batch  # noqa: E402
+from utils.operations import OPERATIONS  # noqa: E402
+
+
+def list_operations():
+    """Print every operation with its parameters"""
+    for operation in OPERATIONS.values():
+        print(f"{operation.id:20} {operation.accepts} -> {operation.produces}: {operation.description}")
+        for param in operation.params:
+            print(f"{'':22}--param {param.name}=...  {param.description}")
+        for upload in operation.uploads:
+            print(f"{'':22}--param {upload.name}=PATH  {upload.description}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run PDF Toolkit operations on local files in bulk')
+    parser.add_argument('operation', help="Operation id (e.g. pdf_to_text), or 'list' to show them all")
+    parser.add_argument('inputs', nargs='*', help='Input files, directories (searched recursively) or glob patterns')
+    parser.add_argument('--out', '-o', help='Output directory')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='Documents converted in parallel (default: CPU count)')
+    parser.add_argument('--param', '-p', action='append', default=[], metavar='NAME=VALUE',
+                        help='Operation parameter, repeatable')
+    parser.add_argument('--force', action='store_true', help='Convert inputs whose output is up to date too')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Only print failures and the summary')
+    args = parser.parse_args(argv)
+
+    if args.operation == 'list':
+        list_operations()
+        return 0
+    if not args.inputs:
+        parser.error('no inputs given')
+    if not args.out:
+        # Not the app's outputs/ folder: its cleanup removes files after an hour
+        parser.error('--out is required')
+
+    done = [0]
+
+    def on_result(job, status, detail):
+        done[0] += 1
+        name = job.inputs[0] if len(job.inputs) == 1 else f"{len(job.inputs)} inputs"
+        if status == 'failed':
+            print(f"[{done[0]}] FAILED {name}: {detail}", file=sys.stderr)
+        elif not args.quiet:
+            suffix = f" ({detail['seconds']:.2f}s)" if status == 'converted' else ''
+            print(f"[{done[0]}] {status} {name} -> {os.path.join(args.out, detail['output'])}{suffix}")
+
+    start = time.perf_counter()
+    try:
+        counts = batch.run(args.operation, args.inputs, args.out, params=args.param, jobs=args.jobs,
+                           force=args.force, on_result=on_result)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after {done[0]} documents; run the same command again to resume", file=sys.stderr)
+        return 130
+
+    print(f"{counts['converted']} converted, {counts['skipped']} up to date, {counts['failed']} failed "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for the PDF Toolkit API
+
+SERVER_MODE selects the worker model:
+    sync  - one request per worker process (default, matches the previous CMD)
+    async - gevent workers; each process multiplexes hundreds of uploads/downloads
+            and hands conversions to a native thread pool (utils/executor.py)
+
+Workers are recycled once their RSS or conversion count crosses the limits in
+utils/watchdog.py (WORKER_MAX_RSS_MB, WORKER_MAX_JOBS): post_request marks the worker
+as no longer alive, gunicorn finishes its in-flight requests (within graceful_timeout)
+and the arbiter starts a replacement.
+
+GUNICORN_PRELOAD=true imports the app and the optional converter dependencies
+(fitz, pdf2docx, reportlab, ...) once in the master, so forked workers share those
+pages copy-on-write and respawn without re-importing them. Without it, each worker
+imports dependencies lazily on the first request that needs them.
+"""
+
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'sync').lower()
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+# Time a recycled (or stopping) worker gets to finish its in-flight requests
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', str(timeout)))
+
+if SERVER_MODE == 'async':
+    worker_class = 'gevent'
+    # Concurrent connections per worker; conversions are bounded separately by CONVERSION_THREADS
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+    # Keep idle keep-alive connections around for clients polling downloads
+    keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+elif SERVER_MODE != 'sync':
+    raise ValueError(f"Unknown SERVER_MODE '{SERVER_MODE}' (expected 'sync' or 'async')")
+
+
+def on_starting(server):
+    if preload_app:
+        from utils.pdf_converter import preload_dependencies
+        available = preload_dependencies()
+        server.log.info(f"Preloaded converter dependencies: {available}")
+
+
+def post_fork(server, worker):
+    # Under GUNICORN_PRELOAD the watchdog was imported (and started counting) in the master
+    from utils import watchdog
+    watchdog.reset()
+    if preload_app:
+        # Threads started in the master don't survive fork
+        from app import start_cleanup_thread
+        start_cleanup_thread()
+
+
+def post_request(worker, req, environ, resp):
+    from utils import watchdog
+    reason = watchdog.recycle_reason()
+    if reason and worker.alive:
+        worker.log.warning(f"Recycling worker {worker.pid}: {reason}")
+        worker.alive = False
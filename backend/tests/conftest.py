@@ -0,0 +1,45 @@
+"""
+Shared test setup: tests import the backend's modules the way app.py does
+(from utils import ...), so the backend directory goes on sys.path.
+
+Run from the backend directory:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """
+    Factory for small PDFs: make_pdf(name, pages, image=False) writes one page per
+    entry of `pages` (its text), optionally drawing the same image on every page,
+    and returns the path
+    """
+    fitz = pytest.importorskip('fitz')
+
+    def make(name, pages, image=False):
+        doc = fitz.open()
+        png = None
+        if image:
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+            pixmap.set_rect(pixmap.irect, (200, 30, 30))
+            png = pixmap.tobytes('png')
+        for text in pages:
+            page = doc.new_page(width=300, height=400)
+            page.insert_text((40, 60), text, fontname='helv', fontsize=12)
+            if png:
+                page.insert_image(fitz.Rect(40, 100, 104, 164), stream=png)
+        path = tmp_path / name
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    return make
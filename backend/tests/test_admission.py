@@ -0,0 +1,125 @@
+"""Admission control: priority classes and weighted fair share between tenants"""
+
+import threading
+import time
+
+import pytest
+
+from utils import admission
+
+
+@pytest.fixture(autouse=True)
+def node(tmp_path, monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_DIR', str(tmp_path / 'admission'))
+    monkeypatch.setattr(admission, 'ADMISSION_BUDGET', 1.0)
+    monkeypatch.setattr(admission, 'ADMISSION_BATCH_AFTER', 0)
+    monkeypatch.setattr(admission, '_weights', {})
+    admission._local_state.clear()
+
+
+def _queue(requests):
+    """Enqueue (tenant, cost, priority) requests in arrival order; returns them in service order"""
+    state = admission._empty_state()
+    for number, (tenant, cost, priority) in enumerate(requests):
+        entry = {'pid': 1, 'cost': cost, 'since': number, 'tenant': tenant}
+        admission._enqueue(state, f"{tenant}{number}", entry, priority)
+    return [lease for lease, _ in sorted(state['waiting'].items(), key=lambda item: admission._order(item[1]))]
+
+
+def test_tenant_flooding_the_queue_doesnt_push_others_back():
+    order = _queue([('a', 1.0, None)] * 5 + [('b', 1.0, None), ('c', 1.0, None)])
+    assert order == ['a0', 'b5', 'c6', 'a1', 'a2', 'a3', 'a4']
+
+
+def test_share_follows_cost():
+    # b's requests are cheap, so it gets several in for each of a's
+    order = _queue([('a', 1.0, None)] * 3 + [('b', 0.25, None)] * 4)
+    assert order == ['a0', 'b3', 'b4', 'b5', 'b6', 'a1', 'a2']
+
+
+def test_share_follows_weight(monkeypatch):
+    monkeypatch.setattr(admission, '_weights', {'a': 2.0})
+    order = _queue([('a', 1.0, None)] * 4 + [('b', 1.0, None)] * 2)
+    assert order == ['a0', 'b4', 'a1', 'a2', 'b5', 'a3']
+
+
+def test_interactive_before_batch():
+    order = _queue([('a', 1.0, 'batch'), ('b', 1.0, 'batch'), ('c', 5.0, None), ('c', 5.0, None)])
+    assert order == ['c2', 'c3', 'a0', 'b1']
+
+
+def test_busy_tenants_are_demoted_to_batch(monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_BATCH_AFTER', 2)
+    state = admission._empty_state()
+    priorities = []
+    for number in range(4):
+        entry = {'pid': 1, 'cost': 1.0, 'since': number, 'tenant': 'a'}
+        admission._enqueue(state, f"a{number}", entry, None)
+        priorities.append(entry['priority'])
+    assert priorities == ['interactive', 'interactive', 'batch', 'batch']
+
+
+def test_tenant_ids_and_weights():
+    assert admission.tenant_id(address='10.0.0.1') == 'ip:10.0.0.1'
+    key = admission.tenant_id(api_key='secret')
+    assert key.startswith('key:') and 'secret' not in key
+    assert admission._parse_weights('secret=3, ip:10.0.0.1=0.5') == {key: 3.0, 'ip:10.0.0.1': 0.5}
+
+
+def _admit_in_order(requests):
+    """Queue requests behind a running one, free the node and return the admission order"""
+    blocker = admission.acquire(1.0, tenant='blocker')
+    admitted = []
+
+    def request(name, tenant, priority):
+        lease = admission.acquire(1.0, timeout=20, tenant=tenant, priority=priority)
+        admitted.append(name)
+        admission.release(lease)
+
+    threads = []
+    for name, tenant, priority in requests:
+        thread = threading.Thread(target=request, args=(name, tenant, priority))
+        thread.start()
+        threads.append(thread)
+        # Queued in this order
+        deadline = time.monotonic() + 5
+        while admission.load()['queued'] < len(threads) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    admission.release(blocker)
+    for thread in threads:
+        thread.join(30)
+    return admitted
+
+
+def test_queued_requests_are_admitted_in_fair_share_order():
+    order = _admit_in_order([('a1', 'a', None), ('a2', 'a', None), ('a3', 'a', None),
+                             ('b1', 'b', None), ('nightly', 'c', 'batch')])
+    assert order == ['a1', 'b1', 'a2', 'a3', 'nightly']
+    stats = admission.scheduling_stats()
+    assert stats['tenants']['a']['admitted'] == 3
+    assert stats['priorities']['batch']['admitted'] == 1
+    assert admission.load()['running'] == 0
+
+
+def test_full_tenant_queue_is_refused_without_charging_it(monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_TENANT_MAX_QUEUE', 0)
+    blocker = admission.acquire(1.0, tenant='blocker')
+    try:
+        with pytest.raises(admission.Overloaded) as error:
+            admission.acquire(1.0, timeout=5, tenant='a')
+        assert error.value.retry_after >= 1
+        assert error.value.load['rejected'] == 1
+        stats = admission.scheduling_stats()['tenants']['a']
+        assert stats['rejected'] == 1 and stats['queued'] == 0
+    finally:
+        admission.release(blocker)
+    # Its rejected request didn't cost it its place: it is admitted straight away
+    admission.release(admission.acquire(1.0, timeout=0, tenant='a'))
+
+
+def test_oversized_request_runs_on_an_idle_node():
+    lease = admission.acquire(50.0, timeout=0, tenant='a')
+    assert admission.load()['in_use'] == 50.0
+    with pytest.raises(admission.Overloaded):
+        admission.acquire(0.1, timeout=0.1, tenant='b')
+    admission.release(lease)
@@ -0,0 +1,136 @@
+"""Bulk conversions: manifest skip and resume, and the command line"""
+
+import json
+import os
+import time
+
+import pytest
+
+import cli
+from utils import batch
+
+
+@pytest.fixture
+def inputs(tmp_path, make_pdf):
+    folder = tmp_path / 'in'
+    (folder / 'sub').mkdir(parents=True)
+    for name in ('a.pdf', 'b.pdf', os.path.join('sub', 'c.pdf')):
+        os.replace(make_pdf('tmp.pdf', [name, 'second page']), folder / name)
+    (folder / 'notes.txt').write_text('not a PDF')
+    return folder
+
+
+def _run(inputs, out, results=None, **kwargs):
+    def on_result(job, status, detail):
+        if results is not None:
+            results.append((os.path.relpath(job.inputs[0], inputs), status))
+    kwargs.setdefault('params', ['rotation=180'])
+    return batch.run('rotate_pdf', [str(inputs)], str(out), jobs=1, on_result=on_result, **kwargs)
+
+
+def test_outputs_mirror_the_input_tree(inputs, tmp_path):
+    out = tmp_path / 'out'
+    assert _run(inputs, out) == {'converted': 3, 'skipped': 0, 'failed': 0}
+    assert sorted(os.path.relpath(os.path.join(root, name), out)
+                  for root, _, names in os.walk(out) for name in names) == [
+        batch.MANIFEST_NAME, 'a_rotated.pdf', 'b_rotated.pdf', os.path.join('sub', 'c_rotated.pdf')]
+    records = batch.load_manifest(str(out))
+    assert records['rotate_pdf:a.pdf']['output'] == 'a_rotated.pdf'
+
+
+def test_second_run_skips_up_to_date_outputs(inputs, tmp_path):
+    out = tmp_path / 'out'
+    _run(inputs, out)
+    assert _run(inputs, out) == {'converted': 0, 'skipped': 3, 'failed': 0}
+    assert _run(inputs, out, force=True)['converted'] == 3
+
+
+def test_changes_are_converted_again(inputs, tmp_path, make_pdf):
+    out = tmp_path / 'out'
+    _run(inputs, out)
+    os.replace(make_pdf('new.pdf', ['changed']), inputs / 'a.pdf')
+    os.remove(out / 'sub' / 'c_rotated.pdf')
+    results = []
+    assert _run(inputs, out, results)['converted'] == 2
+    assert sorted(results) == [('a.pdf', 'converted'), ('b.pdf', 'skipped'), (os.path.join('sub', 'c.pdf'), 'converted')]
+    # Other parameters are another output
+    assert _run(inputs, out, params=['rotation=90'])['converted'] == 3
+
+
+def test_touched_input_with_same_content_is_skipped(inputs, tmp_path):
+    out = tmp_path / 'out'
+    _run(inputs, out)
+    later = time.time() + 60
+    os.utime(inputs / 'b.pdf', (later, later))
+    assert _run(inputs, out)['skipped'] == 3
+    # The new mtime is recorded, so the next run needn't hash the file again
+    record = batch.load_manifest(str(out))['rotate_pdf:b.pdf']
+    assert record['inputs'][0]['mtime_ns'] == os.stat(inputs / 'b.pdf').st_mtime_ns
+
+
+def test_interrupted_run_resumes(inputs, tmp_path):
+    out = tmp_path / 'out'
+    done = []
+
+    def interrupt(job, status, detail):
+        done.append(job)
+        if len(done) == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        batch.run('rotate_pdf', [str(inputs)], str(out), jobs=1, on_result=interrupt)
+    # The manifest is saved on the way out; no half-written outputs are left behind
+    assert len(batch.load_manifest(str(out))) == 2
+    assert not [name for _, dirs, names in os.walk(out) for name in dirs + names if name.startswith('.batch.')]
+    assert _run(inputs, out, params=[]) == {'converted': 1, 'skipped': 2, 'failed': 0}
+
+
+def test_failures_are_counted_and_retried(inputs, tmp_path):
+    (inputs / 'broken.pdf').write_bytes(b'%PDF-1.4 not really')
+    out = tmp_path / 'out'
+    results = []
+    assert _run(inputs, out, results) == {'converted': 3, 'skipped': 0, 'failed': 1}
+    assert ('broken.pdf', 'failed') in results
+    assert 'rotate_pdf:broken.pdf' not in batch.load_manifest(str(out))
+    assert _run(inputs, out) == {'converted': 0, 'skipped': 3, 'failed': 1}
+
+
+def test_process_pool(inputs, tmp_path):
+    out = tmp_path / 'out'
+    counts = batch.run('rotate_pdf', [str(inputs)], str(out), params=['rotation=180'], jobs=2)
+    assert counts == {'converted': 3, 'skipped': 0, 'failed': 0}
+    assert _run(inputs, out)['skipped'] == 3
+
+
+def test_glob_patterns_and_multi_input_operations(inputs, tmp_path):
+    out = tmp_path / 'out'
+    counts = batch.run('merge_pdfs', [str(inputs / '**' / '*.pdf')], str(out), jobs=1)
+    assert counts['converted'] == 1
+    record = next(iter(batch.load_manifest(str(out)).values()))
+    assert record['output'] == 'a_merged.pdf' and len(record['inputs']) == 3
+
+
+@pytest.mark.parametrize('params, message', [
+    (['rotation=abc'], 'Invalid value for rotation'),
+    (['rotation'], 'NAME=VALUE'),
+    (['angle=90'], "Unknown parameter 'angle'"),
+])
+def test_bad_parameters(inputs, tmp_path, params, message):
+    with pytest.raises(ValueError, match=message):
+        _run(inputs, tmp_path / 'out', params=params)
+
+
+def test_cli(inputs, tmp_path, capsys):
+    out = str(tmp_path / 'out')
+    assert cli.main(['rotate_pdf', str(inputs), '--out', out, '-p', 'rotation=270', '-q']) == 0
+    assert '3 converted, 0 up to date, 0 failed' in capsys.readouterr().out
+    assert cli.main(['rotate_pdf', str(inputs), '--out', out, '-p', 'rotation=270']) == 0
+    assert '0 converted, 3 up to date' in capsys.readouterr().out
+    with open(os.path.join(out, batch.MANIFEST_NAME)) as f:
+        assert len(json.load(f)['jobs']) == 3
+
+
+def test_cli_rejects_unparseable_values(inputs, tmp_path, capsys):
+    assert cli.main(['rotate_pdf', str(inputs), '--out', str(tmp_path / 'out'), '-p', 'rotation=abc']) == 2
+    assert 'Invalid value for rotation' in capsys.readouterr().err
+    assert not (tmp_path / 'out').exists()
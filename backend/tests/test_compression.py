@@ -0,0 +1,97 @@
+"""Content-Encoding negotiation and precompressed copies"""
+
+import gzip
+import os
+import time
+
+import pytest
+
+from utils import compression
+
+
+@pytest.fixture
+def all_encodings(monkeypatch):
+    """Pretend Brotli and Zstandard are installed (negotiation only checks they are)"""
+    monkeypatch.setattr(compression, 'brotli', compression.brotli or object())
+    monkeypatch.setattr(compression, 'zstandard', compression.zstandard or object())
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br, zstd', 'br'),          # server preference breaks ties
+    ('gzip, zstd', 'zstd'),
+    ('br;q=0.5, gzip;q=0.8', 'gzip'),           # client quality wins
+    ('BR', 'br'),
+    ('*', 'br'),
+    ('*;q=0.1, gzip;q=0', 'br'),
+    ('br;q=0, zstd;q=0, gzip;q=0', None),
+    ('gzip;q=abc', None),                       # unparseable quality counts as refused
+    ('deflate', None),
+    ('identity', None),
+    ('', None),
+    (None, None),
+])
+def test_negotiate(all_encodings, header, expected):
+    assert compression.negotiate(header) == expected
+
+
+def test_negotiate_only_offers_installed_encodings(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    monkeypatch.setattr(compression, 'zstandard', None)
+    assert compression.available_encodings() == ['gzip']
+    assert compression.negotiate('br, zstd, gzip;q=0.1') == 'gzip'
+    assert compression.negotiate('br, zstd') is None
+
+
+@pytest.mark.parametrize('mimetype, expected', [
+    ('text/plain', True),
+    ('application/json', True),
+    ('image/svg+xml', True),
+    ('application/pdf', False),
+    ('image/png', False),
+    (None, False),
+])
+def test_compressible(mimetype, expected):
+    assert compression.compressible(mimetype) is expected
+
+
+def test_precompressed_copy_is_made_once(tmp_path):
+    source = tmp_path / 'out.txt'
+    source.write_text('all work and no play\n' * 500)
+    target = compression.precompressed(str(source), 'gzip')
+    assert target == str(source) + '.gz'
+    with gzip.open(target, 'rb') as f:
+        assert f.read() == source.read_bytes()
+    made = os.path.getmtime(target)
+    assert compression.precompressed(str(source), 'gzip') == target
+    assert os.path.getmtime(target) == made
+    # A newer source is compressed again
+    future = time.time() + 10
+    os.utime(source, (future, future))
+    assert compression.precompressed(str(source), 'gzip') == target
+    assert os.path.getmtime(target) > made
+
+
+def test_precompressed_skips_incompressible_files(tmp_path):
+    source = tmp_path / 'random.txt'
+    source.write_bytes(os.urandom(4096))
+    assert compression.precompressed(str(source), 'gzip') is None
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.compress.')]
+
+
+@pytest.mark.parametrize('encoding, module', [('gzip', None), ('br', 'brotli'), ('zstd', 'zstandard')])
+def test_compress_bytes_round_trips(encoding, module):
+    data = b'{"pages": []}' * 200
+    if module is None:
+        assert gzip.decompress(compression.compress_bytes(data, encoding)) == data
+        return
+    library = pytest.importorskip(module)
+    compressed = compression.compress_bytes(data, encoding)
+    if module == 'brotli':
+        assert library.decompress(compressed) == data
+    else:
+        assert library.ZstdDecompressor().decompress(compressed) == data
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError, match='Unsupported encoding'):
+        compression.compress_bytes(b'x', 'deflate')
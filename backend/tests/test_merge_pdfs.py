@@ -0,0 +1,89 @@
+"""Merge PDFs: the streaming object copier"""
+
+import os
+
+import pytest
+from PyPDF2 import PdfReader
+
+from utils.pdf_converter import merge_pdfs
+
+fitz = pytest.importorskip('fitz')
+
+
+def _texts(path):
+    with fitz.open(path) as doc:
+        assert not doc.is_repaired
+        return [page.get_text().strip() for page in doc]
+
+
+def _image_xrefs(path):
+    with fitz.open(path) as doc:
+        return {image[0] for page in doc for image in page.get_images()}
+
+
+def test_pages_are_copied_in_order(tmp_path, make_pdf):
+    first = make_pdf('a.pdf', ['A1', 'A2'])
+    second = make_pdf('b.pdf', ['B1', 'B2', 'B3'])
+    output = merge_pdfs([first, second], str(tmp_path), 'merged')
+    assert output == os.path.join(str(tmp_path), 'merged_merged.pdf')
+    assert _texts(output) == ['A1', 'A2', 'B1', 'B2', 'B3']
+    assert len(PdfReader(output, strict=True).pages) == 5
+
+
+def test_identical_objects_are_written_once(tmp_path, make_pdf):
+    source = make_pdf('a.pdf', ['one', 'two'], image=True)
+    output = merge_pdfs([source, source, source], str(tmp_path), 'merged')
+    assert _texts(output) == ['one', 'two'] * 3
+    # The image is stored once and shared by all six pages
+    assert len(_image_xrefs(output)) == 1
+    assert os.path.getsize(output) < 2 * os.path.getsize(source)
+
+
+def test_inherited_page_attributes_are_kept(tmp_path, make_pdf):
+    source = make_pdf('a.pdf', ['rotated'])
+    with fitz.open(source) as doc:
+        # Move the rotation from the page to its page tree node
+        pages_root = int(doc.xref_get_key(doc.pdf_catalog(), 'Pages')[1].split()[0])
+        doc.xref_set_key(pages_root, 'Rotate', '90')
+        doc.xref_set_key(doc[0].xref, 'Rotate', 'null')
+        doc.save(str(tmp_path / 'inherited.pdf'))
+    output = merge_pdfs([str(tmp_path / 'inherited.pdf'), make_pdf('b.pdf', ['plain'])], str(tmp_path), 'merged')
+    with fitz.open(output) as doc:
+        assert [page.rotation for page in doc] == [90, 0]
+
+
+def test_links_between_pages_survive(tmp_path, make_pdf):
+    source = make_pdf('a.pdf', ['from', 'to'])
+    with fitz.open(source) as doc:
+        doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(40, 40, 120, 70), 'page': 1})
+        doc.save(str(tmp_path / 'linked.pdf'))
+    output = merge_pdfs([make_pdf('b.pdf', ['first']), str(tmp_path / 'linked.pdf')], str(tmp_path), 'merged')
+    with fitz.open(output) as doc:
+        assert [link['page'] for link in doc[1].get_links()] == [2]
+
+
+def test_modes_agree(tmp_path, make_pdf):
+    inputs = [make_pdf('a.pdf', ['A1']), make_pdf('b.pdf', ['B1', 'B2'])]
+    stream = merge_pdfs(inputs, str(tmp_path), 'stream', mode='stream')
+    pypdf2 = merge_pdfs(inputs, str(tmp_path), 'pypdf2', mode='pypdf2')
+    assert _texts(stream) == _texts(pypdf2)
+
+
+def test_progress_is_reported_per_input(tmp_path, make_pdf):
+    calls = []
+    inputs = [make_pdf('a.pdf', ['A']), make_pdf('b.pdf', ['B'])]
+    merge_pdfs(inputs, str(tmp_path), 'merged', progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(1, 2), (2, 2)]
+
+
+def test_encrypted_input_is_rejected(tmp_path, make_pdf):
+    source = make_pdf('a.pdf', ['secret'])
+    with fitz.open(source) as doc:
+        doc.save(str(tmp_path / 'locked.pdf'), encryption=fitz.PDF_ENCRYPT_AES_256, user_pw='pw', owner_pw='pw')
+    with pytest.raises(Exception, match='password protected'):
+        merge_pdfs([str(tmp_path / 'locked.pdf'), source], str(tmp_path), 'merged')
+
+
+def test_unknown_mode_is_rejected(tmp_path, make_pdf):
+    with pytest.raises(Exception, match='mode must be one of'):
+        merge_pdfs([make_pdf('a.pdf', ['A'])], str(tmp_path), 'merged', mode='zip')
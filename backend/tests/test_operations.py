@@ -0,0 +1,54 @@
+"""Operation registry: parameter parsing"""
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from utils.operations import OPERATIONS, ParamError, get_operation, parse_page_list, parse_page_ranges
+
+
+def test_defaults_for_missing_params():
+    params = get_operation('split_pdf').parse_params(MultiDict())
+    assert params['start_page'] == 1
+    assert params['end_page'] == 1
+    assert params['mode'] == 'range'
+
+
+def test_values_are_parsed_by_param_type():
+    params = get_operation('add_watermark').parse_params(
+        MultiDict({'watermark': 'DRAFT', 'opacity': '0.5', 'rotation': '45'}))
+    assert params == {'watermark_text': 'DRAFT', 'opacity': 0.5, 'rotation': 45}
+
+
+def test_page_lists_and_ranges():
+    assert parse_page_list('1, 3,5,') == [1, 3, 5]
+    assert parse_page_ranges('1-3, 4-10,11') == [(1, 3), (4, 10), (11, 11)]
+    params = get_operation('remove_pages').parse_params(MultiDict({'pages': '2,4'}))
+    assert params == {'pages_to_remove': [2, 4]}
+
+
+def test_blank_typed_params_take_default_but_blank_strings_are_kept():
+    params = get_operation('add_watermark').parse_params(
+        MultiDict({'watermark': '', 'opacity': '', 'rotation': ' '}))
+    assert params == {'watermark_text': '', 'opacity': 1.0, 'rotation': 0}
+
+
+@pytest.mark.parametrize('operation_id, name, value', [
+    ('rotate_pdf', 'rotation', 'abc'),        # int: no silent fallback to the default
+    ('add_watermark', 'opacity', 'half'),     # float
+    ('remove_pages', 'pages', '1,x'),         # parse_page_list
+    ('split_pdf', 'ranges', '1-x'),           # parse_page_ranges
+])
+def test_unparseable_values_name_the_param(operation_id, name, value):
+    with pytest.raises(ParamError, match=f"Invalid value for {name}"):
+        get_operation(operation_id).parse_params(MultiDict({name: value}))
+
+
+def test_param_error_is_a_value_error():
+    assert issubclass(ParamError, ValueError)
+
+
+def test_registry_entries_are_consistent():
+    for operation in OPERATIONS.values():
+        assert operation.resolve_converter() is not None
+        args = [param.arg for param in operation.params] + [upload.arg for upload in operation.uploads]
+        assert len(args) == len(set(args)), operation.id
@@ -0,0 +1,258 @@
+"""Sandboxed conversions: resource limits and process cleanup"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from utils import executor
+from utils.handoff import Handoff
+from utils.executor import JobLimitError, JobMemoryError, map_page_ranges, map_pages_isolated, run_conversion
+
+pytestmark = pytest.mark.skipif(executor.resource is None, reason='needs POSIX resource limits')
+
+
+@pytest.fixture(autouse=True, scope='module')
+def close_sandboxes():
+    yield
+    executor._close_sandboxes()
+
+
+# Jobs are module-level so the sandbox can unpickle them
+
+def add(a, b):
+    return a + b
+
+
+def fail():
+    raise ValueError("bad page")
+
+
+def allocate(megabytes):
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+def spin():
+    while True:
+        pass
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+def write(path, megabytes):
+    try:
+        with open(path, 'wb') as f:
+            for _ in range(megabytes):
+                f.write(b'\0' * 1024 * 1024)
+    except Exception as e:
+        raise Exception(f"Writing failed: {str(e)}") from e
+
+
+def crash():
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+
+def salvage(page):
+    if page == 1:
+        time.sleep(30)
+    if page == 2:
+        raise ValueError("bad page")
+    return os.getpid()
+
+
+def _range_process(seconds, start, stop):
+    time.sleep(seconds)
+    return os.getpid(), os.getppid(), executor.resource.getrlimit(executor.resource.RLIMIT_AS)[0]
+
+
+def page_parallel_job(workers, seconds=0, pid_file=None):
+    """What a page-parallel converter does; returns (own pid, (pid, parent, memory limit) per range)"""
+    if pid_file:
+        with open(pid_file, 'w') as f:
+            f.write(str(os.getpid()))
+    executor.PAGE_WORKERS = workers
+    return os.getpid(), set(map_page_ranges(_range_process, 100, seconds, workers=workers, parts=8))
+
+
+def checksum(data):
+    return len(data), sum(data[::4096])
+
+
+def repeat(size):
+    return b'\x07' * size
+
+
+def _leave_segments(handoff, start, stop):
+    return [handoff.put(b'\0' * 256 * 1024) for _ in range(start, stop)]
+
+
+def leaky_job(outcome, report_path):
+    """Page processes leave segments that are never taken; then succeed, fail or hang"""
+    handoff = Handoff()
+    executor.PAGE_WORKERS = 2
+    map_page_ranges(_leave_segments, 8, handoff, workers=2)
+    with open(report_path, 'w') as f:
+        f.write(str(len(_segments())))
+    if outcome == 'fail':
+        raise ValueError("bad page")
+    if outcome == 'hang':
+        time.sleep(30)
+    return 'done'
+
+
+def _segments():
+    return [name for name in os.listdir('/dev/shm') if name.startswith('ptk_')]
+
+
+def _process_group(pgid):
+    members = []
+    for pid in os.listdir('/proc'):
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                if int(f.read().rsplit(')', 1)[1].split()[2]) == pgid:
+                    members.append(int(pid))
+        except (OSError, ValueError, IndexError):
+            pass
+    return members
+
+
+def _wait_gone(pgid):
+    deadline = time.monotonic() + 5
+    while _process_group(pgid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return _process_group(pgid)
+
+
+def test_result_and_errors_come_back():
+    assert run_conversion(add, 2, b=3, executor='sandbox') == 5
+    with pytest.raises(ValueError, match='bad page'):
+        run_conversion(fail, executor='sandbox')
+
+
+def test_memory_limit(monkeypatch):
+    monkeypatch.setattr(executor, 'JOB_MEMORY_LIMIT_MB', 1024)
+    with pytest.raises(JobMemoryError, match='1024 MB memory limit'):
+        run_conversion(allocate, 2048, executor='sandbox')
+    # Only that job was limited: the next one gets a fresh sandbox
+    assert run_conversion(allocate, 64, executor='sandbox') == 64 * 1024 * 1024
+
+
+def test_cpu_limit(monkeypatch):
+    monkeypatch.setattr(executor, 'SANDBOX_CPU_SECONDS', 1)
+    with pytest.raises(JobLimitError, match='1s CPU time limit'):
+        run_conversion(spin, executor='sandbox')
+
+
+def test_wall_clock_limit(monkeypatch):
+    monkeypatch.setattr(executor, 'SANDBOX_TIMEOUT', 0.5)
+    start = time.monotonic()
+    with pytest.raises(JobLimitError, match='0.5s time limit'):
+        run_conversion(sleep, 30, executor='sandbox')
+    assert time.monotonic() - start < 10
+
+
+def test_file_size_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, 'SANDBOX_FILE_SIZE_MB', 1)
+    with pytest.raises(JobLimitError, match='1 MB output file limit'):
+        run_conversion(write, str(tmp_path / 'big.bin'), 4, executor='sandbox')
+
+
+def test_crash_is_reported():
+    with pytest.raises(Exception, match=r'crashed \(SIGSEGV\)'):
+        run_conversion(crash, executor='sandbox')
+
+
+def test_page_work_fans_out_under_the_sandbox_limits(monkeypatch):
+    monkeypatch.setattr(executor, 'JOB_MEMORY_LIMIT_MB', 1536)
+    pid, ranges = run_conversion(page_parallel_job, 3, 0.05, executor='sandbox')
+    assert pid != os.getpid()
+    # The ranges ran in page processes forked from the sandbox, each under its memory limit
+    assert len({range_pid for range_pid, _, _ in ranges}) > 1
+    assert all(range_pid != pid and parent == pid for range_pid, parent, _ in ranges)
+    assert {limit for _, _, limit in ranges} == {1536 * 1024 * 1024}
+    # Neither the sandbox nor its page processes outlive the job
+    assert _wait_gone(pid) == []
+
+
+def test_killed_job_takes_its_page_processes_with_it(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, 'SANDBOX_TIMEOUT', 2)
+    pid_file = tmp_path / 'sandbox.pid'
+    with pytest.raises(JobLimitError, match='2s time limit'):
+        run_conversion(page_parallel_job, 3, 30, str(pid_file), executor='sandbox')
+    assert _wait_gone(int(pid_file.read_text())) == []
+
+
+def test_pooled_sandboxes_survive_in_gevent_workers():
+    pytest.importorskip('gevent')
+    script = (
+        "from gevent import monkey; monkey.patch_all()\n"
+        "import time\n"
+        "from utils import executor\n"
+        "assert executor.run_conversion(max, 1, 2, executor='sandbox') == 2\n"
+        "time.sleep(1)\n"
+        "print(sum(process.is_alive() for process, _ in executor._sandboxes))\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=backend, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == [str(executor.SANDBOX_POOL_SIZE)]
+    assert 'BlockingIOError' not in result.stderr
+
+
+def test_concurrent_refills_stay_within_the_pool_size(monkeypatch):
+    def start_sandbox():
+        time.sleep(0.05)
+        return object(), object()
+
+    monkeypatch.setattr(executor, '_sandboxes', deque())
+    monkeypatch.setattr(executor, '_start_sandbox', start_sandbox)
+    monkeypatch.setattr(executor, 'SANDBOX_POOL_SIZE', 2)
+    threads = [threading.Thread(target=executor._refill_sandboxes) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(executor._sandboxes) == 2
+    assert executor._sandboxes_starting == 0
+
+
+def test_isolated_pages_have_deadlines_under_gevent(monkeypatch):
+    # Gevent workers can't wait on page processes from a conversion thread, so each page
+    # gets a sandbox of its own
+    monkeypatch.setattr(executor, '_gevent_active', lambda: True)
+    start = time.monotonic()
+    outcomes = map_pages_isolated(salvage, [0, 1, 2, 3], timeout=1)
+    assert time.monotonic() - start < 10
+    assert outcomes[1] == ('timeout', 'no result after 1s')
+    assert outcomes[2] == ('error', 'bad page')
+    assert outcomes[0][0] == outcomes[3][0] == 'ok'
+    assert os.getpid() not in (outcomes[0][1], outcomes[3][1])
+
+
+def test_large_arguments_and_results_go_through_shared_memory():
+    data = bytes(range(256)) * 4096
+    assert run_conversion(checksum, data, executor='sandbox') == checksum(data)
+    assert run_conversion(repeat, 1024 * 1024, executor='sandbox') == b'\x07' * 1024 * 1024
+    assert _segments() == []
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs /dev/shm to list segments')
+@pytest.mark.parametrize('outcome', ['succeed', 'fail', 'hang'])
+def test_segments_a_job_leaves_are_freed(outcome, monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, 'SANDBOX_TIMEOUT', 3)
+    report = tmp_path / 'segments'
+    if outcome == 'succeed':
+        assert run_conversion(leaky_job, outcome, str(report), executor='sandbox') == 'done'
+    else:
+        with pytest.raises(Exception, match='bad page' if outcome == 'fail' else '3s time limit'):
+            run_conversion(leaky_job, outcome, str(report), executor='sandbox')
+    # The page processes did leave them behind, and the job's owner freed them
+    assert int(report.read_text()) == 8
+    assert _segments() == []
@@ -0,0 +1,126 @@
+"""Single-flight deduplication of identical conversions"""
+
+import threading
+import time
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from utils import singleflight
+from utils.operations import get_operation
+
+pytestmark = pytest.mark.skipif(singleflight.fcntl is None, reason='needs fcntl')
+
+
+@pytest.fixture(autouse=True)
+def singleflight_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, 'SINGLEFLIGHT_DIR', str(tmp_path / 'singleflight'))
+
+
+def test_request_key_covers_operation_params_and_content(tmp_path):
+    a = tmp_path / 'a.pdf'
+    b = tmp_path / 'b.pdf'
+    a.write_bytes(b'same')
+    b.write_bytes(b'same')
+    rotate = get_operation('rotate_pdf')
+    key = singleflight.request_key(rotate, MultiDict({'rotation': '90'}), [str(a)])
+    # Same content under another name is the same conversion
+    assert singleflight.request_key(rotate, MultiDict({'rotation': '90'}), [str(b)]) == key
+    assert singleflight.request_key(rotate, MultiDict({'rotation': '180'}), [str(a)]) != key
+    assert singleflight.request_key(get_operation('compress_pdf'), MultiDict(), [str(a)]) != key
+    b.write_bytes(b'different')
+    assert singleflight.request_key(rotate, MultiDict({'rotation': '90'}), [str(b)]) != key
+
+
+def _start(key, compute, results, **kwargs):
+    thread = threading.Thread(target=lambda: results.append(singleflight.run(key, compute, **kwargs)))
+    thread.start()
+    return thread
+
+
+def test_concurrent_identical_requests_compute_once():
+    release = threading.Event()
+    calls = []
+    waits = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'outputs/result.pdf'
+
+    results = []
+    first = _start('k', compute, results)
+    while not calls:
+        time.sleep(0.01)
+    resumes = []
+    others = [_start('k', compute, results, on_wait=lambda: waits.append(1), on_resume=lambda: resumes.append(1))
+              for _ in range(3)]
+    time.sleep(0.1)
+    release.set()
+    for thread in [first] + others:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(waits) == 3
+    # Sharing the result doesn't need back what was given up to wait
+    assert resumes == []
+    assert sorted(results) == [('outputs/result.pdf', False)] + [('outputs/result.pdf', True)] * 3
+
+
+def test_later_requests_convert_again():
+    assert singleflight.run('k', lambda: 'first') == ('first', False)
+    assert singleflight.run('k', lambda: 'second') == ('second', False)
+
+
+def test_request_that_arrived_while_running_shares_the_result():
+    arrived = time.time()
+    singleflight.run('k', lambda: 'first')
+    # e.g. it was queued for admission while the first one ran
+    assert singleflight.run('k', lambda: 'second', since=arrived) == ('first', True)
+
+
+def test_waiter_runs_itself_when_the_first_request_fails():
+    release = threading.Event()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        return None
+
+    results = []
+    events = []
+    first = _start('k', failing, results)
+    started.wait(5)
+    second = _start('k', lambda: events.append('compute') or 'retried', results, since=time.time(),
+                    on_wait=lambda: events.append('wait'), on_resume=lambda: events.append('resume'))
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert sorted(results, key=str) == [('retried', False), (None, False)]
+    # What was given up to wait is taken back before converting
+    assert events == ['wait', 'resume', 'compute']
+
+
+def test_waiter_gives_up_after_the_timeout():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    results = []
+    first = _start('k', slow, results)
+    started.wait(5)
+    begin = time.monotonic()
+    events = []
+    assert singleflight.run('k', lambda: events.append('compute') or 'own', timeout=0.2,
+                            on_wait=lambda: events.append('wait'),
+                            on_resume=lambda: events.append('resume')) == ('own', False)
+    assert time.monotonic() - begin < 2
+    assert events == ['wait', 'resume', 'compute']
+    release.set()
+    first.join(5)
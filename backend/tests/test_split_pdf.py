@@ -0,0 +1,96 @@
+"""Split PDF: single ranges and multi-part splits written by the object copier"""
+
+import zipfile
+
+import pytest
+
+from utils import executor
+from utils.pdf_converter import split_pdf
+
+fitz = pytest.importorskip('fitz')
+
+
+def _parts(zip_path):
+    """{part name: [page texts]} of a split ZIP"""
+    parts = {}
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in archive.namelist():
+            with fitz.open(stream=archive.read(name), filetype='pdf') as doc:
+                assert not doc.is_repaired, name
+                parts[name] = [page.get_text().strip() for page in doc]
+    return parts
+
+
+@pytest.fixture
+def ten_pages(make_pdf):
+    return make_pdf('ten.pdf', [f"P{number}" for number in range(1, 11)], image=True)
+
+
+def test_range_extracts_one_pdf(tmp_path, ten_pages):
+    output = split_pdf(ten_pages, str(tmp_path), 'split', start_page=3, end_page=5)
+    with fitz.open(output) as doc:
+        assert [page.get_text().strip() for page in doc] == ['P3', 'P4', 'P5']
+
+
+def test_ranges(tmp_path, ten_pages):
+    output = split_pdf(ten_pages, str(tmp_path), 'split', mode='ranges', ranges=[(1, 3), (4, 4), (5, 10)])
+    assert _parts(output) == {
+        'part_001_p1-3.pdf': ['P1', 'P2', 'P3'],
+        'part_002_p4-4.pdf': ['P4'],
+        'part_003_p5-10.pdf': [f"P{number}" for number in range(5, 11)],
+    }
+
+
+def test_every(tmp_path, ten_pages):
+    parts = _parts(split_pdf(ten_pages, str(tmp_path), 'split', mode='every', every=4))
+    assert [len(pages) for _, pages in sorted(parts.items())] == [4, 4, 2]
+
+
+def test_bookmarks(tmp_path, ten_pages):
+    with fitz.open(ten_pages) as doc:
+        doc.set_toc([[1, 'Intro: part/one', 2], [2, 'Detail', 3], [1, 'Appendix', 7]])
+        doc.saveIncr()
+    parts = _parts(split_pdf(ten_pages, str(tmp_path), 'split', mode='bookmarks'))
+    assert sorted(parts) == ['part_001_front_matter.pdf', 'part_002_Intro_partone.pdf', 'part_003_Appendix.pdf']
+    assert parts['part_002_Intro_partone.pdf'] == ['P2', 'P3', 'P4', 'P5', 'P6']
+
+
+def test_links_out_of_a_part_are_dropped(tmp_path, make_pdf):
+    source = make_pdf('linked.pdf', ['from', 'to'])
+    with fitz.open(source) as doc:
+        doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(40, 40, 120, 70), 'page': 1})
+        doc.saveIncr()
+    parts = _parts(split_pdf(source, str(tmp_path), 'split', mode='every', every=1))
+    assert parts == {'part_001_p1-1.pdf': ['from'], 'part_002_p2-2.pdf': ['to']}
+
+
+def test_parts_share_nothing_across_files(tmp_path, ten_pages):
+    # Every part carries its own copy of the shared image
+    output = split_pdf(ten_pages, str(tmp_path), 'split', mode='every', every=5)
+    with zipfile.ZipFile(output) as archive:
+        for name in archive.namelist():
+            with fitz.open(stream=archive.read(name), filetype='pdf') as doc:
+                assert len({image[0] for page in doc for image in page.get_images()}) == 1
+
+
+def test_parallel_parts_match_inline(tmp_path, ten_pages, monkeypatch):
+    inline = _parts(split_pdf(ten_pages, str(tmp_path), 'inline', mode='every', every=1))
+    monkeypatch.setattr(executor, 'PAGE_WORKERS', 2)
+    monkeypatch.setattr(executor, 'PARALLEL_MIN_PAGES', 2)
+    progress = []
+    parallel = _parts(split_pdf(ten_pages, str(tmp_path), 'parallel', mode='every', every=1,
+                                progress=lambda done, total: progress.append((done, total))))
+    assert parallel == inline
+    assert progress[-1] == (10, 10)
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'mode': 'ranges', 'ranges': [(2, 11)]}, 'outside pages 1-10'),
+    ({'mode': 'ranges', 'ranges': []}, 'ranges is required'),
+    ({'mode': 'every', 'every': 0}, 'positive number of pages'),
+    ({'mode': 'bookmarks'}, 'no top-level bookmarks'),
+    ({'mode': 'chapters'}, 'mode must be one of'),
+])
+def test_invalid_splits(tmp_path, ten_pages, kwargs, message):
+    with pytest.raises(Exception, match=message):
+        split_pdf(ten_pages, str(tmp_path), 'split', **kwargs)
@@ -0,0 +1,69 @@
+"""Text to PDF: the streaming native writer"""
+
+import pytest
+from PyPDF2 import PdfReader
+
+from utils.pdf_converter import _TEXT_LINES_PER_PAGE, text_to_pdf
+
+fitz = pytest.importorskip('fitz')
+
+
+def _convert(tmp_path, text, backend='native'):
+    source = tmp_path / 'input.txt'
+    source.write_text(text, encoding='utf-8')
+    return text_to_pdf(str(source), str(tmp_path), backend, backend=backend)
+
+
+def test_native_output_is_a_well_formed_pdf(tmp_path):
+    output = _convert(tmp_path, 'Hello\nWorld\n')
+    # A valid xref table: PyMuPDF doesn't have to repair the file and strict PyPDF2 reads it
+    with fitz.open(output) as doc:
+        assert not doc.is_repaired
+        assert doc.page_count == 1
+        assert doc[0].get_text().split() == ['Hello', 'World']
+    reader = PdfReader(output, strict=True)
+    assert len(reader.pages) == 1
+
+
+def test_lines_flow_onto_new_pages(tmp_path):
+    lines = [f"line {number}" for number in range(_TEXT_LINES_PER_PAGE * 2 + 1)]
+    output = _convert(tmp_path, '\n'.join(lines))
+    with fitz.open(output) as doc:
+        assert doc.page_count == 3
+        assert doc[0].get_text().splitlines()[0] == 'line 0'
+        assert doc[2].get_text().split() == ['line', str(len(lines) - 1)]
+
+
+def test_pdf_string_delimiters_are_escaped(tmp_path):
+    output = _convert(tmp_path, 'f(x) = a\\b (see note)\ncafé\n')
+    with fitz.open(output) as doc:
+        assert doc[0].get_text().splitlines() == ['f(x) = a\\b (see note)', 'café']
+
+
+def test_long_lines_are_wrapped(tmp_path):
+    output = _convert(tmp_path, ' '.join(['word'] * 200))
+    with fitz.open(output) as doc:
+        wrapped = doc[0].get_text().splitlines()
+    assert len(wrapped) > 1
+    assert ' '.join(wrapped).split() == ['word'] * 200
+
+
+def test_empty_file_gives_one_blank_page(tmp_path):
+    output = _convert(tmp_path, '')
+    with fitz.open(output) as doc:
+        assert doc.page_count == 1
+        assert doc[0].get_text() == ''
+
+
+def test_backends_paginate_alike(tmp_path):
+    text = '\n'.join(f"line {number}" for number in range(_TEXT_LINES_PER_PAGE + 5))
+    counts = {}
+    for backend in ('native', 'fitz'):
+        with fitz.open(_convert(tmp_path, text, backend)) as doc:
+            counts[backend] = doc.page_count
+    assert counts['native'] == counts['fitz'] == 2
+
+
+def test_unknown_backend_is_rejected(tmp_path):
+    with pytest.raises(Exception, match='backend must be one of'):
+        _convert(tmp_path, 'x', backend='latex')
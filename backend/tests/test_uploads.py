@@ -0,0 +1,131 @@
+"""Resumable chunked uploads (spool staging)"""
+
+import hashlib
+
+import pytest
+
+from utils import uploads
+
+DATA = b'0123456789abcdefghijk'   # 21 bytes: chunks of 8, 8 and 5
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'CHUNKED_UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(uploads, 'CHUNK_SIZE', 8)
+
+
+@pytest.fixture
+def upload_id():
+    return uploads.create('doc.pdf', len(DATA))['upload_id']
+
+
+def _chunk(offset):
+    return DATA[offset:offset + 8]
+
+
+def _chunks_sha256(data):
+    return hashlib.sha256(b''.join(hashlib.sha256(data[offset:offset + 8]).digest()
+                                   for offset in range(0, len(data), 8))).hexdigest()
+
+
+def test_create_reports_every_chunk_missing(upload_id):
+    status = uploads.status(upload_id)
+    assert uploads.valid_upload_id(upload_id)
+    assert status['chunk_count'] == 3
+    assert status['missing'] == [0, 8, 16]
+    assert not status['complete'] and not status['finalized']
+
+
+@pytest.mark.parametrize('filename, size, message', [
+    ('', 10, 'filename is required'),
+    ('doc.pdf', 0, 'positive number of bytes'),
+    ('doc.pdf', '10', 'positive number of bytes'),
+])
+def test_create_validates(filename, size, message):
+    with pytest.raises(ValueError, match=message):
+        uploads.create(filename, size)
+
+
+def test_create_enforces_the_size_limit(monkeypatch):
+    monkeypatch.setattr(uploads, 'CHUNKED_UPLOAD_MAX_SIZE', 16)
+    with pytest.raises(ValueError, match='File too large'):
+        uploads.create('doc.pdf', 17)
+
+
+def test_chunks_in_any_order_and_resent(upload_id):
+    uploads.write_chunk(upload_id, 16, _chunk(16))
+    status = uploads.write_chunk(upload_id, 0, _chunk(0))
+    assert status['missing'] == [8]
+    assert status['received_bytes'] == 13
+    # Resending a chunk (e.g. after a dropped response) changes nothing
+    assert uploads.write_chunk(upload_id, 0, _chunk(0))['missing'] == [8]
+    status = uploads.write_chunk(upload_id, 8, _chunk(8), sha256=hashlib.sha256(_chunk(8)).hexdigest())
+    assert status['complete'] and status['received_bytes'] == len(DATA)
+
+
+@pytest.mark.parametrize('offset, data, message', [
+    (3, b'x' * 8, 'multiple of 8'),
+    (-8, b'x' * 8, 'multiple of 8'),
+    (24, b'x' * 8, 'below 21'),
+    (0, b'x' * 7, 'must be 8 bytes'),
+    (16, b'x' * 8, 'must be 5 bytes'),
+])
+def test_bad_offsets_and_lengths_are_rejected(upload_id, offset, data, message):
+    with pytest.raises(ValueError, match=message):
+        uploads.write_chunk(upload_id, offset, data)
+
+
+def test_chunk_checksum_is_checked_before_storing(upload_id):
+    with pytest.raises(ValueError, match='Chunk checksum mismatch'):
+        uploads.write_chunk(upload_id, 0, _chunk(0), sha256=hashlib.sha256(b'other').hexdigest())
+    assert uploads.status(upload_id)['missing'] == [0, 8, 16]
+
+
+def test_unknown_upload():
+    assert uploads.status('0' * 32) is None
+    assert uploads.write_chunk('0' * 32, 0, b'x') is None
+    assert not uploads.valid_upload_id('../etc/passwd')
+
+
+def _write_all(upload_id):
+    for offset in (0, 8, 16):
+        uploads.write_chunk(upload_id, offset, _chunk(offset))
+
+
+@pytest.mark.parametrize('hashes', [
+    {'sha256': hashlib.sha256(DATA).hexdigest()},
+    {'sha256': hashlib.sha256(DATA).hexdigest().upper()},
+    {'chunks_sha256': _chunks_sha256(DATA)},
+])
+def test_finalize_with_either_hash(upload_id, tmp_path, hashes):
+    _write_all(upload_id)
+    status = uploads.finalize(upload_id, **hashes)
+    assert status['finalized'] and status['sha256'] == hashlib.sha256(DATA).hexdigest()
+    # Finalizing again is a no-op
+    assert uploads.finalize(upload_id)['finalized']
+    target = uploads.link(upload_id, str(tmp_path / 'input.pdf'))
+    with open(target, 'rb') as f:
+        assert f.read() == DATA
+    with pytest.raises(ValueError, match='already finalized'):
+        uploads.write_chunk(upload_id, 0, _chunk(0))
+
+
+def test_finalize_needs_a_hash_and_every_chunk(upload_id):
+    uploads.write_chunk(upload_id, 0, _chunk(0))
+    with pytest.raises(ValueError, match='sha256 or chunks_sha256 is required'):
+        uploads.finalize(upload_id)
+    with pytest.raises(ValueError, match=r'incomplete \(2 chunks missing\)'):
+        uploads.finalize(upload_id, sha256=hashlib.sha256(DATA).hexdigest())
+    assert uploads.link(upload_id, 'unused') is None
+
+
+@pytest.mark.parametrize('hashes', [
+    {'sha256': hashlib.sha256(b'something else').hexdigest()},
+    {'chunks_sha256': _chunks_sha256(DATA[::-1])},
+])
+def test_hash_mismatch_discards_the_upload(upload_id, hashes):
+    _write_all(upload_id)
+    with pytest.raises(ValueError, match='Checksum mismatch, upload discarded'):
+        uploads.finalize(upload_id, **hashes)
+    assert uploads.status(upload_id) is None
@@ -0,0 +1,411 @@
+"""
+Admission control for conversion requests
+Each conversion request is admitted against a per-node cost budget before it runs.
+Its cost is estimated from the operation's cost class, the input size and the page
+count (read from the PDF's page tree, without converting anything). Requests over
+budget wait briefly in a queue and are then refused, so the node sheds load with a
+429 instead of starting work that would be killed at the gunicorn timeout.
+
+The queue is ordered by priority class, then by weighted fair share between tenants
+(API keys or client addresses): interactive requests go before batch ones, and
+within a class each tenant gets budget in proportion to its weight (start-time fair
+queuing over estimated cost), so one client submitting hundreds of jobs can't push
+everyone else's requests back.
+
+The budget is shared by every worker on the node through a small JSON state file
+guarded by an flock (on platforms without fcntl, each process keeps its own).
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import PyPDF2
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Budget in estimated CPU-seconds of conversion work in flight on the node
+ADMISSION_BUDGET = float(os.getenv('ADMISSION_BUDGET', str(30 * (os.cpu_count() or 1))))
+# Seconds a request may wait for budget before it is refused, and how many may wait
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '16'))
+ADMISSION_DIR = os.getenv('ADMISSION_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_admission'))
+
+# Leases older than this are assumed abandoned (e.g. a worker killed mid-request)
+LEASE_MAX_AGE = 600
+
+# Priority classes, most urgent first: queued batch requests wait for interactive ones
+PRIORITIES = ('interactive', 'batch')
+
+# Requests not marked as batch become batch once their tenant already has this many
+# running or queued (0 disables), and the most one tenant may have queued
+ADMISSION_BATCH_AFTER = int(os.getenv('ADMISSION_BATCH_AFTER', '3'))
+ADMISSION_TENANT_MAX_QUEUE = int(os.getenv('ADMISSION_TENANT_MAX_QUEUE', '8'))
+
+# Fair-share weights as "tenant=weight" pairs, where a tenant is an API key or
+# ip:<address>; tenants not listed have weight 1
+ADMISSION_TENANT_WEIGHTS = os.getenv('ADMISSION_TENANT_WEIGHTS', '')
+
+# Counters of tenants with nothing running or queued are dropped after this long
+TENANT_STATS_TTL = 3600
+
+# Estimated CPU-seconds per page for each cost class, plus a fixed cost per request
+SECONDS_PER_PAGE = {'light': 0.005, 'medium': 0.03, 'heavy': 0.4}
+BASE_COST = 0.05
+
+# Page estimate for inputs whose pages can't be counted cheaply (Office files, text, images)
+PAGES_PER_MB = 20
+
+_local_lock = threading.Lock()
+_local_state = {}
+
+
+def tenant_id(api_key=None, address=None):
+    """
+    Identify the tenant a request is scheduled as
+
+    Args:
+        api_key: The request's API key, if any (only a hash of it is kept)
+        address: Client address, used when there is no API key
+
+    Returns:
+        'key:<hash>' or 'ip:<address>'
+    """
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return f"ip:{address or 'unknown'}"
+
+
+def _parse_weights(spec):
+    weights = {}
+    for item in spec.split(','):
+        name, _, value = item.strip().rpartition('=')
+        if name:
+            weights[name if name.startswith('ip:') else tenant_id(api_key=name)] = float(value)
+    return weights
+
+
+_weights = _parse_weights(ADMISSION_TENANT_WEIGHTS)
+
+
+class Overloaded(Exception):
+    """The node has no budget for a request; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after, load):
+        super().__init__(f"over budget, retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.load = load
+
+
+def probe_pages(file):
+    """
+    Count the pages of an uploaded PDF from its stream, without saving or converting it
+
+    Returns:
+        Page count, or None if the file can't be read as a PDF
+    """
+    stream = file.stream
+    try:
+        return len(PyPDF2.PdfReader(stream, strict=False).pages)
+    except Exception:
+        return None
+    finally:
+        stream.seek(0)
+
+
+def _probe_path(path):
+    try:
+        return len(PyPDF2.PdfReader(path, strict=False).pages)
+    except Exception:
+        return None
+
+
+def _upload_size(file):
+    stream = file.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def estimate_cost(operation, files, paths=()):
+    """
+    Estimate the cost of running an operation on uploaded files
+
+    Args:
+        operation: Operation descriptor from utils.operations
+        files: Uploaded FileStorage objects
+        paths: Inputs already stored on disk (e.g. finalized chunked uploads)
+
+    Returns:
+        Tuple of (cost in estimated CPU-seconds, estimated page count)
+    """
+    pages = 0
+    for file in files:
+        counted = probe_pages(file) if operation.file_type == 'pdf' else None
+        if counted is None:
+            counted = max(1, math.ceil(_upload_size(file) / (1024 * 1024) * PAGES_PER_MB))
+        pages += counted
+    for path in paths:
+        counted = _probe_path(path) if operation.file_type == 'pdf' else None
+        if counted is None:
+            counted = max(1, math.ceil(os.path.getsize(path) / (1024 * 1024) * PAGES_PER_MB))
+        pages += counted
+    return BASE_COST + pages * SECONDS_PER_PAGE.get(operation.cost_class, SECONDS_PER_PAGE['medium']), pages
+
+
+def _empty_state():
+    return {'leases': {}, 'waiting': {}, 'admitted': 0, 'rejected': 0, 'hold_seconds': 1.0,
+            'vclock': 0.0, 'tenants': {}, 'priorities': {}}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _state(write=True):
+    """Lock and load the node state, saving it back afterwards"""
+    if fcntl is None:
+        with _local_lock:
+            if not _local_state:
+                _local_state.update(_empty_state())
+            _prune(_local_state)
+            yield _local_state
+        return
+
+    os.makedirs(ADMISSION_DIR, exist_ok=True)
+    path = os.path.join(ADMISSION_DIR, 'state.json')
+    with open(os.path.join(ADMISSION_DIR, 'state.lock'), 'a+') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, 'r') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = _empty_state()
+            _prune(state)
+
+            try:
+                yield state
+            finally:
+                # Saved even when the caller raises (a rejection still updates the queue)
+                if write:
+                    fd, tmp_path = tempfile.mkstemp(dir=ADMISSION_DIR, prefix='.state.')
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _prune(state):
+    # State files written before fair queuing lack its keys
+    for key, value in _empty_state().items():
+        state.setdefault(key, value)
+    now = time.time()
+    for entries in (state['leases'], state['waiting']):
+        for key, entry in list(entries.items()):
+            if now - entry['since'] > LEASE_MAX_AGE or not _alive(entry['pid']):
+                del entries[key]
+    active = {entry.get('tenant') for entries in (state['leases'], state['waiting']) for entry in entries.values()}
+    for tenant, stats in list(state['tenants'].items()):
+        if tenant not in active and now - stats['last_seen'] > TENANT_STATS_TTL:
+            del state['tenants'][tenant]
+
+
+def _counters():
+    return {'admitted': 0, 'rejected': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+
+def _count(state, entry, admitted):
+    """Record an admission (with its queue wait) or a rejection for the entry's tenant and class"""
+    wait = time.time() - entry['since']
+    for stats in (state['tenants'].setdefault(entry['tenant'], dict(_counters(), finish=0.0)),
+                  state['priorities'].setdefault(entry['priority'], _counters())):
+        stats['last_seen'] = time.time()
+        if admitted:
+            stats['admitted'] += 1
+            stats['wait_seconds'] += wait
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], round(wait, 3))
+        else:
+            stats['rejected'] += 1
+
+
+def _enqueue(state, lease, entry, priority):
+    """
+    Put a request in the queue, with its priority class and fair-queuing start tag
+
+    The tag is the tenant's virtual time: it starts where the tenant's previous
+    request ends (or at the node's virtual clock, if that is later) and advances by
+    cost / weight, so a tenant with many queued requests gets tags far in the future.
+
+    Returns:
+        The tenant's previous virtual finish time, to undo the enqueue
+    """
+    tenant = entry['tenant']
+    stats = state['tenants'].setdefault(tenant, dict(_counters(), finish=0.0))
+    stats['last_seen'] = time.time()
+    previous = stats['finish']
+    if priority != 'batch' and ADMISSION_BATCH_AFTER:
+        active = sum(1 for entries in (state['leases'], state['waiting'])
+                     for other in entries.values() if other.get('tenant') == tenant)
+        if active >= ADMISSION_BATCH_AFTER:
+            priority = 'batch'
+    entry['priority'] = priority if priority == 'batch' else 'interactive'
+    entry['tag'] = max(state['vclock'], previous)
+    stats['finish'] = entry['tag'] + entry['cost'] / _weights.get(tenant, 1.0)
+    state['waiting'][lease] = entry
+    return previous
+
+
+def _order(entry):
+    return PRIORITIES.index(entry.get('priority', 'interactive')), entry.get('tag', 0.0), entry['since']
+
+
+def _in_use(state):
+    return sum(entry['cost'] for entry in state['leases'].values())
+
+
+def _summary(state):
+    in_use = _in_use(state)
+    return {
+        'budget': ADMISSION_BUDGET,
+        'in_use': round(in_use, 3),
+        'utilization': round(in_use / ADMISSION_BUDGET, 3) if ADMISSION_BUDGET else None,
+        'running': len(state['leases']),
+        'queued': len(state['waiting']),
+        'queued_by_priority': {priority: sum(1 for entry in state['waiting'].values()
+                                             if entry.get('priority', 'interactive') == priority)
+                               for priority in PRIORITIES},
+        'admitted': state['admitted'],
+        'rejected': state['rejected'],
+    }
+
+
+def _retry_after(state):
+    return int(min(60, max(1, math.ceil(state['hold_seconds']))))
+
+
+def acquire(cost, timeout=None, tenant=None, priority=None):
+    """
+    Wait for budget for a request, in priority and fair-share order
+
+    A request is admitted when it fits in the remaining budget and no queued request
+    comes before it: interactive before batch, then by tenant virtual time (see
+    _enqueue), then by arrival. A request larger than the whole budget still runs
+    when the node is otherwise idle.
+
+    Args:
+        cost: Estimated cost (see estimate_cost)
+        timeout: Seconds to wait (default: ADMISSION_QUEUE_TIMEOUT)
+        tenant: Tenant id from tenant_id() (default: one shared tenant)
+        priority: 'batch' to mark the request as batch work; otherwise it is
+                  interactive unless its tenant already has ADMISSION_BATCH_AFTER
+                  requests running or queued
+
+    Returns:
+        Lease id to pass to release()
+
+    Raises:
+        Overloaded if the request isn't admitted in time, or its class's queue or
+        its tenant's queue is full
+    """
+    timeout = ADMISSION_QUEUE_TIMEOUT if timeout is None else timeout
+    lease = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    entry = {'pid': os.getpid(), 'cost': cost, 'since': time.time(), 'tenant': tenant or tenant_id()}
+
+    while True:
+        with _state() as state:
+            waiting = state['waiting']
+            previous = None
+            if lease not in waiting:
+                previous = _enqueue(state, lease, entry, priority)
+            head = min(waiting, key=lambda key: _order(waiting[key]))
+            if head == lease and (_in_use(state) + cost <= ADMISSION_BUDGET or not state['leases']):
+                waiting.pop(lease)
+                state['leases'][lease] = dict(entry, since=time.time())
+                state['vclock'] = max(state['vclock'], entry['tag'])
+                state['admitted'] += 1
+                _count(state, entry, True)
+                return lease
+            queue_full = previous is not None and (
+                sum(1 for other in waiting.values() if other.get('priority') == entry['priority']) > ADMISSION_MAX_QUEUE
+                or sum(1 for other in waiting.values() if other.get('tenant') == entry['tenant'])
+                > ADMISSION_TENANT_MAX_QUEUE)
+            if queue_full or time.monotonic() >= deadline:
+                waiting.pop(lease)
+                if queue_full:
+                    # Never queued: don't charge the tenant for it
+                    state['tenants'][entry['tenant']]['finish'] = previous
+                state['rejected'] += 1
+                _count(state, entry, False)
+                raise Overloaded(_retry_after(state), _summary(state))
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, 0.25)
+
+
+def release(lease):
+    """Return a request's budget to the node"""
+    with _state() as state:
+        entry = state['leases'].pop(lease, None)
+        if entry is not None:
+            # Smoothed time requests hold budget, used for Retry-After hints
+            state['hold_seconds'] = 0.8 * state['hold_seconds'] + 0.2 * (time.time() - entry['since'])
+
+
+def load():
+    """Current node load: budget, cost in use, running and queued requests, counters"""
+    with _state(write=False) as state:
+        return _summary(state)
+
+
+def scheduling_stats():
+    """
+    Node-wide queueing metrics per tenant and per priority class
+
+    Returns:
+        Dict with 'tenants' (weight, queued, running, admitted, rejected, average and
+        maximum queue wait, and how long the oldest queued request has waited) and
+        'priorities' (the same, without weight)
+    """
+    with _state(write=False) as state:
+        now = time.time()
+
+        def describe(stats, matches):
+            queued = [entry for entry in state['waiting'].values() if matches(entry)]
+            return {
+                'queued': len(queued),
+                'running': sum(1 for entry in state['leases'].values() if matches(entry)),
+                'admitted': stats['admitted'],
+                'rejected': stats['rejected'],
+                'avg_wait_seconds': round(stats['wait_seconds'] / stats['admitted'], 3) if stats['admitted'] else 0.0,
+                'max_wait_seconds': stats['max_wait_seconds'],
+                'oldest_queued_seconds': round(now - min(entry['since'] for entry in queued), 3) if queued else 0.0,
+            }
+
+        tenants = {tenant: dict(describe(stats, lambda entry, tenant=tenant: entry.get('tenant') == tenant),
+                                weight=_weights.get(tenant, 1.0))
+                   for tenant, stats in state['tenants'].items()}
+        priorities = {priority: describe(state['priorities'].get(priority, _counters()),
+                                         lambda entry, priority=priority: entry.get('priority') == priority)
+                      for priority in PRIORITIES}
+        return {'tenants': tenants, 'priorities': priorities}
@@ -4,8 +4,9 @@ Handles file uploads, downloads, and cleanup
 """
 
 import os
+import shutil
+import tempfile
 from typing import BinaryIO, Optional
-from azure.storage.blob import BlobServiceClient, BlobClient
 from azure.core.exceptions import AzureError
 import logging
 
@@ -24,6 +25,8 @@ class AzureStorageManager:
             if not connection_string:
                 raise ValueError("AZURE_STORAGE_CONNECTION_STRING not set")
             
+            # Imported here so workers using local storage never load the blob SDK
+            from azure.storage.blob import BlobServiceClient
             self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
             self.container_client = self.blob_service_client.get_container_client(self.container_name)
             logger.info(f"Azure Storage initialized for container: {self.container_name}")
@@ -108,6 +111,79 @@ class AzureStorageManager:
             logger.error(f"Error downloading blob to bytes: {str(e)}")
             raise
 
+    def download_blob_stream(self, blob_name: str):
+        """
+        Stream a blob in chunks without buffering it in memory
+        
+        Args:
+            blob_name: Name/path in blob storage
+            
+        Returns:
+            (size in bytes, iterator over byte chunks)
+        """
+        try:
+            blob_client = self.blob_service_client.get_blob_client(
+                container=self.container_name, 
+                blob=blob_name
+            )
+            downloader = blob_client.download_blob()
+            return downloader.size, downloader.chunks()
+        except AzureError as e:
+            logger.error(f"Azure error streaming {blob_name}: {str(e)}")
+            raise
+
+    def stage_block(self, blob_name: str, block_id: str, data: bytes) -> None:
+        """
+        Stage one block of a blob, to be committed later with commit_block_list
+        
+        Args:
+            blob_name: Name/path in blob storage
+            block_id: Block id (all ids of one blob must have the same length)
+            data: Block content
+        """
+        try:
+            blob_client = self.blob_service_client.get_blob_client(
+                container=self.container_name,
+                blob=blob_name
+            )
+            blob_client.stage_block(block_id=block_id, data=data, length=len(data))
+        except AzureError as e:
+            logger.error(f"Azure error staging block {block_id} of {blob_name}: {str(e)}")
+            raise
+
+    def get_uncommitted_block_ids(self, blob_name: str) -> list:
+        """Ids of the blocks staged for a blob but not committed yet"""
+        try:
+            blob_client = self.blob_service_client.get_blob_client(
+                container=self.container_name,
+                blob=blob_name
+            )
+            _, uncommitted = blob_client.get_block_list('uncommitted')
+            return [block.id for block in uncommitted]
+        except AzureError as e:
+            logger.error(f"Azure error listing blocks of {blob_name}: {str(e)}")
+            raise
+
+    def commit_block_list(self, blob_name: str, block_ids: list) -> None:
+        """
+        Commit staged blocks, in order, as the content of a blob
+        
+        Args:
+            blob_name: Name/path in blob storage
+            block_ids: Ids of staged blocks in content order
+        """
+        from azure.storage.blob import BlobBlock
+        try:
+            blob_client = self.blob_service_client.get_blob_client(
+                container=self.container_name,
+                blob=blob_name
+            )
+            blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids])
+            logger.info(f"Committed {len(block_ids)} blocks to {blob_name}")
+        except AzureError as e:
+            logger.error(f"Azure error committing blocks of {blob_name}: {str(e)}")
+            raise
+
     def delete_file(self, blob_name: str) -> None:
         """
         Delete a file from Azure Blob Storage
@@ -164,6 +240,107 @@ class AzureStorageManager:
         return f"https://{account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
 
 
+class LocalBlobStorageManager:
+    """
+    Local stand-in for AzureStorageManager backed by a directory
+    Used for load tests and offline development (AZURE_STORAGE_LOCAL_PATH)
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = os.path.abspath(root_path)
+        self.container_name = os.getenv('AZURE_STORAGE_CONTAINER_NAME', 'pdfizz-uploads')
+        os.makedirs(self.root_path, exist_ok=True)
+        logger.info(f"Local blob storage initialized at: {self.root_path}")
+
+    def _blob_path(self, blob_name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root_path, blob_name))
+        if not path.startswith(self.root_path + os.sep):
+            raise ValueError(f"Invalid blob name: {blob_name}")
+        return path
+
+    def upload_file(self, file_path: str, blob_name: str) -> str:
+        """Copy a local file into the blob directory"""
+        target = self._blob_path(blob_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(file_path, target)
+        return blob_name
+
+    def download_file(self, blob_name: str, local_path: str) -> None:
+        """Copy a blob to a local path"""
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        shutil.copyfile(self._blob_path(blob_name), local_path)
+
+    def download_blob_to_bytes(self, blob_name: str):
+        """Read a blob into memory"""
+        with open(self._blob_path(blob_name), 'rb') as f:
+            return f.read()
+
+    def download_blob_stream(self, blob_name: str, chunk_size: int = 4 * 1024 * 1024):
+        """Stream a blob in chunks; returns (size, iterator)"""
+        path = self._blob_path(blob_name)
+        size = os.path.getsize(path)
+
+        def chunks():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    yield chunk
+        return size, chunks()
+
+    def _blocks_dir(self, blob_name: str) -> str:
+        return self._blob_path(blob_name) + '.blocks'
+
+    def stage_block(self, blob_name: str, block_id: str, data: bytes) -> None:
+        """Stage a block as a file next to the blob"""
+        blocks_dir = self._blocks_dir(blob_name)
+        os.makedirs(blocks_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=blocks_dir, prefix='.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(blocks_dir, block_id))
+
+    def get_uncommitted_block_ids(self, blob_name: str) -> list:
+        """Ids of the staged blocks of a blob"""
+        blocks_dir = self._blocks_dir(blob_name)
+        if not os.path.isdir(blocks_dir):
+            return []
+        return sorted(name for name in os.listdir(blocks_dir) if not name.startswith('.'))
+
+    def commit_block_list(self, blob_name: str, block_ids: list) -> None:
+        """Concatenate staged blocks, in order, into the blob"""
+        blocks_dir = self._blocks_dir(blob_name)
+        target = self._blob_path(blob_name)
+        with open(target, 'wb') as out:
+            for block_id in block_ids:
+                with open(os.path.join(blocks_dir, block_id), 'rb') as block:
+                    shutil.copyfileobj(block, out)
+        shutil.rmtree(blocks_dir, ignore_errors=True)
+
+    def delete_file(self, blob_name: str) -> None:
+        """Delete a blob"""
+        os.remove(self._blob_path(blob_name))
+
+    def file_exists(self, blob_name: str) -> bool:
+        """Check if a blob exists"""
+        try:
+            return os.path.isfile(self._blob_path(blob_name))
+        except ValueError:
+            return False
+
+    def list_blobs(self, prefix: str = "") -> list:
+        """List blob names with optional prefix"""
+        names = []
+        for root, dirs, files in os.walk(self.root_path):
+            for name in files:
+                blob_name = os.path.relpath(os.path.join(root, name), self.root_path).replace(os.sep, '/')
+                if blob_name.startswith(prefix):
+                    names.append(blob_name)
+        return sorted(names)
+
+    def get_blob_url(self, blob_name: str) -> str:
+        """Get a file:// URL for a blob"""
+        return f"file://{self._blob_path(blob_name)}"
+
+
 # Global instance
 _azure_storage = None
 
@@ -174,6 +351,10 @@ def get_azure_storage() -> Optional[AzureStorageManager]:
     if _azure_storage is None:
         use_azure = os.getenv('USE_AZURE_STORAGE', 'false').lower() == 'true'
         if use_azure:
+            local_path = os.getenv('AZURE_STORAGE_LOCAL_PATH')
+            if local_path:
+                _azure_storage = LocalBlobStorageManager(local_path)
+                return _azure_storage
             try:
                 _azure_storage = AzureStorageManager()
             except Exception as e:
@@ -0,0 +1,337 @@
+"""
+Bulk conversion without the web app
+Runs a registered operation over files, directories or glob patterns on a local
+process pool, writing outputs into a directory. Each output directory keeps a
+manifest of what produced every output (input size, mtime and SHA-256, operation
+and parameters), so a rerun skips inputs whose output is up to date and an
+interrupted run resumes where it stopped. Used by cli.py; callable from Python
+for backfills and notebooks.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from werkzeug.datastructures import MultiDict
+
+from utils.executor import process_context
+from utils.operations import ALLOWED_EXTENSIONS, get_operation
+
+# Manifest of the outputs in an output directory
+MANIFEST_NAME = '.pdf_toolkit_batch.json'
+
+# Seconds between manifest saves while a run is going (and always at the end)
+MANIFEST_SAVE_INTERVAL = 1.0
+
+# unique_id passed to converters; their outputs are named "<unique_id>_..."
+_JOB_ID = 'batch'
+
+
+class Job:
+    """One conversion: the inputs of one output"""
+
+    __slots__ = ('key', 'inputs', 'rel_dir', 'stem')
+
+    def __init__(self, key, inputs, rel_dir, stem):
+        self.key = key
+        self.inputs = inputs
+        self.rel_dir = rel_dir
+        self.stem = stem
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'sha256': _file_digest(path)}
+
+
+def find_inputs(patterns, file_type):
+    """
+    Expand files, directories (searched recursively) and glob patterns into inputs
+
+    Args:
+        patterns: Paths or glob patterns
+        file_type: Key of ALLOWED_EXTENSIONS; directories only contribute files of this type
+
+    Returns:
+        List of (path, relative path) tuples, where the relative path (below the
+        directory or glob root the file was found under) places its output
+    """
+    extensions = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS.get(file_type, []))
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        path = os.path.join(root, name)
+                        found.append((path, os.path.relpath(path, pattern)))
+        elif os.path.isfile(pattern):
+            found.append((pattern, os.path.basename(pattern)))
+        else:
+            matches = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+            if not matches:
+                raise ValueError(f"No files match {pattern}")
+            root = pattern.split('*', 1)[0].split('?', 1)[0].split('[', 1)[0]
+            root = root if root.endswith(os.sep) else os.path.dirname(root)
+            found += [(path, os.path.relpath(path, root or '.')) for path in matches]
+    return found
+
+
+def parse_params(operation, values):
+    """
+    Build converter keyword arguments from NAME=VALUE strings
+
+    Args:
+        operation: Operation descriptor from utils.operations
+        values: Strings like 'dpi=150'; upload names (e.g. watermark_image) take a path
+
+    Returns:
+        Dict of converter keyword arguments
+    """
+    form = MultiDict()
+    uploads = {upload.name: upload.arg for upload in operation.uploads}
+    known = {param.name for param in operation.params}
+    extra = {}
+    for value in values:
+        name, sep, raw = value.partition('=')
+        if not sep:
+            raise ValueError(f"Parameters are NAME=VALUE, got {value!r}")
+        if name in uploads:
+            if not os.path.isfile(raw):
+                raise ValueError(f"{name}: no such file {raw}")
+            extra[uploads[name]] = os.path.abspath(raw)
+        elif name in known:
+            form.add(name, raw)
+        else:
+            accepted = ', '.join(sorted(known | set(uploads))) or 'none'
+            raise ValueError(f"Unknown parameter {name!r} for {operation.id} (accepted: {accepted})")
+    params = operation.parse_params(form)
+    params.update(extra)
+    return params
+
+
+def plan_jobs(operation, inputs):
+    """
+    Group inputs into jobs: one per input, or one for all of them for operations
+    that combine several inputs (merge_pdfs, images_to_pdf)
+    """
+    if operation.multiple:
+        first_rel = inputs[0][1]
+        stem = os.path.splitext(os.path.basename(first_rel))[0]
+        return [Job(f"{operation.id}:" + '|'.join(rel for _, rel in inputs), [path for path, _ in inputs],
+                    os.path.dirname(first_rel), stem)]
+    jobs = {}
+    for path, rel in inputs:
+        key = f"{operation.id}:{rel}"
+        if key in jobs:
+            raise ValueError(f"Two inputs would write the same output: {jobs[key].inputs[0]} and {path}")
+        jobs[key] = Job(key, [path], os.path.dirname(rel), os.path.splitext(os.path.basename(rel))[0])
+    return list(jobs.values())
+
+
+def _signature(operation, params):
+    return hashlib.sha256(json.dumps({'operation': operation.id, 'params': params},
+                                     sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load_manifest(output_dir):
+    """Records of the outputs in output_dir, keyed by job key"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as f:
+            return json.load(f).get('jobs', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, records):
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix='.manifest.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'jobs': records}, f)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+
+
+def up_to_date(record, job, output_dir, signature):
+    """
+    True if the output recorded for a job is still what converting it would produce
+
+    Inputs are compared by size and mtime, and by content hash when only the mtime
+    changed (a copied or touched file); the output must be unchanged since it was written.
+    """
+    if not record or record['signature'] != signature or len(record['inputs']) != len(job.inputs):
+        return False
+    try:
+        stat = os.stat(os.path.join(output_dir, record['output']))
+    except OSError:
+        return False
+    if (stat.st_size, stat.st_mtime_ns) != (record['output_size'], record['output_mtime_ns']):
+        return False
+    for path, recorded in zip(job.inputs, record['inputs']):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) == (recorded['size'], recorded['mtime_ns']):
+            continue
+        if stat.st_size != recorded['size'] or _file_digest(path) != recorded['sha256']:
+            return False
+        recorded['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def convert_job(operation_id, inputs, output_dir, rel_dir, stem, params):
+    """
+    Run one job (in a pool process, or inline)
+
+    The converter writes into a scratch directory next to the output, and the result
+    is moved into place only once complete, so an interrupted run never leaves a
+    partial file that looks like a finished output.
+
+    Returns:
+        Manifest record of the output
+    """
+    operation = get_operation(operation_id)
+    converter = operation.resolve_converter()
+    target_dir = os.path.join(output_dir, rel_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    # Fingerprint first: an input modified while converting is converted again next run
+    fingerprints = [_fingerprint(path) for path in inputs]
+    scratch = tempfile.mkdtemp(dir=target_dir, prefix='.batch.')
+    try:
+        start = time.perf_counter()
+        result = converter(inputs if operation.multiple else inputs[0], scratch, _JOB_ID, **params)
+        if not result or not os.path.exists(result):
+            raise Exception(f"{operation.name} produced no output")
+        ext = os.path.splitext(result)[1]
+        if operation.output_suffix is not None:
+            name = f"{stem}{operation.output_suffix}{ext}"
+        else:
+            # Keep the converter's naming (e.g. _images.zip) after the input's name
+            name = f"{stem}_{os.path.basename(result)[len(_JOB_ID) + 1:]}"
+        output_path = os.path.join(target_dir, name)
+        os.replace(result, output_path)
+        stat = os.stat(output_path)
+        return {
+            'inputs': fingerprints,
+            'output': os.path.relpath(output_path, output_dir),
+            'output_size': stat.st_size,
+            'output_mtime_ns': stat.st_mtime_ns,
+            'seconds': round(time.perf_counter() - start, 3),
+            'finished': time.time(),
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _one_document_per_process():
+    # Documents are already spread across the pool: don't also split their pages
+    from utils import executor, pdf_converter
+    executor.PAGE_WORKERS = pdf_converter.PAGE_WORKERS = 1
+
+
+def run(operation_id, patterns, output_dir, params=(), jobs=None, force=False, on_result=None):
+    """
+    Convert files in bulk
+
+    Args:
+        operation_id: Registry id of the operation (see utils.operations)
+        patterns: Input files, directories or glob patterns
+        output_dir: Directory for outputs (created if needed); input subdirectories
+                    are mirrored below it
+        params: Operation parameters as NAME=VALUE strings
+        jobs: Processes to convert in (default: CPU count); 1 converts in this process
+        force: Convert even inputs whose output is up to date
+        on_result: Optional callable(job, status, detail) for each job, where status
+                   is 'converted' (detail: manifest record), 'skipped' (record) or
+                   'failed' (error message)
+
+    Returns:
+        Dict with converted, skipped and failed counts
+    """
+    operation = get_operation(operation_id)
+    if operation is None:
+        raise ValueError(f"Unknown operation: {operation_id}")
+    kwargs = parse_params(operation, params)
+    inputs = find_inputs(patterns, operation.file_type)
+    if not inputs:
+        raise ValueError("No input files found")
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    records = load_manifest(output_dir)
+    signature = _signature(operation, kwargs)
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    last_save = time.monotonic()
+
+    def finish(job, status, detail):
+        nonlocal last_save
+        counts[status] += 1
+        if status == 'converted':
+            records[job.key] = dict(detail, signature=signature)
+            if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                _save_manifest(output_dir, records)
+                last_save = time.monotonic()
+        if on_result:
+            on_result(job, status, detail)
+
+    pending = []
+    for job in plan_jobs(operation, inputs):
+        if not force and up_to_date(records.get(job.key), job, output_dir, signature):
+            finish(job, 'skipped', records[job.key])
+        else:
+            pending.append(job)
+
+    def submit_args(job):
+        return operation.id, job.inputs, output_dir, job.rel_dir, job.stem, kwargs
+
+    try:
+        if jobs == 1 or len(pending) <= 1:
+            for job in pending:
+                try:
+                    finish(job, 'converted', convert_job(*submit_args(job)))
+                except Exception as e:
+                    finish(job, 'failed', str(e))
+            return counts
+
+        queue = iter(pending)
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=process_context(),
+                                 initializer=_one_document_per_process) as pool:
+            futures = {}
+            try:
+                while True:
+                    # Keep a bounded number of jobs submitted, so huge runs don't queue everything up front
+                    while len(futures) < jobs * 2:
+                        job = next(queue, None)
+                        if job is None:
+                            break
+                        futures[pool.submit(convert_job, *submit_args(job))] = job
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = futures.pop(future)
+                        try:
+                            finish(job, 'converted', future.result())
+                        except Exception as e:
+                            finish(job, 'failed', str(e))
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return counts
+    finally:
+        # Also on Ctrl-C: everything finished so far is skipped on the next run
+        _save_manifest(output_dir, records)
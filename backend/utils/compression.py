@@ -0,0 +1,142 @@
+"""
+HTTP compression for downloads and API responses
+Text-like outputs (.txt, .json, .csv, ...) are sent with the best Content-Encoding the
+client accepts: Brotli, Zstandard or gzip. A file is compressed once, on its first
+request in an encoding, and the compressed copy is kept next to it (removed with it
+by the hourly cleanup), so repeat downloads cost no CPU. Brotli and Zstandard are
+used when their packages are installed; gzip always works.
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Files smaller than this are sent as they are (headers would eat the saving)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+
+# Compression levels: files are compressed once and served many times, so favour ratio
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+ZSTD_LEVEL = 19
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/xml', 'application/javascript',
+                      'image/svg+xml')
+
+# Content-Encoding -> suffix of the compressed copy, in server preference order
+_SUFFIXES = {'br': '.br', 'zstd': '.zst', 'gzip': '.gz'}
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def available_encodings():
+    """Content-Encodings this process can produce, best first"""
+    return [encoding for encoding in _SUFFIXES
+            if encoding == 'gzip' or (encoding == 'br' and brotli) or (encoding == 'zstd' and zstandard)]
+
+
+def compressible(mimetype):
+    """True if responses of this type are worth compressing"""
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encoding):
+    """
+    Pick the Content-Encoding for a request
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+
+    Returns:
+        'br', 'zstd' or 'gzip', or None to send the content unencoded
+    """
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        # Ties go to the earlier (better) encoding
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress_stream(source, target, encoding):
+    if encoding == 'gzip':
+        with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as out:
+            shutil.copyfileobj(source, out, _CHUNK_SIZE)
+    elif encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            target.write(compressor.process(chunk))
+        target.write(compressor.finish())
+    elif encoding == 'zstd':
+        zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(source, target)
+    else:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_bytes(data, encoding):
+    """Compress an in-memory body (e.g. a cached JSON response)"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compressed_path(path, encoding):
+    """Path of the compressed copy of a file (which may not exist yet)"""
+    return path + _SUFFIXES[encoding]
+
+
+def precompressed(path, encoding):
+    """
+    Return a compressed copy of a file, creating it on first use
+
+    Args:
+        path: File to compress
+        encoding: 'br', 'zstd' or 'gzip'
+
+    Returns:
+        Path of the compressed copy, or None if compressing doesn't make it smaller
+    """
+    target = compressed_path(path, encoding)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(path):
+            return target if os.path.getsize(target) < os.path.getsize(path) else None
+    except OSError:
+        pass
+
+    # Written under a temporary name so concurrent requests never serve a partial copy
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.compress.')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(path, 'rb') as source:
+            _compress_stream(source, out, encoding)
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return target if os.path.getsize(target) < os.path.getsize(path) else None
@@ -0,0 +1,553 @@
+"""
+Conversion executor
+Runs CPU-bound converter calls off the request-handling loop when the app is served
+by an async (gevent) gunicorn worker, so uploads, Azure transfers and downloads on
+other connections keep flowing while a conversion runs. Converters built on leaky
+native libraries, or fed untrusted documents, can instead run in a sandboxed child
+process under resource limits.
+"""
+
+import _thread
+import atexit
+import errno
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from utils.handoff import Handoff, adopt_prefix
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of conversions running concurrently in one worker process
+CONVERSION_THREADS = int(os.getenv('CONVERSION_THREADS', str(os.cpu_count() or 2)))
+
+# Processes used to split one document's pages across CPUs, and the smallest
+# document worth splitting (below it, process hand-off costs more than it saves)
+PAGE_WORKERS = int(os.getenv('PAGE_WORKERS', str(os.cpu_count() or 1)))
+PARALLEL_MIN_PAGES = int(os.getenv('PARALLEL_MIN_PAGES', '8'))
+
+# Ranges a document is processed in when it runs inline and progress is reported
+INLINE_PROGRESS_PARTS = 10
+
+# Limits of a conversion run with executor='sandbox' (0 disables a limit): address space
+# (RLIMIT_AS) in MB, CPU seconds (RLIMIT_CPU), size of any file it writes (RLIMIT_FSIZE) in
+# MB, and wall-clock seconds after which the worker kills it. A job over a limit fails on
+# its own instead of pinning a core or pushing the worker toward the OOM killer.
+JOB_MEMORY_LIMIT_MB = int(os.getenv('JOB_MEMORY_LIMIT_MB', '2048'))
+SANDBOX_CPU_SECONDS = int(os.getenv('SANDBOX_CPU_SECONDS', '100'))
+SANDBOX_FILE_SIZE_MB = int(os.getenv('SANDBOX_FILE_SIZE_MB', '1024'))
+SANDBOX_TIMEOUT = float(os.getenv('SANDBOX_TIMEOUT', '110'))
+
+# Sandbox processes each worker keeps forked and waiting, so a job doesn't wait for one
+SANDBOX_POOL_SIZE = int(os.getenv('SANDBOX_POOL_SIZE', '2'))
+
+# Run every operation in the sandbox, not only those registered with executor='sandbox'
+SANDBOX_ALL = os.getenv('SANDBOX_ALL', 'false').lower() == 'true'
+
+# Imported once by the forkserver that sandboxes and page processes are forked from,
+# so they start with the converter libraries already loaded (missing ones are skipped)
+FORKSERVER_PRELOAD = ['utils.pdf_converter', 'fitz', 'PIL.Image', 'PyPDF2', 'pdf2docx', 'pptx']
+
+_threadpool = None
+_page_pool = None
+
+
+def _gevent_active():
+    """True when running inside a gevent-patched worker"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _get_threadpool():
+    global _threadpool
+    if _threadpool is None:
+        from gevent.threadpool import ThreadPool
+        # gevent's ThreadPool uses real OS threads even when threading is patched
+        _threadpool = ThreadPool(CONVERSION_THREADS)
+        logger.info(f"Conversion threadpool started with {CONVERSION_THREADS} threads")
+    return _threadpool
+
+
+class JobLimitError(Exception):
+    """A sandboxed conversion hit one of its resource limits"""
+
+
+class JobMemoryError(JobLimitError):
+    """A sandboxed conversion exceeded JOB_MEMORY_LIMIT_MB"""
+
+
+class JobTimeoutError(JobLimitError):
+    """A sandboxed conversion ran past its wall-clock limit"""
+
+
+def _limit_hit(error):
+    # Converters wrap failures in Exception("... failed: ..."), so look down the chain
+    while error is not None:
+        if isinstance(error, MemoryError):
+            return 'memory'
+        if isinstance(error, OSError) and error.errno == errno.EFBIG:
+            return 'file_size'
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _apply_limits(memory_limit_mb, cpu_seconds, file_size_mb):
+    if resource is None:
+        return
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds:
+        # RLIMIT_CPU counts the whole life of the process: allow cpu_seconds from now.
+        # SIGXCPU at the soft limit, SIGKILL a second later if something ignores it.
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    if file_size_mb:
+        # Python ignores SIGXFSZ, so an oversized write fails with EFBIG instead
+        limit = file_size_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+
+# True in a sandbox process; its page processes are forked from it (see process_context)
+_sandboxed = False
+
+
+def _enter_sandbox():
+    # Lead a process group of the job's own, so the page processes it forks (which
+    # inherit its limits) can be killed along with it
+    global _sandboxed
+    _sandboxed = True
+    os.setpgrp()
+
+
+def _shutdown_page_pool():
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown(wait=True, cancel_futures=True)
+        _page_pool = None
+
+
+def _sandbox_process(conn):
+    """Process body of a pre-forked sandbox: wait for one job, limit itself, run it, send the outcome"""
+    try:
+        job = conn.recv()
+    except EOFError:
+        # The worker exited without using this sandbox
+        return
+    if job is None:
+        return
+    func, args, kwargs, limits, handoff = job
+    _enter_sandbox()
+    # Segments of handoffs made for the job are named after its own, so its owner frees them
+    adopt_prefix(handoff.prefix)
+    _apply_limits(*limits)
+    try:
+        args = tuple(handoff.take(arg) for arg in args)
+        kwargs = {name: handoff.take(value) for name, value in kwargs.items()}
+        outcome = ('ok', handoff.put(func(*args, **kwargs)))
+    except Exception as e:
+        hit = _limit_hit(e)
+        outcome = (hit, str(e)) if hit else ('error', e)
+    # Page processes are gone before the job counts as done
+    _shutdown_page_pool()
+    try:
+        conn.send(outcome)
+    except Exception:
+        # Unpicklable exception: keep its message
+        conn.send(('error', Exception(str(outcome[1]))))
+    conn.close()
+
+
+def _native_lock():
+    # Sandboxes are taken on the native conversion threads in gevent workers, which
+    # can't wait on a gevent-patched lock
+    try:
+        from gevent import monkey
+    except ImportError:
+        return _thread.allocate_lock()
+    return monkey.get_original('_thread', 'allocate_lock')()
+
+
+# Idle sandboxes as (process, connection) pairs, and how many are being started
+_sandboxes = deque()
+_sandboxes_starting = 0
+_sandboxes_lock = _native_lock()
+
+
+def _start_sandbox():
+    context = process_context()
+    conn, child = context.Pipe()
+    # A gevent-patched socketpair is non-blocking, and the sandbox waits on its end
+    os.set_blocking(child.fileno(), True)
+    # Not a daemon: daemonic processes can't start page processes
+    process = context.Process(target=_sandbox_process, args=(child,))
+    process.start()
+    child.close()
+    return process, conn
+
+
+def _take_sandbox():
+    while True:
+        with _sandboxes_lock:
+            if not _sandboxes:
+                break
+            process, conn = _sandboxes.popleft()
+        if process.is_alive():
+            return process, conn
+        conn.close()
+        process.join()
+    return _start_sandbox()
+
+
+def _refill_sandboxes():
+    # Count sandboxes being started, so that concurrent refills don't overshoot the pool
+    # size, and fork outside the lock, so that taking a sandbox never waits for a fork
+    global _sandboxes_starting
+    while True:
+        with _sandboxes_lock:
+            if len(_sandboxes) + _sandboxes_starting >= SANDBOX_POOL_SIZE:
+                return
+            _sandboxes_starting += 1
+        sandbox = None
+        try:
+            sandbox = _start_sandbox()
+        finally:
+            with _sandboxes_lock:
+                _sandboxes_starting -= 1
+                if sandbox:
+                    _sandboxes.append(sandbox)
+
+
+def _close_sandboxes():
+    # Let idle sandboxes exit cleanly rather than be terminated by multiprocessing at exit
+    while True:
+        with _sandboxes_lock:
+            if not _sandboxes:
+                return
+            process, conn = _sandboxes.popleft()
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        conn.close()
+
+
+atexit.register(_close_sandboxes)
+
+
+def _kill_job(process):
+    """Kill a sandbox and any page processes it started"""
+    try:
+        # The group exists once the sandbox has taken its job (see _enter_sandbox)
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+def _exit_error(exitcode):
+    if exitcode == -signal.SIGXCPU:
+        return JobLimitError(f"Conversion exceeded its {SANDBOX_CPU_SECONDS}s CPU time limit")
+    if exitcode == -signal.SIGKILL:
+        # The CPU hard limit or, more likely, the kernel OOM killer
+        return JobLimitError("Conversion was killed for exceeding its CPU or memory limit")
+    if exitcode is not None and exitcode < 0:
+        return Exception(f"Conversion process crashed ({signal.Signals(-exitcode).name})")
+    return Exception(f"Conversion process exited unexpectedly (code {exitcode})")
+
+
+def _run_in_sandbox(func, args, kwargs, timeout=None):
+    timeout = SANDBOX_TIMEOUT if timeout is None else timeout
+    process, conn = _take_sandbox()
+    # Large byte arguments and results go through shared memory rather than the pipe
+    handoff = Handoff()
+    try:
+        args = tuple(handoff.share(arg) for arg in args)
+        kwargs = {name: handoff.share(value) for name, value in kwargs.items()}
+        conn.send((func, args, kwargs, (JOB_MEMORY_LIMIT_MB, SANDBOX_CPU_SECONDS, SANDBOX_FILE_SIZE_MB),
+                   handoff))
+        # Fork the next job's sandbox while this one works
+        _refill_sandboxes()
+        if not conn.poll(timeout or None):
+            _kill_job(process)
+            raise JobTimeoutError(f"Conversion exceeded its {timeout:g}s time limit")
+        try:
+            status, value = conn.recv()
+        except EOFError:
+            process.join()
+            raise _exit_error(process.exitcode)
+        if status == 'memory':
+            raise JobMemoryError(f"Conversion exceeded its {JOB_MEMORY_LIMIT_MB} MB memory limit ({value})")
+        if status == 'file_size':
+            raise JobLimitError(f"Conversion exceeded its {SANDBOX_FILE_SIZE_MB} MB output file limit ({value})")
+        if status == 'error':
+            raise value
+        return handoff.take(value)
+    finally:
+        conn.close()
+        process.join(5)
+        # Also reaps page processes left by a sandbox that crashed or was killed
+        _kill_job(process)
+        # Frees every segment of the job: arguments it never took, results of its page
+        # processes it never took, a result it sent before being killed
+        handoff.close()
+
+
+def run_conversion(func, *args, executor=None, **kwargs):
+    """
+    Run a converter function, off the event loop when serving asynchronously
+
+    In sync workers (and `python app.py`) the call runs inline. In gevent workers it
+    runs on a native thread while the calling greenlet waits, so the hub keeps
+    serving I/O for other requests. With executor='sandbox' it runs in a child
+    process under CPU, memory, file-size and wall-clock limits; the child is taken
+    from a pool forked in advance from a server that has the converter libraries
+    loaded, so isolation costs a pipe round trip rather than a process start, and
+    whatever a native library leaks is returned when the child exits. Page processes
+    of a sandboxed job are forked from the sandbox, so each runs under the same
+    limits, and they are killed with it.
+
+    Args:
+        func: Converter callable (e.g. pdf_to_word)
+        *args, **kwargs: Arguments passed to the converter (picklable for 'sandbox')
+        executor: 'thread', 'inline' for calls too cheap to hand off, or 'sandbox'
+                  for untrusted documents and leaky native libraries; None (default)
+                  means 'thread', or 'sandbox' when SANDBOX_ALL is set
+
+    Returns:
+        Whatever the converter returns
+
+    Raises:
+        JobLimitError (JobMemoryError for memory) if a 'sandbox' job hits a limit
+    """
+    if executor is None:
+        executor = 'sandbox' if SANDBOX_ALL else 'thread'
+    if executor == 'sandbox':
+        if _gevent_active():
+            return _get_threadpool().spawn(_run_in_sandbox, func, args, kwargs).get()
+        return _run_in_sandbox(func, args, kwargs)
+    if executor == 'inline' or not _gevent_active():
+        return func(*args, **kwargs)
+    return _get_threadpool().spawn(func, *args, **kwargs).get()
+
+
+def process_context():
+    """
+    The multiprocessing context for conversion processes (page workers, sandboxes, batch runs)
+
+    forkserver children fork from a clean single-threaded server that has the converter
+    libraries imported, rather than from a request-serving worker that may hold locks in
+    other threads; spawn where forkserver is unavailable.
+    """
+    if _sandboxed:
+        # Page processes of a sandboxed job: forked from the sandbox, they inherit its
+        # limits and process group, and start with its libraries already loaded
+        return multiprocessing.get_context('fork')
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # Only takes effect before the forkserver starts, i.e. on first use
+    context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return context
+
+
+def _get_page_pool():
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=PAGE_WORKERS, mp_context=process_context())
+        logger.info(f"Page process pool started with {PAGE_WORKERS} processes")
+    return _page_pool
+
+
+def page_ranges(page_count, parts):
+    """Split range(page_count) into at most `parts` contiguous (start, stop) ranges"""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for index in range(parts):
+        stop = start + size + (1 if index < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def map_page_ranges(func, page_count, *args, workers=None, parts=None, progress=None):
+    """
+    Run a page-range function over a document, in parallel processes when worthwhile
+
+    func is called as func(*args, start, stop) and must be a module-level function
+    (it is pickled to the worker processes). Small documents, a single worker, and
+    gevent workers (whose patched locks can't wait on process futures from a native
+    thread) run it inline: as one range, or range by range when progress is reported.
+
+    Args:
+        func: Module-level callable processing pages [start, stop)
+        page_count: Number of pages in the document
+        *args: Leading arguments for func (paths and options, not open documents)
+        workers: Number of processes (default: PAGE_WORKERS)
+        parts: Number of ranges to split into (default: one per process); more ranges
+               than processes gives finer-grained progress
+        progress: Optional callable(pages_done, page_count), called as ranges finish
+
+    Returns:
+        List of func results, in page order
+    """
+    workers = PAGE_WORKERS if workers is None else workers
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES or _gevent_active():
+        if not progress:
+            return [func(*args, 0, page_count)]
+        results = []
+        for start, stop in page_ranges(page_count, parts or INLINE_PROGRESS_PARTS):
+            results.append(func(*args, start, stop))
+            progress(stop, page_count)
+        return results
+
+    global _page_pool
+    pool = _get_page_pool()
+    ranges = page_ranges(page_count, parts or workers)
+    futures = {}
+    try:
+        futures = {pool.submit(func, *args, start, stop): (start, stop) for start, stop in ranges}
+        done = 0
+        for future in as_completed(futures):
+            start, stop = futures[future]
+            future.result()
+            done += stop - start
+            if progress:
+                progress(done, page_count)
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A page process died (e.g. killed by the OOM killer); start a fresh pool next time
+        _page_pool = None
+        raise
+    except Exception:
+        # Don't leave the rest of the document queued behind a failed range
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def _isolated_page_worker(conn, func, args):
+    """Process loop for map_pages_isolated: receive a page, send back its outcome"""
+    while True:
+        try:
+            page = conn.recv()
+        except EOFError:
+            return
+        if page is None:
+            return
+        try:
+            outcome = ('ok', func(*args, page))
+        except Exception as e:
+            outcome = ('error', str(e))
+        conn.send(outcome)
+
+
+def map_pages_isolated(func, pages, *args, timeout, workers=None):
+    """
+    Run a function on pages one at a time in worker processes that can be killed
+
+    Unlike map_page_ranges, each page is its own task with a deadline: a worker that
+    is still busy after `timeout` seconds is killed and replaced, as is one that dies
+    (e.g. segfaults in a native library), so one pathological page costs at most one
+    timeout and never takes the calling worker with it. Gevent workers (which can't wait
+    on these processes from a conversion thread) run the pages one at a time in
+    sandboxes instead, with the same deadline; a crash there is reported as an error.
+
+    Args:
+        func: Module-level callable, called as func(*args, page)
+        pages: Page numbers to process
+        *args: Leading arguments for func (paths and options, not open documents)
+        timeout: Seconds allowed per page
+        workers: Number of processes (default: PAGE_WORKERS)
+
+    Returns:
+        Dict mapping each page to ('ok', result), ('error', message),
+        ('timeout', message) or ('crashed', message)
+    """
+    queue = deque(pages)
+    outcomes = {}
+    if _gevent_active():
+        for page in queue:
+            try:
+                outcomes[page] = ('ok', _run_in_sandbox(func, args + (page,), {}, timeout=timeout))
+            except JobTimeoutError:
+                logger.warning(f"Page {page} timed out after {timeout}s; sandbox killed")
+                outcomes[page] = ('timeout', f"no result after {timeout}s")
+            except Exception as e:
+                outcomes[page] = ('error', str(e))
+        return outcomes
+
+    context = process_context()
+    busy = {}  # connection -> (process, page, deadline)
+
+    def start_worker():
+        conn, child = context.Pipe()
+        process = context.Process(target=_isolated_page_worker, args=(child, func, args), daemon=True)
+        process.start()
+        child.close()
+        return conn, process
+
+    def assign(conn, process):
+        if queue:
+            page = queue.popleft()
+            conn.send(page)
+            busy[conn] = (process, page, time.monotonic() + timeout)
+        else:
+            conn.send(None)
+            conn.close()
+            process.join()
+
+    def replace(conn, process, page, outcome):
+        outcomes[page] = outcome
+        conn.close()
+        if queue:
+            assign(*start_worker())
+
+    try:
+        for _ in range(max(1, min(PAGE_WORKERS if workers is None else workers, len(queue)))):
+            assign(*start_worker())
+
+        while busy:
+            next_deadline = min(deadline for _, _, deadline in busy.values())
+            for conn in wait(list(busy), timeout=max(0.0, next_deadline - time.monotonic())):
+                process, page, _ = busy.pop(conn)
+                try:
+                    outcomes[page] = conn.recv()
+                except EOFError:
+                    process.join()
+                    replace(conn, process, page, ('crashed', f"worker exited with code {process.exitcode}"))
+                    continue
+                assign(conn, process)
+
+            now = time.monotonic()
+            for conn, (process, page, deadline) in list(busy.items()):
+                if deadline <= now:
+                    del busy[conn]
+                    process.kill()
+                    process.join()
+                    logger.warning(f"Page {page} timed out after {timeout}s; worker killed")
+                    replace(conn, process, page, ('timeout', f"no result after {timeout}s"))
+    finally:
+        for conn, (process, _, _) in busy.items():
+            process.kill()
+            conn.close()
+    return outcomes
@@ -0,0 +1,142 @@
+"""
+Shared-memory handoff of large byte strings between processes
+Documents cross process boundaries as file paths: the upload is spooled to disk
+once and opened by page workers and sandboxes through the shared page cache, and
+converters write outputs to disk and return their path. Some intermediate results
+are large in-memory byte strings, though, such as rendered slide images, and so
+may be the arguments and results of a sandboxed job. Pickled through a pipe, each
+one is copied by pickle, twice by the kernel and again by unpickling. The sender
+instead writes it once into a multiprocessing.shared_memory segment and passes a
+small handle, and the receiver reads it out and frees the segment.
+
+Segments are named after their Handoff, so closing it frees every segment that was
+never taken, e.g. results of page ranges discarded after another range failed. A
+sandbox names the handoffs of its job (and of the job's page processes) after the
+job's own, so the process that ran the job frees whatever it left behind, even when
+the sandbox was killed before it could clean up.
+"""
+
+import itertools
+import os
+import uuid
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# Results smaller than this are pickled as usual (a segment costs a few system calls)
+HANDOFF_MIN_SIZE = int(os.getenv('HANDOFF_MIN_SIZE', str(64 * 1024)))
+
+# Where POSIX shared memory is visible as files, so leftover segments can be listed
+_SHM_DIR = '/dev/shm'
+
+_sequence = itertools.count()
+
+# Prefix of the sandboxed job this process works for (see adopt_prefix)
+_job_prefix = None
+
+
+def adopt_prefix(prefix):
+    """Name this process's handoffs under a job's prefix (called in a sandbox)"""
+    global _job_prefix
+    _job_prefix = prefix
+
+
+class SharedBytes:
+    """Picklable handle of a byte string left in a shared memory segment by Handoff.put"""
+
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __getstate__(self):
+        return self.name, self.size
+
+    def __setstate__(self, state):
+        self.name, self.size = state
+
+
+class Handoff:
+    """
+    Shared-memory channel between the process that created it and its workers
+
+    Pass it to the worker function, have the worker return put(data) in place of
+    data, and call take() on each result in the owner; the owner can send data the
+    other way with share(). Use it as a context manager so segments that are never
+    taken are freed too.
+    """
+
+    def __init__(self):
+        self.owner = os.getpid()
+        self.prefix = f"{_job_prefix or 'ptk_'}{uuid.uuid4().hex[:12]}_"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def put(self, data):
+        """
+        Leave data in a shared memory segment for the owner (called in a worker)
+
+        Returns:
+            A SharedBytes handle, or data itself when it isn't bytes, is small, shared
+            memory is unavailable, or this already is the owning process (inline runs)
+        """
+        if os.getpid() == self.owner:
+            return data
+        return self._segment(data)
+
+    def share(self, data):
+        """
+        Leave data in a shared memory segment for a worker (called in the owner)
+
+        Returns:
+            A SharedBytes handle for the worker to take(), or data itself when it
+            isn't bytes, is small or shared memory is unavailable
+        """
+        return self._segment(data)
+
+    def _segment(self, data):
+        if shared_memory is None or not isinstance(data, (bytes, bytearray)) or len(data) < HANDOFF_MIN_SIZE:
+            return data
+        name = f"{self.prefix}{os.getpid()}_{next(_sequence)}"
+        segment = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        try:
+            segment.buf[:len(data)] = data
+        except Exception:
+            segment.close()
+            segment.unlink()
+            raise
+        # Only this process's mapping goes; the segment stays until taken
+        segment.close()
+        return SharedBytes(name, len(data))
+
+    def take(self, item):
+        """Return the bytes behind a put() or share() result, freeing its segment"""
+        if not isinstance(item, SharedBytes):
+            return item
+        segment = shared_memory.SharedMemory(name=item.name)
+        try:
+            return bytes(segment.buf[:item.size])
+        finally:
+            segment.close()
+            segment.unlink()
+
+    def close(self):
+        """Free every segment of this handoff that was not taken"""
+        if shared_memory is None or not os.path.isdir(_SHM_DIR):
+            return
+        for name in os.listdir(_SHM_DIR):
+            if not name.startswith(self.prefix):
+                continue
+            try:
+                segment = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                continue
+            segment.close()
+            segment.unlink()
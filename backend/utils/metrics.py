@@ -0,0 +1,53 @@
+"""
+Per-operation metrics
+In-process counters keyed by operation id, seeded from the operation registry so
+every operation is reported even before it first runs.
+"""
+
+import threading
+
+from utils.operations import OPERATIONS
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _empty(operation):
+    return {
+        'cost_class': operation.cost_class,
+        'count': 0,
+        'errors': 0,
+        'total_seconds': 0.0,
+        'max_seconds': 0.0,
+    }
+
+
+def record(operation_id, seconds, ok=True):
+    """
+    Record one run of an operation
+
+    Args:
+        operation_id: Registry id of the operation
+        seconds: Wall-clock duration of the converter call
+        ok: False if the converter raised or produced no output
+    """
+    with _lock:
+        stats = _stats.get(operation_id)
+        if stats is None:
+            stats = _stats[operation_id] = _empty(OPERATIONS[operation_id])
+        stats['count'] += 1
+        stats['total_seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        if not ok:
+            stats['errors'] += 1
+
+
+def snapshot():
+    """Return a copy of all counters, including operations that never ran"""
+    with _lock:
+        result = {}
+        for operation_id, operation in OPERATIONS.items():
+            stats = dict(_stats.get(operation_id) or _empty(operation))
+            stats['mean_seconds'] = stats['total_seconds'] / stats['count'] if stats['count'] else 0.0
+            result[operation_id] = stats
+        return result
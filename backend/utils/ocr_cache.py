@@ -0,0 +1,74 @@
+"""
+OCR result cache
+OCR output is keyed by a hash of the rendered page image (plus language and
+resolution), so a page that was already recognized - in a resubmitted document
+or a recurring cover sheet - skips Tesseract. Entries are small JSON files shared
+by every worker and page process on the node.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_ocr'))
+
+# Entries not used for this many seconds are removed by cleanup()
+OCR_CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', str(7 * 24 * 3600)))
+
+
+def _path(key):
+    return os.path.join(OCR_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get(key):
+    """Return the cached result for a key, or None"""
+    path = _path(key)
+    try:
+        with open(path, 'r') as f:
+            value = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        # Hits keep an entry alive
+        os.utime(path)
+    except OSError:
+        pass
+    return value
+
+
+def put(key, value):
+    """Store a result (atomic replace, so readers never see a partial file)"""
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(value, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def cleanup(max_age=None):
+    """
+    Remove entries not used for max_age seconds
+
+    Returns:
+        Number of entries removed
+    """
+    max_age = OCR_CACHE_TTL if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    if not os.path.isdir(OCR_CACHE_DIR):
+        return removed
+    for shard in os.listdir(OCR_CACHE_DIR):
+        shard_dir = os.path.join(OCR_CACHE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for filename in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
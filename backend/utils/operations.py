@@ -0,0 +1,333 @@
+"""
+Operation registry for the PDF Toolkit API
+One descriptor per operation drives request validation, dispatch, the
+/api/operations listing and per-operation metrics.
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Cost classes, cheapest first. Used to weigh operations against each other.
+COST_CLASSES = ('light', 'medium', 'heavy')
+
+# Executors understood by utils.executor.run_conversion
+EXECUTORS = ('inline', 'thread', 'sandbox')
+
+# Allowed file extensions for each Operation.file_type
+ALLOWED_EXTENSIONS = {
+    'pdf': ['pdf'],
+    'word': ['doc', 'docx'],
+    'text': ['txt'],
+    'image': ['png', 'jpg', 'jpeg', 'bmp', 'gif', 'tiff', 'tif', 'webp', 'svg', 'ico'],
+    'powerpoint': ['ppt', 'pptx'],
+    'excel': ['xls', 'xlsx']
+}
+
+
+class ParamError(ValueError):
+    """A request parameter that its Param.type cannot parse (a client error, not a failed conversion)"""
+
+
+def parse_page_list(value):
+    """Parse '1, 3,5' into [1, 3, 5]"""
+    return [int(p.strip()) for p in value.split(',') if p.strip()]
+
+
+def parse_page_ranges(value):
+    """Parse '1-3, 4-10,11' into [(1, 3), (4, 10), (11, 11)]"""
+    ranges = []
+    for part in value.split(','):
+        if part.strip():
+            first, _, last = part.partition('-')
+            ranges.append((int(first), int(last or first)))
+    return ranges
+
+
+@dataclass(frozen=True)
+class Param:
+    """A form parameter accepted by an operation"""
+    name: str                      # form field name
+    arg: str                       # converter keyword argument
+    type: Callable[[str], Any]     # parser applied to the raw form value
+    default: Any
+    description: str
+
+
+@dataclass(frozen=True)
+class Upload:
+    """An extra file accepted by an operation besides its inputs (e.g. a watermark image)"""
+    name: str                      # request.files field name
+    arg: str                       # converter keyword argument receiving the saved path
+    file_type: str                 # key of ALLOWED_EXTENSIONS used to validate it
+    description: str
+
+
+@dataclass(frozen=True)
+class Operation:
+    """Descriptor for a single operation"""
+    id: str
+    name: str
+    description: str
+    accepts: str                   # display label for the UI (PDF, DOCX, Images...)
+    produces: str
+    file_type: str                 # key of ALLOWED_EXTENSIONS used to validate inputs
+    converter: str                 # function name in utils.pdf_converter (resolved lazily)
+    invalid_message: str
+    output_suffix: Optional[str] = None   # smart-rename suffix; None keeps the converter's name
+    multiple: bool = False
+    params: Tuple[Param, ...] = ()
+    uploads: Tuple[Upload, ...] = ()
+    cost_class: str = 'medium'
+    cacheable: bool = True
+    executor: Optional[str] = None    # None: 'thread', or 'sandbox' under SANDBOX_ALL
+    progress: bool = False         # converter accepts a progress=callable(done, total) argument
+
+    def resolve_converter(self):
+        """Import and return the converter callable"""
+        return _resolve(self.converter)
+
+    def parse_params(self, form):
+        """
+        Build converter keyword arguments from request form data
+
+        Missing parameters, and blank ones other than strings, take their default.
+
+        Args:
+            form: Mapping with a get(name) method (e.g. request.form)
+
+        Returns:
+            Dict of converter keyword arguments
+
+        Raises:
+            ParamError: A value its parameter's type cannot parse
+        """
+        kwargs = {}
+        for param in self.params:
+            raw = form.get(param.name)
+            if raw is None or (param.type is not str and not raw.strip()):
+                kwargs[param.arg] = param.default
+                continue
+            try:
+                kwargs[param.arg] = param.type(raw)
+            except (TypeError, ValueError):
+                raise ParamError(f"Invalid value for {param.name}: {raw!r} (expected {param.description})")
+        return kwargs
+
+    def to_dict(self):
+        """Public description served by /api/operations"""
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'accepts': self.accepts,
+            'produces': self.produces,
+            'multiple': self.multiple,
+            'progress': self.progress,
+        }
+        if self.params:
+            data['params'] = {param.name: param.description for param in self.params}
+        if self.uploads:
+            data['uploads'] = {upload.name: upload.description for upload in self.uploads}
+        return data
+
+
+_converters = {}
+
+
+def _resolve(name):
+    func = _converters.get(name)
+    if func is None:
+        module = importlib.import_module('utils.pdf_converter')
+        func = _converters[name] = getattr(module, name)
+    return func
+
+
+_PDF_MESSAGE = 'Invalid file type. Please upload a PDF file.'
+
+_OCR_PARAMS = (
+    Param('ocr', 'ocr', str, 'off', 'off (default), auto (OCR scanned pages) or force (OCR every page)'),
+    Param('language', 'language', str, 'eng', 'Tesseract language(s), e.g. eng or eng+deu'),
+)
+
+OPERATIONS: Dict[str, Operation] = {op.id: op for op in (
+    Operation(
+        id='pdf_to_word', name='PDF to Word',
+        description='Convert PDF files to editable Word documents',
+        accepts='PDF', produces='DOCX', file_type='pdf', converter='pdf_to_word',
+        invalid_message=_PDF_MESSAGE, output_suffix='_word', cost_class='heavy', progress=True,
+        executor='sandbox',
+        params=_OCR_PARAMS,
+    ),
+    Operation(
+        id='pdf_to_text', name='PDF to Text',
+        description='Extract text content from PDF files',
+        accepts='PDF', produces='TXT', file_type='pdf', converter='pdf_to_text',
+        invalid_message=_PDF_MESSAGE, output_suffix='_text', progress=True,
+        params=(Param('format', 'output_format', str, 'txt',
+                      'txt (default) or json (compact JSON, one array of lines per page)'),) + _OCR_PARAMS,
+    ),
+    Operation(
+        id='pdf_to_images', name='PDF to Images',
+        description='Convert PDF pages to image files (ZIP)',
+        accepts='PDF', produces='ZIP', file_type='pdf', converter='pdf_to_images',
+        invalid_message=_PDF_MESSAGE, cost_class='heavy', progress=True, executor='sandbox',
+    ),
+    Operation(
+        id='word_to_pdf', name='Word to PDF',
+        description='Convert Word documents to PDF format',
+        accepts='DOCX', produces='PDF', file_type='word', converter='word_to_pdf',
+        invalid_message='Invalid file type. Please upload a Word document.', output_suffix='',
+        cost_class='heavy',
+    ),
+    Operation(
+        id='text_to_pdf', name='Text to PDF',
+        description='Convert text files to PDF format',
+        accepts='TXT', produces='PDF', file_type='text', converter='text_to_pdf',
+        invalid_message='Invalid file type. Please upload a text file.', output_suffix='',
+        params=(Param('backend', 'backend', str, 'native',
+                      'native (default, streams large files), reportlab or fitz'),),
+    ),
+    Operation(
+        id='images_to_pdf', name='Images to PDF',
+        description='Combine multiple images into a single PDF',
+        accepts='Images', produces='PDF', file_type='image', converter='images_to_pdf',
+        invalid_message='Invalid file type. Please upload image files.', multiple=True,
+    ),
+    Operation(
+        id='extract_images', name='Extract Images',
+        description='Extract all images from a PDF file (ZIP)',
+        accepts='PDF', produces='ZIP', file_type='pdf', converter='extract_images_from_pdf',
+        invalid_message=_PDF_MESSAGE,
+        params=(
+            Param('image_format', 'image_format', str, 'original',
+                  'original (as stored in the PDF, default), png or jpeg'),
+            Param('min_size', 'min_size', int, 0, 'integer minimum width/height in pixels (default 0)'),
+        ),
+    ),
+    Operation(
+        id='reverse_pdf', name='Reverse PDF',
+        description='Reverse the page order of a PDF file',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='reverse_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_reversed', cost_class='light',
+    ),
+    Operation(
+        id='merge_pdfs', name='Merge PDFs',
+        description='Combine multiple PDF files into one',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='merge_pdfs',
+        invalid_message='Invalid file type. Please upload PDF files only.', output_suffix='_merged',
+        multiple=True, cost_class='light', progress=True,
+        params=(Param('mode', 'mode', str, 'stream',
+                      'stream (default, one input in memory at a time) or pypdf2'),),
+    ),
+    Operation(
+        id='split_pdf', name='Split PDF',
+        description='Extract a range of pages, or split a PDF into many files (ZIP)',
+        accepts='PDF', produces='PDF/ZIP', file_type='pdf', converter='split_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_split', cost_class='light', progress=True,
+        params=(
+            Param('start_page', 'start_page', int, 1, 'integer'),
+            Param('end_page', 'end_page', int, 1, 'integer'),
+            Param('mode', 'mode', str, 'range',
+                  'range (start_page-end_page, default), ranges, every or bookmarks (ZIP of parts)'),
+            Param('ranges', 'ranges', parse_page_ranges, None,
+                  'comma-separated page ranges for mode=ranges (e.g., 1-3,4-10,11)'),
+            Param('every', 'every', int, 0, 'integer pages per part for mode=every'),
+        ),
+    ),
+    Operation(
+        id='compress_pdf', name='Compress PDF',
+        description='Reduce PDF file size while maintaining readability',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='compress_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_compressed',
+    ),
+    Operation(
+        id='rotate_pdf', name='Rotate PDF',
+        description='Rotate all pages in a PDF (90°, 180°, 270°)',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='rotate_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_rotated', cost_class='light',
+        params=(Param('rotation', 'rotation', int, 90, 'integer (90, 180, 270)'),),
+    ),
+    Operation(
+        id='add_watermark', name='Add Watermark',
+        description='Add a text or image watermark to all PDF pages',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='add_watermark',
+        invalid_message=_PDF_MESSAGE, output_suffix='_watermarked',
+        params=(
+            Param('watermark', 'watermark_text', str, 'Watermark', 'string'),
+            Param('opacity', 'opacity', float, 1.0, 'number from 0 (invisible) to 1 (opaque, default)'),
+            Param('rotation', 'rotation', int, 0, 'integer degrees counter-clockwise (default 0)'),
+        ),
+        uploads=(Upload('watermark_image', 'image_path', 'image',
+                        'optional image file used instead of the text'),),
+    ),
+    Operation(
+        id='remove_pages', name='Remove Pages',
+        description='Remove specific pages from a PDF',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='remove_pages',
+        invalid_message=_PDF_MESSAGE, output_suffix='_removed', cost_class='light',
+        params=(Param('pages', 'pages_to_remove', parse_page_list, [1],
+                      'comma-separated page numbers (e.g., 1,3,5)'),),
+    ),
+    Operation(
+        id='pdf_to_powerpoint', name='PDF to PowerPoint',
+        description='Convert PDF pages to PowerPoint presentation',
+        accepts='PDF', produces='PPTX', file_type='pdf', converter='pdf_to_powerpoint',
+        invalid_message=_PDF_MESSAGE, output_suffix='_presentation', cost_class='heavy', progress=True,
+        executor='sandbox',
+        params=(
+            Param('dpi', 'dpi', int, 144, 'integer render resolution (36-600, default 144)'),
+            Param('image_format', 'image_format', str, 'auto',
+                  'png, jpeg or auto (JPEG for photo pages, default)'),
+            Param('mode', 'mode', str, 'image', 'image (default) or text (editable text boxes)'),
+        ),
+    ),
+    Operation(
+        id='powerpoint_to_pdf', name='PowerPoint to PDF',
+        description='Convert PowerPoint presentations to PDF format',
+        accepts='PPTX', produces='PDF', file_type='powerpoint', converter='powerpoint_to_pdf',
+        invalid_message='Invalid file type. Please upload a PowerPoint file.', output_suffix='',
+        cost_class='heavy',
+    ),
+    Operation(
+        id='excel_to_pdf', name='Excel to PDF',
+        description='Convert Excel spreadsheets to PDF format',
+        accepts='XLSX', produces='PDF', file_type='excel', converter='excel_to_pdf',
+        invalid_message='Invalid file type. Please upload an Excel file.', output_suffix='',
+        cost_class='heavy',
+    ),
+    Operation(
+        id='add_page_numbers', name='Add Page Numbers',
+        description='Add page numbers to PDF document',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='add_page_numbers',
+        invalid_message=_PDF_MESSAGE, output_suffix='_numbered',
+    ),
+    Operation(
+        id='ocr_pdf', name='OCR PDF',
+        description='Make scanned PDFs searchable with OCR',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='ocr_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_ocr', cost_class='heavy', progress=True,
+        executor='sandbox',
+        params=(
+            Param('mode', 'mode', str, 'auto', 'auto (pages without text, default) or force (every page)'),
+            Param('language', 'language', str, 'eng', 'Tesseract language(s), e.g. eng or eng+deu'),
+            Param('dpi', 'dpi', int, 300, 'integer render resolution for recognition (72-600, default 300)'),
+        ),
+    ),
+    Operation(
+        id='repair_pdf', name='Repair PDF',
+        description='Repair damaged or corrupt PDF files',
+        accepts='PDF', produces='PDF', file_type='pdf', converter='repair_pdf',
+        invalid_message=_PDF_MESSAGE, output_suffix='_repaired',
+    ),
+)}
+
+
+def get_operation(operation_id):
+    """Return the Operation for an id, or None if unknown"""
+    return OPERATIONS.get(operation_id)
+
+
+def list_operations():
+    """Public descriptions of all operations, in registry order"""
+    return [op.to_dict() for op in OPERATIONS.values()]
@@ -3,90 +3,154 @@ Utility functions for PDF conversion operations
 Refactored from individual scripts to support web application
 """
 
+import io
 import os
+import json
+import hashlib
 import shutil
 import zipfile
+import importlib
+import re
+import zlib
+from collections import namedtuple
+from itertools import islice
 from datetime import datetime
 import PyPDF2
 
-# Optional imports - make each dependency optional
-try:
-    import fitz  # PyMuPDF
-    HAVE_FITZ = True
-except Exception:
-    fitz = None
-    HAVE_FITZ = False
-
-try:
-    from pdf2docx import Converter
-    HAVE_PDF2DOCX = True
-except Exception:
-    Converter = None
-    HAVE_PDF2DOCX = False
-
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    HAVE_REPORTLAB = True
-except Exception:
-    canvas = None
-    letter = None
-    HAVE_REPORTLAB = False
-
-try:
-    from PIL import Image
-    HAVE_PIL = True
-except Exception:
-    Image = None
-    HAVE_PIL = False
-
-try:
-    from docx2pdf import convert as docx2pdf_convert
-    HAVE_DOCX2PDF = True
-except Exception:
-    docx2pdf_convert = None
-    HAVE_DOCX2PDF = False
-
-try:
-    from pptx import Presentation
-    HAVE_PPTX = True
-except Exception:
-    Presentation = None
-    HAVE_PPTX = False
-
-try:
-    from openpyxl import load_workbook
-    HAVE_OPENPYXL = True
-except Exception:
-    load_workbook = None
-    HAVE_OPENPYXL = False
+# Optional dependencies are imported the first time a converter needs them rather than
+# at module load, so workers boot fast and only pay for the libraries they actually use.
+# name -> (module, attribute or None for the module itself)
+OPTIONAL_DEPENDENCIES = {
+    'fitz': ('fitz', None),  # PyMuPDF
+    'Converter': ('pdf2docx', 'Converter'),
+    'canvas': ('reportlab.pdfgen.canvas', None),
+    'letter': ('reportlab.lib.pagesizes', 'letter'),
+    'Image': ('PIL.Image', None),
+    'docx2pdf_convert': ('docx2pdf', 'convert'),
+    'Presentation': ('pptx', 'Presentation'),
+    'Pt': ('pptx.util', 'Pt'),
+    'RGBColor': ('pptx.dml.color', 'RGBColor'),
+    'load_workbook': ('openpyxl', 'load_workbook'),
+}
+
+_loaded = {}
+
+
+def _optional(name):
+    """Return an optional dependency, importing it on first use (None if not installed)"""
+    if name not in _loaded:
+        module_name, attribute = OPTIONAL_DEPENDENCIES[name]
+        try:
+            module = importlib.import_module(module_name)
+            _loaded[name] = getattr(module, attribute) if attribute else module
+        except Exception:
+            _loaded[name] = None
+    return _loaded[name]
+
+
+def preload_dependencies(names=None):
+    """
+    Import optional dependencies up front instead of on first use
+    Used by the gunicorn master (GUNICORN_PRELOAD) so forked workers share them copy-on-write.
+    
+    Args:
+        names: Dependency names from OPTIONAL_DEPENDENCIES (default: all)
+    
+    Returns:
+        Dict mapping each name to whether it is available
+    """
+    return {name: _optional(name) is not None for name in (names or OPTIONAL_DEPENDENCIES)}
+
 
 import subprocess
 import platform
 
+from utils import ocr_cache
+from utils.executor import PAGE_WORKERS, PARALLEL_MIN_PAGES, map_page_ranges, map_pages_isolated
+from utils.handoff import Handoff
+
+
+# OCR (see ocr_pdf): modes accepted by the text/Word converters' ocr option, default
+# Tesseract language and the resolution pages are rendered at for recognition
+OCR_MODES = ('off', 'auto', 'force')
+OCR_LANGUAGE = 'eng'
+OCR_DPI = 300
 
-def pdf_to_word(pdf_path, output_folder, unique_id):
+
+def _parse_word_range(pdf_path, start, stop):
+    """
+    Parse pages [start, stop) with pdf2docx
+    Runs in a page worker process (see utils.executor.map_page_ranges).
+    
+    Returns:
+        pdf2docx's stored page data, restored into the stitching Converter
+    """
+    Converter = _optional('Converter')
+    converter = Converter(pdf_path)
+    try:
+        converter.parse(start, stop, **converter.default_settings)
+        return converter.store()
+    finally:
+        converter.close()
+
+
+def pdf_to_word(pdf_path, output_folder, unique_id, progress=None, ocr='off', language=OCR_LANGUAGE):
     """
     Convert PDF to Word document
+    Long documents are parsed in page shards on worker processes and stitched
+    into a single DOCX.
     
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        progress: Optional callable(pages_done, page_count)
+        ocr: 'off' (default), 'auto' or 'force'; OCRed pages get a text layer before
+             conversion, so scans come out as text
+        language: Tesseract language(s) for OCR
     
     Returns:
         Path to the generated Word file
     """
-    if not HAVE_PDF2DOCX:
+    Converter = _optional('Converter')
+    if Converter is None:
         raise Exception("pdf2docx is not installed. Install it with: python -m pip install pdf2docx")
     
+    searchable_path = None
     try:
         output_filename = f"{unique_id}_output.docx"
         output_path = os.path.join(output_folder, output_filename)
         
+        if ocr != 'off':
+            searchable_path = os.path.join(output_folder, f"{unique_id}_ocr_input.pdf")
+            _make_searchable(pdf_path, searchable_path, ocr, language, OCR_DPI)
+            pdf_path = searchable_path
+        
         converter = Converter(pdf_path)
-        converter.convert(output_path, start=0, end=None)
-        converter.close()
+        try:
+            settings = converter.default_settings
+            page_count = len(converter.fitz_doc)
+            if page_count >= PARALLEL_MIN_PAGES and PAGE_WORKERS > 1:
+                # Several shards per process so progress moves in small steps
+                shards = map_page_ranges(_parse_word_range, page_count, pdf_path,
+                                         parts=PAGE_WORKERS * 4, progress=progress)
+                for shard in shards:
+                    converter.restore(shard)
+            else:
+                converter.load_pages().parse_document(**settings)
+                pages = list(converter.pages)
+                for page in pages:
+                    page.skip_parsing = True
+                # Parse one page at a time so progress can be reported per page
+                for done, page in enumerate(pages, start=1):
+                    page.skip_parsing = False
+                    converter.parse_pages(**settings)
+                    page.skip_parsing = True
+                    if progress:
+                        progress(done, page_count)
+            converter.make_docx(output_path, **settings)
+        finally:
+            converter.close()
         
         return output_path
     except AttributeError as e:
@@ -97,9 +161,16 @@ def pdf_to_word(pdf_path, output_folder, unique_id):
         raise Exception(f"PDF to Word conversion failed: {str(e)}")
     except Exception as e:
         raise Exception(f"PDF to Word conversion failed: {str(e)}")
+    finally:
+        if searchable_path and os.path.exists(searchable_path):
+            os.remove(searchable_path)
+
+
+TEXT_FORMATS = ('txt', 'json')
 
 
-def pdf_to_text(pdf_path, output_folder, unique_id):
+def pdf_to_text(pdf_path, output_folder, unique_id, ocr='off', language=OCR_LANGUAGE, progress=None,
+                output_format='txt'):
     """
     Extract text from PDF
     
@@ -107,29 +178,53 @@ def pdf_to_text(pdf_path, output_folder, unique_id):
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        ocr: 'off' (default), 'auto' (OCR pages without usable text) or 'force' (OCR every page)
+        language: Tesseract language(s) for OCR
+        progress: Optional callable(pages_done, page_count)
+        output_format: 'txt' (pages separated by rules) or 'json' (compact
+                       {"page_count": n, "pages": [[line, ...], ...]}, written page by page)
     
     Returns:
         Path to the generated text file
     """
     try:
-        output_filename = f"{unique_id}_output.txt"
+        if output_format not in TEXT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(TEXT_FORMATS)}")
+        
+        output_filename = f"{unique_id}_output.{output_format}"
         output_path = os.path.join(output_folder, output_filename)
         
+        ocr_pages = _ocr_document(pdf_path, ocr, language, OCR_DPI) if ocr != 'off' else {}
+        
         with open(pdf_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             
+            page_count = len(pdf_reader.pages)
             with open(output_path, 'w', encoding='utf-8') as output_file:
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    output_file.write(text)
-                    output_file.write('\n' + '='*80 + '\n')
+                if output_format == 'json':
+                    output_file.write(f'{{"page_count":{page_count},"pages":[')
+                for number, page in enumerate(pdf_reader.pages):
+                    if number in ocr_pages:
+                        text = _ocr_lines(ocr_pages[number])
+                    else:
+                        text = page.extract_text()
+                    if output_format == 'json':
+                        output_file.write(',' if number else '')
+                        output_file.write(json.dumps(text.splitlines(), ensure_ascii=False, separators=(',', ':')))
+                    else:
+                        output_file.write(text)
+                        output_file.write('\n' + '='*80 + '\n')
+                    if progress:
+                        progress(number + 1, page_count)
+                if output_format == 'json':
+                    output_file.write(']}')
         
         return output_path
     except Exception as e:
         raise Exception(f"PDF to Text conversion failed: {str(e)}")
 
 
-def pdf_to_images(pdf_path, output_folder, unique_id):
+def pdf_to_images(pdf_path, output_folder, unique_id, progress=None):
     """
     Convert PDF pages to images
     
@@ -137,11 +232,13 @@ def pdf_to_images(pdf_path, output_folder, unique_id):
         pdf_path: Path to input PDF file
         output_folder: Directory to save output files
         unique_id: Unique identifier for the files
+        progress: Optional callable(pages_done, page_count)
     
     Returns:
         Path to the ZIP file containing all images
     """
-    if not HAVE_FITZ:
+    fitz = _optional('fitz')
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF\nOr install full requirements to enable PDF->image features.")
 
     try:
@@ -154,6 +251,8 @@ def pdf_to_images(pdf_path, output_folder, unique_id):
             pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
             image_path = os.path.join(temp_dir, f"page_{page_num}.png")
             pix.save(image_path)
+            if progress:
+                progress(page_num, doc.page_count)
         
         doc.close()
         
@@ -175,6 +274,65 @@ def pdf_to_images(pdf_path, output_folder, unique_id):
         raise Exception(f"PDF to Images conversion failed: {str(e)}")
 
 
+RENDER_FORMATS = ('jpeg', 'webp')
+
+
+def get_page_count(pdf_path):
+    """Return the number of pages in a PDF"""
+    fitz = _optional('fitz')
+    if fitz is None:
+        return len(PyPDF2.PdfReader(pdf_path).pages)
+    doc = fitz.open(pdf_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def render_page(pdf_path, page_number, width=None, dpi=None, image_format='jpeg', quality=80):
+    """
+    Render a single PDF page to an image, e.g. for previews and thumbnails
+    
+    Args:
+        pdf_path: Path to input PDF file
+        page_number: 1-based page number
+        width: Target image width in pixels (takes precedence over dpi)
+        dpi: Render resolution when no width is given (default 72)
+        image_format: 'jpeg' (default) or 'webp'
+        quality: Lossy quality, 1-100
+    
+    Returns:
+        Image bytes
+    """
+    fitz = _optional('fitz')
+    if fitz is None:
+        raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF")
+    if image_format not in RENDER_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RENDER_FORMATS)}")
+    
+    doc = fitz.open(pdf_path)
+    try:
+        if not 1 <= page_number <= doc.page_count:
+            raise ValueError(f"page must be between 1 and {doc.page_count}")
+        page = doc[page_number - 1]
+        
+        zoom = width / page.rect.width if width else (dpi or 72) / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        
+        if image_format == 'jpeg':
+            return pix.tobytes('jpeg', jpg_quality=quality)
+        
+        Image = _optional('Image')
+        if Image is None:
+            raise Exception("Pillow is not installed. Install it with: python -m pip install Pillow")
+        mode = 'RGB' if pix.n == 3 else 'L'
+        output = io.BytesIO()
+        Image.frombytes(mode, (pix.width, pix.height), pix.samples).save(output, 'WEBP', quality=quality)
+        return output.getvalue()
+    finally:
+        doc.close()
+
+
 def word_to_pdf(word_path, output_folder, unique_id):
     """
     Convert Word document to PDF
@@ -221,7 +379,8 @@ def word_to_pdf(word_path, output_folder, unique_id):
             pass  # Continue to next method
         
         # Method 2: Try using docx2pdf
-        if HAVE_DOCX2PDF:
+        docx2pdf_convert = _optional('docx2pdf_convert')
+        if docx2pdf_convert is not None:
             try:
                 docx2pdf_convert(word_path, output_path)
                 return output_path
@@ -229,7 +388,7 @@ def word_to_pdf(word_path, output_folder, unique_id):
                 pass  # Continue to next method
         
         # Method 3: Try using pdf2docx (reverse operation but works)
-        if HAVE_PDF2DOCX:
+        if _optional('Converter') is not None:
             try:
                 from docx import Document
                 # Load the docx file and save as temp with different name
@@ -269,63 +428,290 @@ def word_to_pdf(word_path, output_folder, unique_id):
         raise Exception(f"Word to PDF conversion failed: {str(e)}")
 
 
-def text_to_pdf(text_path, output_folder, unique_id):
+TEXT_PDF_BACKENDS = ('native', 'reportlab', 'fitz')
+
+# Page geometry (points) shared by every text_to_pdf backend: US Letter, 50pt margins,
+# Helvetica 12 on a 15pt leading -> 47 lines per page
+_TEXT_PAGE_WIDTH, _TEXT_PAGE_HEIGHT = 612, 792
+_TEXT_MARGIN = 50
+_TEXT_FONT_SIZE = 12
+_TEXT_LEADING = 15
+_TEXT_LINES_PER_PAGE = (_TEXT_PAGE_HEIGHT - 2 * _TEXT_MARGIN) // _TEXT_LEADING + 1
+
+_text_width_table = None
+
+
+def _helvetica_width_table():
+    """
+    Helvetica glyph widths for the 256 WinAnsi codes as a bytes.translate() table
+    
+    Widths are stored in units of 4/1000 em, rounded up, so sum(data.translate(table))
+    measures a cp1252-encoded line in C at a fraction of the cost of a per-glyph loop.
+    Rounding up can only overestimate a line (by under 4/1000 em per glyph), so wrapped
+    lines never overflow the margin.
+    
+    Returns:
+        256-byte translation table
+    """
+    global _text_width_table
+    if _text_width_table is None:
+        widths = None
+        try:
+            from reportlab.pdfbase import pdfmetrics
+            widths = list(pdfmetrics.getFont('Helvetica').widths)
+        except Exception:
+            fitz = _optional('fitz')
+            if fitz is not None:
+                font = fitz.Font('helv')
+                widths = []
+                for code in range(256):
+                    char = bytes([code]).decode('cp1252', errors='replace')
+                    widths.append(font.glyph_advance(ord(char)) * 1000 if code >= 32 else 0)
+        if widths is None:
+            raise Exception("reportlab or PyMuPDF is required for font metrics")
+        _text_width_table = bytes(min(255, -(-int(round(w)) // 4)) for w in widths)
+    return _text_width_table
+
+
+def _wrap_text_lines(f, max_width):
+    """
+    Wrap a text file to a width using Helvetica metrics
+    
+    The file is read and encoded about 1MB at a time; a block whose longest line would fit
+    even in the widest glyphs is passed through whole. Longer lines are broken at the last
+    space that fits, or at the overflowing glyph when a token is wider than the line.
+    
+    Args:
+        f: Text file opened with universal newlines
+        max_width: Line width in points
+    
+    Yields:
+        cp1252-encoded output lines (bytes)
+    """
+    table = _helvetica_width_table()
+    limit = int(max_width * 1000 / _TEXT_FONT_SIZE / 4)
+    widest = max(table)
+    fit = limit // widest
+    
+    for block in iter(lambda: f.readlines(1 << 20), []):
+        text = ''.join(block).expandtabs(8).encode('cp1252', errors='replace')
+        rows = text.split(b'\n')
+        if text.endswith(b'\n'):
+            rows.pop()
+        if max(map(len, rows)) * widest <= limit:
+            yield from rows
+            continue
+        
+        for data in rows:
+            if len(data) * widest <= limit:
+                yield data
+                continue
+            widths = data.translate(table)
+            if sum(widths) <= limit:
+                yield data
+                continue
+            
+            start, end = 0, len(data)
+            while start < end:
+                # Grow or shrink the previous row's glyph count until it just fits
+                count = min(fit, end - start)
+                width = sum(widths[start:start + count])
+                while width > limit:
+                    count -= 1
+                    width -= widths[start + count]
+                while start + count < end and width + widths[start + count] <= limit:
+                    width += widths[start + count]
+                    count += 1
+                fit = max(count, 1)
+                
+                if start + count >= end:
+                    yield data[start:]
+                    break
+                cut = data.rfind(b' ', start, start + count + 1)
+                if cut <= start:
+                    cut = start + fit
+                yield data[start:cut].rstrip(b' ')
+                start = cut
+                while start < end and data[start] == 32:
+                    start += 1
+
+
+def _text_pages(lines):
+    """Group wrapped lines into lists of one page each (always at least one page)"""
+    lines = iter(lines)
+    page = list(islice(lines, _TEXT_LINES_PER_PAGE))
+    yield page
+    while True:
+        page = list(islice(lines, _TEXT_LINES_PER_PAGE))
+        if not page:
+            return
+        yield page
+
+
+class _PdfFileWriter:
+    """
+    Write a PDF object by object
+    
+    Objects go to the file as soon as they are written and only their offsets are kept
+    for the cross-reference table, so memory doesn't grow with the document.
+    """
+    
+    def __init__(self, out, version='1.7'):
+        self.out = out
+        self.offsets = []
+        out.write(b'%%PDF-%s\n%%\xe2\xe3\xcf\xd3\n' % version.encode('ascii'))
+    
+    def reserve(self):
+        """Allocate an object number to be written later"""
+        self.offsets.append(None)
+        return len(self.offsets)
+    
+    def write(self, number, body, stream=None):
+        """Write a reserved object; stream data is written as-is (already encoded)"""
+        self.offsets[number - 1] = self.out.tell()
+        self.out.write(b'%d 0 obj\n' % number)
+        self.out.write(body)
+        if stream is not None:
+            self.out.write(b'\nstream\n')
+            self.out.write(stream)
+            self.out.write(b'\nendstream')
+        self.out.write(b'\nendobj\n')
+    
+    def add(self, body, stream=None):
+        """Write an object under a new number and return the number"""
+        number = self.reserve()
+        self.write(number, body, stream)
+        return number
+    
+    def close(self, catalog):
+        """Write the cross-reference table and trailer"""
+        xref_offset = self.out.tell()
+        size = len(self.offsets) + 1
+        self.out.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        self.out.write(b''.join(b'%010d 00000 n \n' % offset if offset is not None
+                                else b'0000000000 65535 f \n' for offset in self.offsets))
+        self.out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                       % (size, catalog, xref_offset))
+
+
+def _write_text_pdf_native(pages, output_path):
+    """
+    Stream pages of text straight to a PDF file
+    
+    Each page is one compressed content stream holding a single text object, written as
+    soon as it is laid out, so memory stays constant however large the input is (only the
+    xref offsets are kept). The font is the standard Helvetica, which needs no embedding.
+    
+    Args:
+        pages: Iterable of pages, each a list of cp1252-encoded lines
+        output_path: Path of the PDF to write
+    """
+    top = _TEXT_PAGE_HEIGHT - _TEXT_MARGIN + _TEXT_LEADING
+    header = (f"BT\n/F1 {_TEXT_FONT_SIZE} Tf\n{_TEXT_LEADING} TL\n"
+              f"{_TEXT_MARGIN} {top} Td\n").encode('ascii')
+    
+    with open(output_path, 'wb') as out:
+        writer = _PdfFileWriter(out, version='1.4')
+        catalog, page_tree = writer.reserve(), writer.reserve()
+        writer.write(catalog, b'<< /Type /Catalog /Pages %d 0 R >>' % page_tree)
+        font = writer.add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                          b'/Encoding /WinAnsiEncoding >>')
+        page_dict = (f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {_TEXT_PAGE_WIDTH} "
+                     f"{_TEXT_PAGE_HEIGHT}] /Resources << /Font << /F1 {font} 0 R >> >> "
+                     f"/Contents {{}} 0 R >>").encode('ascii')
+        page_ids = []
+        
+        for page in pages:
+            # Escape the whole page at once, then turn each line break into the ' operator
+            # (move to the next line and show the string)
+            text = (b'\n'.join(page).replace(b'\\', b'\\\\').replace(b'(', b'\\(')
+                    .replace(b')', b'\\)').replace(b'\n', b")'\n("))
+            stream = zlib.compress(header + b'(' + text + b")'\nET" if page else header + b'ET', 1)
+            
+            contents_id = writer.add(b'<< /Length %d /Filter /FlateDecode >>' % len(stream), stream)
+            page_ids.append(writer.add(page_dict.replace(b'{}', b'%d' % contents_id)))
+        
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+        writer.write(page_tree, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(page_ids))
+        writer.close(catalog)
+
+
+def _write_text_pdf_reportlab(pages, output_path):
+    """Write pages of text with reportlab, one text object per page"""
+    canvas = _optional('canvas')
+    if canvas is None:
+        raise Exception("reportlab is not installed. Install it with: python -m pip install reportlab")
+    
+    c = canvas.Canvas(output_path, pagesize=(_TEXT_PAGE_WIDTH, _TEXT_PAGE_HEIGHT))
+    for page in pages:
+        text = c.beginText(_TEXT_MARGIN, _TEXT_PAGE_HEIGHT - _TEXT_MARGIN)
+        text.setFont('Helvetica', _TEXT_FONT_SIZE, leading=_TEXT_LEADING)
+        for line in page:
+            text.textLine(line.decode('cp1252'))
+        c.drawText(text)
+        c.showPage()
+    c.save()
+
+
+def _write_text_pdf_fitz(pages, output_path):
+    """Write pages of text with PyMuPDF, one insert_text call per page"""
+    fitz = _optional('fitz')
+    if fitz is None:
+        raise Exception("PyMuPDF is not installed. Install it with: python -m pip install PyMuPDF")
+    
+    doc = fitz.open()
+    try:
+        for page in pages:
+            pdf_page = doc.new_page(width=_TEXT_PAGE_WIDTH, height=_TEXT_PAGE_HEIGHT)
+            if page:
+                pdf_page.insert_text(
+                    (_TEXT_MARGIN, _TEXT_MARGIN),  # fitz measures y from the top
+                    [line.decode('cp1252') for line in page],
+                    fontname='helv', fontsize=_TEXT_FONT_SIZE,
+                    lineheight=_TEXT_LEADING / _TEXT_FONT_SIZE,
+                )
+        doc.save(output_path)
+    finally:
+        doc.close()
+
+
+_TEXT_PDF_WRITERS = {
+    'native': _write_text_pdf_native,
+    'reportlab': _write_text_pdf_reportlab,
+    'fitz': _write_text_pdf_fitz,
+}
+
+
+def text_to_pdf(text_path, output_folder, unique_id, backend='native'):
     """
     Convert text file to PDF
     
+    Lines are wrapped to the page width using Helvetica glyph widths and each page is
+    drawn as a single text object. The input is read line by line; with the 'native'
+    backend the PDF is also written page by page, so memory use doesn't grow with the
+    size of the file. The reportlab and fitz backends keep the document in memory until
+    it is saved.
+    
     Args:
         text_path: Path to input text file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        backend: 'native' (default, streaming), 'reportlab' or 'fitz'
     
     Returns:
         Path to the generated PDF file
     """
-    if not HAVE_REPORTLAB:
-        raise Exception("reportlab is not installed. Install it with: python -m pip install reportlab")
+    if backend not in TEXT_PDF_BACKENDS:
+        raise Exception(f"Text to PDF conversion failed: backend must be one of {', '.join(TEXT_PDF_BACKENDS)}")
     
     try:
         output_filename = f"{unique_id}_output.pdf"
         output_path = os.path.join(output_folder, output_filename)
         
-        c = canvas.Canvas(output_path, pagesize=letter)
-        width, height = letter
-        
-        y_position = height - 50
-        line_height = 15
+        with open(text_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = _wrap_text_lines(f, _TEXT_PAGE_WIDTH - 2 * _TEXT_MARGIN)
+            _TEXT_PDF_WRITERS[backend](_text_pages(lines), output_path)
         
-        with open(text_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.rstrip('\n')
-                
-                # Create new page if needed
-                if y_position < 50:
-                    c.showPage()
-                    y_position = height - 50
-                
-                # Handle long lines by wrapping
-                if len(line) > 80:
-                    words = line.split()
-                    current_line = ""
-                    for word in words:
-                        test_line = current_line + " " + word if current_line else word
-                        if len(test_line) <= 80:
-                            current_line = test_line
-                        else:
-                            c.drawString(50, y_position, current_line)
-                            y_position -= line_height
-                            current_line = word
-                            if y_position < 50:
-                                c.showPage()
-                                y_position = height - 50
-                    if current_line:
-                        c.drawString(50, y_position, current_line)
-                        y_position -= line_height
-                else:
-                    c.drawString(50, y_position, line)
-                    y_position -= line_height
-        
-        c.save()
         return output_path
     except Exception as e:
         raise Exception(f"Text to PDF conversion failed: {str(e)}")
@@ -343,7 +729,8 @@ def images_to_pdf(image_paths, output_folder, unique_id):
     Returns:
         Path to the generated PDF file
     """
-    if not HAVE_PIL:
+    Image = _optional('Image')
+    if Image is None:
         raise Exception("Pillow (PIL) is not installed. Install it with: python -m pip install Pillow")
     
     try:
@@ -370,76 +757,189 @@ def images_to_pdf(image_paths, output_folder, unique_id):
         raise Exception(f"Images to PDF conversion failed: {str(e)}")
 
 
-def extract_images_from_pdf(pdf_path, output_folder, unique_id):
+EXTRACT_IMAGE_FORMATS = ('original', 'png', 'jpeg')
+
+# Formats that are already compressed and are stored in the ZIP as-is
+_COMPRESSED_IMAGE_EXTS = {'jpeg', 'jpg', 'png', 'jpx', 'jp2', 'jb2', 'webp', 'gif'}
+
+
+def _scan_image_range(pdf_path, start, stop):
+    """
+    List the images referenced by pages [start, stop)
+    
+    Returns:
+        List of (page_number, [(xref, width, height), ...]) in page order
+    """
+    fitz = _optional('fitz')
+    doc = fitz.open(pdf_path)
+    try:
+        pages = []
+        for page_index in range(start, stop):
+            refs = {}
+            for img in doc[page_index].get_images(full=True):
+                refs.setdefault(img[0], (img[0], img[2], img[3]))
+            pages.append((page_index + 1, list(refs.values())))
+        return pages
+    finally:
+        doc.close()
+
+
+def _extract_image_range(pdf_path, xrefs, image_dir, image_format, start, stop):
+    """
+    Extract xrefs[start:stop] into image_dir, one file per distinct content
+    
+    Files are named by the SHA-256 of the image as stored in the PDF, so identical images
+    behind different xrefs (even when extracted by different workers) land in the same file.
+    
+    Returns:
+        List of (xref, sha256, file name, byte size) in xref order
+    """
+    fitz = _optional('fitz')
+    doc = fitz.open(pdf_path)
+    try:
+        results = []
+        for xref in xrefs[start:stop]:
+            base_image = doc.extract_image(xref)
+            image_bytes = base_image["image"]
+            image_ext = base_image["ext"]
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            
+            if image_format == 'png' and image_ext != 'png':
+                pix = fitz.Pixmap(doc, xref)
+                if pix.colorspace and pix.colorspace.n > 3:
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                image_bytes, image_ext = pix.tobytes('png'), 'png'
+            elif image_format == 'jpeg' and image_ext not in ('jpeg', 'jpg'):
+                pix = fitz.Pixmap(doc, xref)
+                if pix.alpha:
+                    pix = fitz.Pixmap(pix, 0)
+                if pix.colorspace and pix.colorspace.n > 3:
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                image_bytes, image_ext = pix.tobytes('jpeg', jpg_quality=90), 'jpeg'
+            
+            filename = f"{digest}.{image_ext}"
+            image_path = os.path.join(image_dir, filename)
+            if not os.path.exists(image_path):
+                tmp_path = f"{image_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as img_file:
+                    img_file.write(image_bytes)
+                os.replace(tmp_path, image_path)
+            results.append((xref, digest, filename, len(image_bytes)))
+        return results
+    finally:
+        doc.close()
+
+
+def extract_images_from_pdf(pdf_path, output_folder, unique_id, image_format='original', min_size=0):
     """
     Extract all images from a PDF file
     
+    Each image is extracted once, however many pages reference it: references are
+    collected per xref, and images with identical content behind different xrefs are
+    stored once. Page scanning and extraction are split across PAGE_WORKERS processes for
+    large documents. The ZIP includes manifest.json, which lists every unique image with
+    the pages it appears on.
+    
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output files
         unique_id: Unique identifier for the files
+        image_format: 'original' (as stored in the PDF, default), 'png' or 'jpeg'
+        min_size: Skip images narrower or shorter than this many pixels (default: keep all)
     
     Returns:
         Path to the ZIP file containing all extracted images
     """
-    if not HAVE_FITZ:
+    fitz = _optional('fitz')
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF\nOr install full requirements to enable image extraction features.")
 
+    temp_dir = os.path.join(output_folder, f"{unique_id}_temp_images")
     try:
-        # Create temporary directory for images
-        temp_dir = os.path.join(output_folder, f"{unique_id}_temp_images")
-        os.makedirs(temp_dir, exist_ok=True)
+        if image_format not in EXTRACT_IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(EXTRACT_IMAGE_FORMATS)}")
         
         doc = fitz.open(pdf_path)
-        image_count = 0
-        
-        for page_number, page in enumerate(doc, start=1):
-            images = page.get_images(full=True)
-            
-            for img_index, img in enumerate(images, start=1):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                
-                image_filename = f"page_{page_number}_image_{img_index}.{image_ext}"
-                image_path = os.path.join(temp_dir, image_filename)
-                
-                with open(image_path, "wb") as img_file:
-                    img_file.write(image_bytes)
-                
-                image_count += 1
-        
+        page_count = doc.page_count
         doc.close()
         
-        if image_count == 0:
-            shutil.rmtree(temp_dir)
+        # xref -> pages it appears on, in first-appearance order
+        image_pages = {}
+        image_sizes = {}
+        reference_count = skipped = 0
+        for scanned in map_page_ranges(_scan_image_range, page_count, pdf_path):
+            for page_number, refs in scanned:
+                for xref, width, height in refs:
+                    reference_count += 1
+                    if width < min_size or height < min_size:
+                        skipped += 1
+                        continue
+                    image_pages.setdefault(xref, []).append(page_number)
+                    image_sizes[xref] = (width, height)
+        
+        if not image_pages:
             raise Exception("No images found in the PDF file")
         
+        os.makedirs(temp_dir, exist_ok=True)
+        xrefs = list(image_pages)
+        
+        # Group xrefs by content; the first one seen names the image
+        unique_images = {}
+        images_per_page = {}
+        for extracted in map_page_ranges(_extract_image_range, len(xrefs), pdf_path, xrefs,
+                                         temp_dir, image_format):
+            for xref, digest, filename, size in extracted:
+                image = unique_images.get(digest)
+                if image is None:
+                    first_page = image_pages[xref][0]
+                    index = images_per_page[first_page] = images_per_page.get(first_page, 0) + 1
+                    width, height = image_sizes[xref]
+                    image = unique_images[digest] = {
+                        'file': f"page_{first_page}_image_{index}.{filename.rsplit('.', 1)[1]}",
+                        'source': filename,
+                        'sha256': digest,
+                        'width': width,
+                        'height': height,
+                        'bytes': size,
+                        'xrefs': [],
+                        'pages': [],
+                    }
+                image['xrefs'].append(xref)
+                image['pages'] = sorted(set(image['pages']) | set(image_pages[xref]))
+        
+        manifest = {
+            'source': os.path.basename(pdf_path),
+            'page_count': page_count,
+            'image_format': image_format,
+            'min_size': min_size,
+            'references': reference_count,
+            'skipped_small': skipped,
+            'unique_images': len(unique_images),
+            'images': [],
+        }
+        
         # Create ZIP file
         zip_filename = f"{unique_id}_extracted_images.zip"
         zip_path = os.path.join(output_folder, zip_filename)
         
-        # Create ZIP with images
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, arcname=arcname)
-        
-        # Clean up temporary directory
-        shutil.rmtree(temp_dir)
-        
-        # Verify ZIP file exists
-        if not os.path.exists(zip_path):
-            raise Exception(f"Failed to create ZIP file at {zip_path}")
-        
-        print(f"Image extraction successful: {zip_path} ({image_count} images extracted)")
+            for image in unique_images.values():
+                source = image.pop('source')
+                compression = (zipfile.ZIP_STORED if source.rsplit('.', 1)[1] in _COMPRESSED_IMAGE_EXTS
+                               else zipfile.ZIP_DEFLATED)
+                zipf.write(os.path.join(temp_dir, source), arcname=image['file'],
+                           compress_type=compression)
+                manifest['images'].append(image)
+            zipf.writestr('manifest.json', json.dumps(manifest, indent=2))
+        
+        print(f"Image extraction successful: {zip_path} ({len(unique_images)} unique images, "
+              f"{reference_count} references)")
         return zip_path
     except Exception as e:
         print(f"Image extraction error: {str(e)}")
         raise Exception(f"Image extraction failed: {str(e)}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 def reverse_pdf(pdf_path, output_folder, unique_id):
@@ -473,7 +973,175 @@ def reverse_pdf(pdf_path, output_folder, unique_id):
         raise Exception(f"PDF reversal failed: {str(e)}")
 
 
-def merge_pdfs(pdf_paths, output_folder, unique_id):
+MERGE_MODES = ('stream', 'pypdf2')
+
+# An indirect reference, skipping over literal and hex strings (MuPDF escapes parentheses
+# inside literal strings, so they never nest in its output)
+_PDF_OBJECT_REF = re.compile(rb'\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|(?<![\w.])(\d+)\s+\d+\s+R')
+_PDF_LENGTH = re.compile(rb'/Length(?![\w.])\s*(?:\d+\s+\d+\s+R|\d+)')
+_PDF_PARENT = re.compile(rb'/Parent(?![\w.])\s*\d+\s+\d+\s+R')
+
+
+def _copy_pdf_objects(doc, writer, roots, numbers, shared, pages):
+    """
+    Copy the objects reachable from roots into the output, children before parents
+    
+    Args:
+        doc: Open fitz document being copied
+        writer: _PdfFileWriter for the output
+        roots: Source xrefs to copy (the pages, in order)
+        numbers: Source xref -> output number (None writes null). Page xrefs are reserved
+                 up front so links between pages resolve before the target is copied.
+        shared: Content digest -> output number, kept across inputs; an object whose
+                renumbered body and stream match one already written reuses it
+        pages: Source page xref -> (inherited attributes, output /Pages number)
+    """
+    done = set()
+    active = set()
+    cyclic = set()
+    xref_length = doc.xref_length()
+    
+    def load(xref):
+        body = doc.xref_object(xref, compressed=True).encode('latin-1')
+        stream = None
+        if doc.xref_is_stream(xref):
+            stream = doc.xref_stream_raw(xref) or b''
+            body = _PDF_LENGTH.sub(b'', body, count=1).rstrip()[:-2] + b'/Length %d>>' % len(stream)
+        if xref in pages:
+            body = _PDF_PARENT.sub(b'', body).rstrip()[:-2]
+            for key, value in pages[xref][0].items():
+                if doc.xref_get_key(xref, key)[0] == 'null':
+                    body += f"/{key} {value}".encode('latin-1')
+            body += b'>>'
+        children = [int(m.group(1)) for m in _PDF_OBJECT_REF.finditer(body) if m.group(1)]
+        return body, stream, iter(children)
+    
+    def renumber(match):
+        if not match.group(1):
+            return match.group(0)
+        number = numbers.get(int(match.group(1)))
+        return b'null' if number is None else b'%d 0 R' % number
+    
+    for root in roots:
+        if root in done:
+            continue
+        active.add(root)
+        stack = [(root,) + load(root)]
+        while stack:
+            xref, body, stream, children = stack[-1]
+            for child in children:
+                if child in done or (child in numbers and child not in active):
+                    continue
+                if child in active:
+                    # Reference back into an object still being copied: give it its number now
+                    if child not in numbers:
+                        numbers[child] = writer.reserve()
+                        cyclic.add(child)
+                    continue
+                if not 0 < child < xref_length:
+                    numbers[child] = None
+                    continue
+                active.add(child)
+                stack.append((child,) + load(child))
+                break
+            else:
+                stack.pop()
+                active.discard(xref)
+                done.add(xref)
+                body = _PDF_OBJECT_REF.sub(renumber, body)
+                if xref in pages:
+                    body = body[:-2] + b'/Parent %d 0 R>>' % pages[xref][1]
+                    writer.write(numbers[xref], body, stream)
+                elif xref in cyclic:
+                    writer.write(numbers[xref], body, stream)
+                elif body == b'null' and stream is None:
+                    numbers[xref] = None
+                else:
+                    digest = hashlib.sha1(body + b'\0' + (stream or b'')).digest()
+                    number = shared.get(digest)
+                    if number is None:
+                        number = shared[digest] = writer.add(body, stream)
+                    numbers[xref] = number
+
+
+def _copy_pages(doc, writer, page_tree, entries, numbers, shared):
+    """
+    Copy pages and everything they reference into the output
+    
+    Args:
+        entries: (page xref, inherited attributes) pairs from _page_tree, in output order
+        page_tree: Output number of the /Pages object the pages will belong to
+        numbers, shared: As for _copy_pdf_objects
+    
+    Returns:
+        Output object numbers of the pages
+    """
+    pages = {}
+    for xref, attrs in entries:
+        numbers[xref] = writer.reserve()
+        pages[xref] = (attrs, page_tree)
+    _copy_pdf_objects(doc, writer, [xref for xref, _ in entries], numbers, shared, pages)
+    return [numbers[xref] for xref, _ in entries]
+
+
+def _close_page_tree(writer, catalog, page_tree, kids):
+    """Write the reserved /Pages and /Catalog objects and finish the file"""
+    writer.write(page_tree, b'<< /Type /Pages /Kids [' +
+                 b' '.join(b'%d 0 R' % kid for kid in kids) + b'] /Count %d >>' % len(kids))
+    writer.write(catalog, b'<< /Type /Catalog /Pages %d 0 R >>' % page_tree)
+    writer.close(catalog)
+
+
+def _merge_pdfs_stream(pdf_paths, output_path, progress=None):
+    """
+    Merge PDFs by copying each input's page objects straight to the output file
+    
+    Inputs are opened one at a time and closed as soon as their pages are written, and
+    objects go to disk as they are copied, so memory stays flat however many files are
+    merged. Identical objects (the same font, image or content stream in several inputs)
+    are written once. Document-level data (outlines, forms, names) isn't carried over,
+    matching the PyPDF2 merge.
+    """
+    fitz = _optional('fitz')
+    with open(output_path, 'wb') as out:
+        writer = _PdfFileWriter(out)
+        catalog, page_tree = writer.reserve(), writer.reserve()
+        shared = {}
+        kids = []
+        
+        for done, pdf_path in enumerate(pdf_paths, start=1):
+            doc = fitz.open(pdf_path)
+            try:
+                if doc.needs_pass:
+                    raise ValueError(f"{os.path.basename(pdf_path)} is password protected")
+                nodes = [doc.pdf_catalog()]
+                tree = _page_tree(doc, nodes)
+                # Document structure isn't copied: references to it become null
+                kids.extend(_copy_pages(doc, writer, page_tree, tree, dict.fromkeys(nodes), shared))
+            finally:
+                doc.close()
+            if progress:
+                progress(done, len(pdf_paths))
+        
+        _close_page_tree(writer, catalog, page_tree, kids)
+
+
+def _merge_pdfs_pypdf2(pdf_paths, output_path, progress=None):
+    """Merge PDFs in memory with PyPDF2"""
+    writer = PyPDF2.PdfWriter()
+    
+    for done, pdf_path in enumerate(pdf_paths, start=1):
+        reader = PyPDF2.PdfReader(pdf_path)
+        for page in reader.pages:
+            writer.add_page(page)
+        if progress:
+            progress(done, len(pdf_paths))
+    
+    with open(output_path, 'wb') as output_file:
+        writer.write(output_file)
+
+
+def merge_pdfs(pdf_paths, output_folder, unique_id, mode='stream', progress=None):
     """
     Merge multiple PDF files into a single PDF
     
@@ -481,61 +1149,164 @@ def merge_pdfs(pdf_paths, output_folder, unique_id):
         pdf_paths: List of paths to input PDF files
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        mode: 'stream' (one input in memory at a time, shared resources written once)
+              or 'pypdf2' (all inputs held in memory); 'stream' needs PyMuPDF and falls
+              back to 'pypdf2' without it
+        progress: Optional callable(inputs_done, input_count)
     
     Returns:
         Path to the merged PDF file
     """
     try:
+        if mode not in MERGE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(MERGE_MODES)}")
+        
         output_filename = f"{unique_id}_merged.pdf"
         output_path = os.path.join(output_folder, output_filename)
         
-        writer = PyPDF2.PdfWriter()
-        
-        for pdf_path in pdf_paths:
-            reader = PyPDF2.PdfReader(pdf_path)
-            for page in reader.pages:
-                writer.add_page(page)
-        
-        with open(output_path, 'wb') as output_file:
-            writer.write(output_file)
+        if mode == 'stream' and _optional('fitz') is not None:
+            _merge_pdfs_stream(pdf_paths, output_path, progress)
+        else:
+            _merge_pdfs_pypdf2(pdf_paths, output_path, progress)
         
         return output_path
     except Exception as e:
         raise Exception(f"PDF merging failed: {str(e)}")
 
 
-def split_pdf(pdf_path, output_folder, unique_id, start_page, end_page):
+SPLIT_MODES = ('range', 'ranges', 'every', 'bookmarks')
+
+
+def _split_parts(doc, mode, ranges, every):
+    """
+    Plan the parts of a multi-output split
+    
+    Returns:
+        List of (file name, first page, last page), 0-based inclusive
+    """
+    page_count = doc.page_count
+    if mode == 'ranges':
+        if not ranges:
+            raise ValueError("ranges is required (e.g. 1-3,4-10,11)")
+        for first, last in ranges:
+            if not 1 <= first <= last <= page_count:
+                raise ValueError(f"range {first}-{last} is outside pages 1-{page_count}")
+        spans = [(first - 1, last - 1, None) for first, last in ranges]
+    elif mode == 'every':
+        if not every or every < 1:
+            raise ValueError("every must be a positive number of pages")
+        spans = [(first, min(first + every, page_count) - 1, None)
+                 for first in range(0, page_count, every)]
+    else:
+        starts = {}
+        for level, title, page in doc.get_toc(simple=True):
+            if level == 1 and 1 <= page <= page_count:
+                starts.setdefault(page - 1, title)
+        if not starts:
+            raise ValueError("document has no top-level bookmarks")
+        if 0 not in starts:
+            starts[0] = 'front matter'
+        firsts = sorted(starts)
+        spans = [(first, last - 1, starts[first]) for first, last in zip(firsts, firsts[1:] + [page_count])]
+    
+    parts = []
+    for index, (first, last, title) in enumerate(spans, 1):
+        label = re.sub(r'[^\w\- ]+', '', title or '').strip()[:60].replace(' ', '_')
+        label = label or f"p{first + 1}-{last + 1}"
+        parts.append((f"part_{index:03d}_{label}.pdf", first, last))
+    return parts
+
+
+def _write_split_parts(pdf_path, parts, part_dir, start, stop):
+    """Write parts[start:stop] of a split, opening the document once"""
+    fitz = _optional('fitz')
+    doc = fitz.open(pdf_path)
+    try:
+        nodes = [doc.pdf_catalog()]
+        tree = _page_tree(doc, nodes)
+        for name, first, last in parts[start:stop]:
+            # Pages outside this part (e.g. link targets) become null
+            numbers = dict.fromkeys(nodes)
+            numbers.update(dict.fromkeys(xref for xref, _ in tree))
+            with open(os.path.join(part_dir, name), 'wb') as out:
+                writer = _PdfFileWriter(out)
+                catalog, page_tree = writer.reserve(), writer.reserve()
+                kids = _copy_pages(doc, writer, page_tree, tree[first:last + 1], numbers, {})
+                _close_page_tree(writer, catalog, page_tree, kids)
+    finally:
+        doc.close()
+
+
+def split_pdf(pdf_path, output_folder, unique_id, start_page=1, end_page=1, mode='range',
+              ranges=None, every=0, progress=None):
     """
-    Extract a range of pages from a PDF file
+    Extract a range of pages from a PDF file, or split it into many files at once
+    
+    The multi-output modes parse the document once per worker process and write the
+    parts in parallel for large splits, then return them together as a ZIP.
     
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
-        start_page: Starting page number (1-based)
-        end_page: Ending page number (1-based, inclusive)
+        start_page: Starting page number (1-based), for mode 'range'
+        end_page: Ending page number (1-based, inclusive), for mode 'range'
+        mode: 'range' (one PDF), 'ranges' (one file per entry of ranges), 'every'
+              (a file every `every` pages) or 'bookmarks' (a file per top-level bookmark)
+        ranges: List of (first, last) 1-based inclusive page ranges
+        every: Pages per file for mode 'every'
+        progress: Optional callable(parts_done, part_count)
     
     Returns:
-        Path to the extracted PDF file
+        Path to the extracted PDF file, or to a ZIP of the parts
     """
     try:
-        output_filename = f"{unique_id}_split.pdf"
-        output_path = os.path.join(output_folder, output_filename)
+        if mode not in SPLIT_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SPLIT_MODES)}")
         
-        reader = PyPDF2.PdfReader(pdf_path)
-        writer = PyPDF2.PdfWriter()
+        if mode == 'range':
+            output_filename = f"{unique_id}_split.pdf"
+            output_path = os.path.join(output_folder, output_filename)
+            
+            reader = PyPDF2.PdfReader(pdf_path)
+            writer = PyPDF2.PdfWriter()
+            
+            # Convert to 0-based indexing
+            start = max(0, start_page - 1)
+            end = min(len(reader.pages), end_page)
+            
+            for page_num in range(start, end):
+                writer.add_page(reader.pages[page_num])
+            
+            with open(output_path, 'wb') as output_file:
+                writer.write(output_file)
+            
+            return output_path
         
-        # Convert to 0-based indexing
-        start = max(0, start_page - 1)
-        end = min(len(reader.pages), end_page)
+        fitz = _optional('fitz')
+        if fitz is None:
+            raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF")
         
-        for page_num in range(start, end):
-            writer.add_page(reader.pages[page_num])
+        doc = fitz.open(pdf_path)
+        try:
+            parts = _split_parts(doc, mode, ranges, every)
+        finally:
+            doc.close()
         
-        with open(output_path, 'wb') as output_file:
-            writer.write(output_file)
+        part_dir = os.path.join(output_folder, f"{unique_id}_split_parts")
+        os.makedirs(part_dir, exist_ok=True)
+        try:
+            map_page_ranges(_write_split_parts, len(parts), pdf_path, parts, part_dir,
+                            progress=progress)
+            
+            zip_path = os.path.join(output_folder, f"{unique_id}_split.zip")
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+                for name, _, _ in parts:
+                    zipf.write(os.path.join(part_dir, name), name)
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
         
-        return output_path
+        return zip_path
     except Exception as e:
         raise Exception(f"PDF splitting failed: {str(e)}")
 
@@ -552,7 +1323,8 @@ def compress_pdf(pdf_path, output_folder, unique_id):
     Returns:
         Path to the compressed PDF file
     """
-    if not HAVE_FITZ:
+    fitz = _optional('fitz')
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF")
     
     try:
@@ -603,37 +1375,328 @@ def rotate_pdf(pdf_path, output_folder, unique_id, rotation):
         raise Exception(f"PDF rotation failed: {str(e)}")
 
 
-def add_watermark(pdf_path, output_folder, unique_id, watermark_text):
+# Resource names used by stamping; unusual enough not to collide with a page's own resources
+_STAMP_XOBJECT = 'PTKStamp'
+_STAMP_FONT = 'PTKHelv'
+_STAMP_GSTATE = 'PTKAlpha'
+
+
+def _pdf_number(value):
+    return f"{value:.4f}".rstrip('0').rstrip('.') or '0'
+
+
+def _pdf_matrix(matrix):
+    return ' '.join(_pdf_number(v) for v in (matrix.a, matrix.b, matrix.c, matrix.d, matrix.e, matrix.f))
+
+
+def _pdf_text(text):
+    """Encode text as a PDF literal string for a WinAnsi font"""
+    data = text.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+_PageGeometry = namedtuple('_PageGeometry', 'number xref width height to_user')
+
+_PDF_REF = re.compile(rb'(\d+)\s+\d+\s+R')
+
+
+def _pdf_value(doc, xref, key):
+    """Read a key from a PDF object, following an indirect reference"""
+    kind, value = doc.xref_get_key(xref, key)
+    if kind == 'xref':
+        return _pdf_resolve(doc, value)
+    return kind, value
+
+
+def _pdf_resolve(doc, value):
+    """Return (kind, source) for a value, loading it if it is an indirect reference"""
+    match = _PDF_REF.fullmatch(value.strip().encode())
+    if not match:
+        return 'direct', value
+    target = doc.xref_object(int(match.group(1)), compressed=True)
+    return ('array' if target.lstrip().startswith('[') else 'other'), target
+
+
+def _pdf_box(value):
+    x0, y0, x1, y1 = (float(v) for v in value.strip()[1:-1].split())
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+# Page attributes a page inherits from its ancestors in the page tree
+_INHERITED_PAGE_KEYS = ('Resources', 'MediaBox', 'CropBox', 'Rotate')
+
+
+def _page_tree(doc, nodes=None):
     """
-    Add text watermark to all pages in a PDF
+    List the pages of a document by walking its page tree, without loading them
+    
+    Args:
+        doc: Open fitz document
+        nodes: Optional list that receives the xrefs of the intermediate /Pages nodes
+    
+    Returns:
+        List of (page xref, {key: value}) in page order, where the dict holds the
+        page's inheritable attributes (own or inherited) as raw PDF source
+    
+    Raises:
+        ValueError if the tree can't be followed or doesn't match the page count
+    """
+    pages = []
+    
+    def walk(xref, inherited, depth):
+        attrs = dict(inherited)
+        for key in _INHERITED_PAGE_KEYS:
+            kind, value = doc.xref_get_key(xref, key)
+            if kind != 'null':
+                attrs[key] = value
+        kind, kids = _pdf_value(doc, xref, 'Kids')
+        if kind == 'array':
+            if depth > 64:
+                raise ValueError("page tree too deep")
+            if nodes is not None:
+                nodes.append(xref)
+            for kid in _PDF_REF.findall(kids.encode()):
+                walk(int(kid), attrs, depth + 1)
+        else:
+            pages.append((xref, attrs))
+    
+    kind, root = doc.xref_get_key(doc.pdf_catalog(), 'Pages')
+    if kind != 'xref':
+        raise ValueError("document has no page tree")
+    walk(int(root.split()[0]), {}, 0)
+    if len(pages) != doc.page_count:
+        raise ValueError("page tree doesn't match the page count")
+    return pages
+
+
+def _page_geometries(doc):
+    """
+    Yield the geometry of every page from the page tree
+    
+    Avoids loading each page (the bulk of the cost of stamping large documents).
+    Falls back to loading pages if the tree can't be followed.
+    
+    Yields:
+        _PageGeometry with the page's visible size and a matrix from the page as
+        displayed (PDF-style: origin bottom-left, y up) to its user space, so stamps
+        land upright and centered on rotated and cropped pages alike
+    """
+    fitz = _optional('fitz')
+    try:
+        pages = _page_tree(doc)
+    except Exception:
+        for page in doc:
+            flip = fitz.Matrix(1, 0, 0, -1, 0, page.rect.height)
+            yield _PageGeometry(page.number, page.xref, page.rect.width, page.rect.height,
+                                flip * ~(page.transformation_matrix * page.rotation_matrix))
+        return
+    
+    for number, (xref, attrs) in enumerate(pages):
+        mx0, my0, mx1, my1 = _pdf_box(_pdf_resolve(doc, attrs.get('MediaBox', '[0 0 612 792]'))[1])
+        x0, y0, x1, y1 = (_pdf_box(_pdf_resolve(doc, attrs['CropBox'])[1]) if 'CropBox' in attrs
+                          else (mx0, my0, mx1, my1))
+        x0, y0, x1, y1 = max(x0, mx0), max(y0, my0), min(x1, mx1), min(y1, my1)
+        width, height = x1 - x0, y1 - y0
+        rotate = int(float(_pdf_resolve(doc, attrs.get('Rotate', '0'))[1])) % 360
+        
+        # User space -> displayed page, for each /Rotate (clockwise)
+        shift = fitz.Matrix(1, 0, 0, 1, -x0, -y0)
+        if rotate == 90:
+            to_visual, width, height = shift * fitz.Matrix(0, -1, 1, 0, 0, width), height, width
+        elif rotate == 180:
+            to_visual = shift * fitz.Matrix(-1, 0, 0, -1, width, height)
+        elif rotate == 270:
+            to_visual, width, height = shift * fitz.Matrix(0, 1, -1, 0, height, 0), height, width
+        else:
+            to_visual = shift
+        yield _PageGeometry(number, xref, width, height, ~to_visual)
+
+
+def _add_stamp_objects(doc):
+    """
+    Create the objects shared by every stamp in a document
+    
+    Returns:
+        Dict with the xrefs of the Helvetica font and the 'q' stream that saves the
+        page's graphics state before its original content
+    """
+    font = doc.get_new_xref()
+    doc.update_object(font, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    save_state = doc.get_new_xref()
+    doc.update_object(save_state, '<< >>')
+    doc.update_stream(save_state, b'q\n', new=True, compress=False)
+    return {'font': font, 'save_state': save_state}
+
+
+def _set_page_resource(doc, page_xref, category, name, ref, done):
+    """
+    Add /category/name -> ref to a page's resources
+    
+    Pages often share one indirect resources dictionary (and inherit it from the page
+    tree), so the dictionary actually holding the entry is located and updated once.
+    """
+    holder, path = page_xref, 'Resources'
+    kind, value = doc.xref_get_key(holder, path)
+    if kind == 'null':
+        # Inherited: copy the nearest ancestor's resources onto the page
+        parent = page_xref
+        while kind == 'null':
+            parent_kind, parent_ref = doc.xref_get_key(parent, 'Parent')
+            if parent_kind != 'xref':
+                break
+            parent = int(parent_ref.split()[0])
+            kind, value = doc.xref_get_key(parent, 'Resources')
+        doc.xref_set_key(page_xref, 'Resources', value if kind != 'null' else '<< >>')
+        kind, value = doc.xref_get_key(page_xref, 'Resources')
+    if kind == 'xref':
+        holder, path = int(value.split()[0]), None
+    
+    key = f"{path}/{category}" if path else category
+    kind, value = doc.xref_get_key(holder, key)
+    if kind == 'xref':
+        holder, key = int(value.split()[0]), None
+    if (holder, key, name) in done:
+        return
+    doc.xref_set_key(holder, f"{key}/{name}" if key else name, ref)
+    done.add((holder, key, name))
+
+
+def _stamp_pages(doc, shared, page_stream, resources):
+    """
+    Append a stamp to every page
+    
+    The page's original content is wrapped in q/Q, so whatever state it leaves behind
+    can't distort the stamp. Identical stamp streams (e.g. the same watermark on pages
+    of the same size) are stored once and referenced from each page.
+    
+    Args:
+        doc: Open fitz document
+        shared: Objects from _add_stamp_objects
+        page_stream: Callable(_PageGeometry) returning the stamp's content stream (bytes),
+                     or None to leave the page untouched
+        resources: List of (category, name, reference) entries the stream uses
+    """
+    streams = {}
+    done = set()
+    for page in _page_geometries(doc):
+        page_xref = page.xref
+        stamp = page_stream(page)
+        if stamp is None:
+            continue
+        content = b'Q\n' + stamp
+        xref = streams.get(content)
+        if xref is None:
+            xref = streams[content] = doc.get_new_xref()
+            doc.update_object(xref, '<< >>')
+            doc.update_stream(xref, content, new=True, compress=False)
+        
+        for category, name, ref in resources:
+            _set_page_resource(doc, page_xref, category, name, ref, done)
+        
+        kind, value = doc.xref_get_key(page_xref, 'Contents')
+        if kind == 'xref' and not doc.xref_is_stream(int(value.split()[0])):
+            kind, value = 'array', doc.xref_object(int(value.split()[0]), compressed=True)
+        existing = value.strip()[1:-1] if kind == 'array' else (value if kind == 'xref' else '')
+        doc.xref_set_key(page_xref, 'Contents',
+                         f"[{shared['save_state']} 0 R {existing} {xref} 0 R]")
+
+
+def _watermark_xobject(doc, shared, watermark_text, image_path, opacity):
+    """
+    Build the watermark once as a Form XObject
+    
+    Returns:
+        Tuple of (xref, width, height) of the form in its own units
+    """
+    fitz = _optional('fitz')
+    gstate = f"<< /Type /ExtGState /ca {_pdf_number(opacity)} /CA {_pdf_number(opacity)} >>"
+    
+    if image_path:
+        pix = fitz.Pixmap(image_path)
+        if pix.colorspace and pix.colorspace.n > 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        alpha = None
+        if pix.alpha:
+            alpha = pix.samples[pix.n - 1::pix.n]
+            pix = fitz.Pixmap(pix, 0)
+        width, height = pix.width, pix.height
+        colorspace = '/DeviceGray' if pix.n == 1 else '/DeviceRGB'
+        
+        smask = ''
+        if alpha is not None:
+            mask = doc.get_new_xref()
+            doc.update_object(mask, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                    f"/ColorSpace /DeviceGray /BitsPerComponent 8 >>")
+            doc.update_stream(mask, alpha, new=True)
+            smask = f" /SMask {mask} 0 R"
+        image = doc.get_new_xref()
+        doc.update_object(image, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                 f"/ColorSpace {colorspace} /BitsPerComponent 8{smask} >>")
+        doc.update_stream(image, pix.samples, new=True)
+        
+        resources = f"<< /XObject << /Im {image} 0 R >> /ExtGState << /GS {gstate} >> >>"
+        content = f"/GS gs {width} 0 0 {height} 0 0 cm /Im Do".encode('ascii')
+        bbox = (0, 0, width, height)
+    else:
+        fontsize = 48
+        width = fitz.get_text_length(watermark_text, fontname='helv', fontsize=fontsize)
+        height = fontsize
+        resources = f"<< /Font << /F1 {shared['font']} 0 R >> /ExtGState << /GS {gstate} >> >>"
+        content = (b'/GS gs 0.7 g BT /F1 %d Tf ' % fontsize + _pdf_text(watermark_text) + b' Tj ET')
+        bbox = (0, -fontsize * 0.25, width, fontsize)
+    
+    xref = doc.get_new_xref()
+    doc.update_object(xref, f"<< /Type /XObject /Subtype /Form /BBox [{' '.join(_pdf_number(v) for v in bbox)}] "
+                            f"/Resources {resources} >>")
+    doc.update_stream(xref, content, new=True)
+    return xref, width, height
+
+
+def add_watermark(pdf_path, output_folder, unique_id, watermark_text='Watermark', image_path=None,
+                  opacity=1.0, rotation=0):
+    """
+    Add a text or image watermark to all pages in a PDF
+    
+    The watermark is built once as a Form XObject and every page references it, so
+    stamping adds a few bytes per page instead of a copy of the text and font.
     
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
-        watermark_text: Text to add as watermark
+        watermark_text: Text to add as watermark (ignored when image_path is given)
+        image_path: Optional image (PNG, JPEG, ...) to use as the watermark instead
+        opacity: 0.0 (invisible) to 1.0 (opaque, default)
+        rotation: Counter-clockwise rotation in degrees (default 0)
     
     Returns:
         Path to the watermarked PDF file
     """
-    if not HAVE_FITZ:
+    fitz = _optional('fitz')
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF")
     
     try:
+        if not 0.0 <= opacity <= 1.0:
+            raise ValueError("opacity must be between 0 and 1")
+        
         output_filename = f"{unique_id}_watermarked.pdf"
         output_path = os.path.join(output_folder, output_filename)
         
         doc = fitz.open(pdf_path)
+        shared = _add_stamp_objects(doc)
+        xref, width, height = _watermark_xobject(doc, shared, watermark_text, image_path, opacity)
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            # Add watermark text to center of page
-            page.insert_text(
-                (page.rect.width / 2, page.rect.height / 2),
-                watermark_text,
-                fontsize=48,
-                color=(0.7, 0.7, 0.7)  # Light gray color
-            )
+        def stamp(page):
+            # Centered; images are scaled to fit half the page
+            scale = min(page.width / 2 / width, page.height / 2 / height) if image_path else 1
+            center = (fitz.Matrix(1, 0, 0, 1, -width / 2, -height * (0.5 if image_path else 0.35))
+                      * fitz.Matrix(scale, scale) * fitz.Matrix(rotation)
+                      * fitz.Matrix(1, 0, 0, 1, page.width / 2, page.height / 2))
+            placement = center * page.to_user
+            return f"q {_pdf_matrix(placement)} cm /{_STAMP_XOBJECT} Do Q".encode('ascii')
+        
+        _stamp_pages(doc, shared, stamp, [('XObject', _STAMP_XOBJECT, f"{xref} 0 R")])
         
         doc.save(output_path)
         doc.close()
@@ -678,54 +1741,153 @@ def remove_pages(pdf_path, output_folder, unique_id, pages_to_remove):
         raise Exception(f"Removing pages failed: {str(e)}")
 
 
-def pdf_to_powerpoint(pdf_path, output_folder, unique_id):
+SLIDE_IMAGE_FORMATS = ('auto', 'png', 'jpeg')
+SLIDE_MODES = ('image', 'text')
+
+
+def _slide_image_format(page, image_format):
+    """Pick PNG or JPEG for a page; 'auto' uses JPEG when images cover most of the page"""
+    if image_format != 'auto':
+        return image_format
+    fitz = _optional('fitz')
+    page_area = abs(page.rect) or 1
+    covered = sum(abs(page.rect & fitz.Rect(info['bbox'])) for info in page.get_image_info())
+    return 'jpeg' if covered / page_area >= 0.5 else 'png'
+
+
+def _page_text_lines(page):
+    """Text lines of a page as (bbox, text, font size, rgb int, bold, italic)"""
+    lines = []
+    for block in page.get_text('dict')['blocks']:
+        if block['type'] != 0:
+            continue
+        for line in block['lines']:
+            spans = [span for span in line['spans'] if span['text'].strip()]
+            if not spans:
+                continue
+            first = spans[0]
+            lines.append((line['bbox'], ''.join(span['text'] for span in line['spans']),
+                          max(span['size'] for span in spans), first['color'],
+                          bool(first['flags'] & 16), bool(first['flags'] & 2)))
+    return lines
+
+
+def _render_slide_range(pdf_path, dpi, image_format, jpeg_quality, mode, handoff, start, stop):
+    """
+    Render pages [start, stop) of a PDF to in-memory slide images
+    Runs in a page worker process (see utils.executor.map_page_ranges).
+    
+    Returns:
+        List of dicts with the image (bytes, or a shared memory handle from handoff),
+        page size and, in text mode, the text lines
+    """
+    fitz = _optional('fitz')
+    slides = []
+    with fitz.open(pdf_path) as pdf_doc:
+        for page_num in range(start, stop):
+            page = pdf_doc[page_num]
+            page_format = _slide_image_format(page, image_format)
+            text_lines = []
+            if mode == 'text':
+                # Keep text editable: collect it, then blank it out of the rendered background
+                text_lines = _page_text_lines(page)
+                for line in text_lines:
+                    page.add_redact_annot(fitz.Rect(line[0]), fill=False)
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+            pix = page.get_pixmap(dpi=dpi)
+            if page_format == 'jpeg':
+                data = pix.tobytes('jpeg', jpg_quality=jpeg_quality)
+            else:
+                data = pix.tobytes('png')
+            slides.append({'image': handoff.put(data), 'width': page.rect.width, 'height': page.rect.height,
+                           'text': text_lines})
+    return slides
+
+
+def _add_slide_text(slide, text_lines, scale_x, scale_y):
+    Pt = _optional('Pt')
+    RGBColor = _optional('RGBColor')
+    # Slide EMUs per PDF point vertically, expressed in points for font sizes
+    font_scale = scale_y / 12700
+    for (x0, y0, x1, y1), text, size, color, bold, italic in text_lines:
+        textbox = slide.shapes.add_textbox(int(x0 * scale_x), int(y0 * scale_y),
+                                           int((x1 - x0) * scale_x), int((y1 - y0) * scale_y))
+        frame = textbox.text_frame
+        frame.margin_left = frame.margin_right = frame.margin_top = frame.margin_bottom = 0
+        frame.word_wrap = False
+        run = frame.paragraphs[0].add_run()
+        run.text = text
+        run.font.size = Pt(max(1, round(size * font_scale, 1)))
+        run.font.bold = bold
+        run.font.italic = italic
+        run.font.color.rgb = RGBColor((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+
+
+def pdf_to_powerpoint(pdf_path, output_folder, unique_id, dpi=144, image_format='auto',
+                      mode='image', jpeg_quality=85, progress=None):
     """
     Convert PDF to PowerPoint presentation
+    Pages are rendered in memory (in parallel processes for large documents, which
+    return the images through shared memory) and streamed straight into the slides;
+    nothing is written to disk but the .pptx.
     
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        dpi: Render resolution (144 = 2x zoom)
+        image_format: 'png', 'jpeg', or 'auto' (JPEG for pages that are mostly images)
+        mode: 'image' (page picture) or 'text' (background picture plus editable text boxes)
+        jpeg_quality: JPEG quality (1-100)
+        progress: Optional callable(pages_done, page_count)
     
     Returns:
         Path to the output PowerPoint file
     """
-    if not HAVE_PPTX:
+    Presentation = _optional('Presentation')
+    fitz = _optional('fitz')
+    if Presentation is None:
         raise Exception("python-pptx is not installed. Install it with: pip install python-pptx")
-    if not HAVE_FITZ:
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: pip install PyMuPDF")
     
     try:
+        if image_format not in SLIDE_IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(SLIDE_IMAGE_FORMATS)}")
+        if mode not in SLIDE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SLIDE_MODES)}")
+        if not 36 <= dpi <= 600:
+            raise ValueError("dpi must be between 36 and 600")
+        
         output_filename = f"{unique_id}_converted.pptx"
         output_path = os.path.join(output_folder, output_filename)
         
-        # Open PDF and create presentation
-        pdf_doc = fitz.open(pdf_path)
+        with fitz.open(pdf_path) as pdf_doc:
+            page_count = pdf_doc.page_count
+        
         presentation = Presentation()
         
         # Set slide dimensions to match standard
         presentation.slide_width = int(10 * 914400)  # 10 inches in EMUs
         presentation.slide_height = int(7.5 * 914400)  # 7.5 inches
+        blank_layout = presentation.slide_layouts[6]  # Blank layout
         
-        for page_num in range(len(pdf_doc)):
-            page = pdf_doc[page_num]
-            # Convert page to image
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # High quality
+        # Page processes hand rendered images back through shared memory, not the result pipe
+        with Handoff() as handoff:
+            chunks = map_page_ranges(_render_slide_range, page_count, pdf_path, dpi, image_format,
+                                     jpeg_quality, mode, handoff, parts=PAGE_WORKERS * 4 if progress else None,
+                                     progress=progress)
             
-            # Save temp image
-            img_path = os.path.join(output_folder, f"temp_page_{page_num}.png")
-            pix.save(img_path)
-            
-            # Add blank slide and insert image
-            blank_layout = presentation.slide_layouts[6]  # Blank layout
-            slide = presentation.slides.add_slide(blank_layout)
-            slide.shapes.add_picture(img_path, 0, 0, width=presentation.slide_width, height=presentation.slide_height)
-            
-            # Clean up temp image
-            os.remove(img_path)
+            for rendered in (slide for chunk in chunks for slide in chunk):
+                slide = presentation.slides.add_slide(blank_layout)
+                slide.shapes.add_picture(io.BytesIO(handoff.take(rendered['image'])), 0, 0,
+                                         width=presentation.slide_width, height=presentation.slide_height)
+                if rendered['text']:
+                    _add_slide_text(slide, rendered['text'],
+                                    presentation.slide_width / rendered['width'],
+                                    presentation.slide_height / rendered['height'])
         
         presentation.save(output_path)
-        pdf_doc.close()
         return output_path
     except Exception as e:
         raise Exception(f"PDF to PowerPoint conversion failed: {str(e)}")
@@ -829,6 +1991,9 @@ def add_page_numbers(pdf_path, output_folder, unique_id):
     """
     Add page numbers to PDF document
     
+    All pages share one font resource; each page only gets a small stream drawing
+    its number.
+    
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
@@ -837,7 +2002,8 @@ def add_page_numbers(pdf_path, output_folder, unique_id):
     Returns:
         Path to the PDF with page numbers
     """
-    if not HAVE_FITZ:
+    fitz = _optional('fitz')
+    if fitz is None:
         raise Exception("PyMuPDF (fitz) is not installed. Install it with: pip install PyMuPDF")
     
     try:
@@ -845,14 +2011,15 @@ def add_page_numbers(pdf_path, output_folder, unique_id):
         output_path = os.path.join(output_folder, output_filename)
         
         pdf_doc = fitz.open(pdf_path)
+        shared = _add_stamp_objects(pdf_doc)
         
-        for page_num in range(len(pdf_doc)):
-            page = pdf_doc[page_num]
-            # Insert text at bottom right
-            text = f"{page_num + 1}"
-            rect = page.rect
-            point = fitz.Point(rect.width - 50, rect.height - 30)
-            page.insert_text(point, text, fontsize=10, color=(0, 0, 0))
+        def stamp(page):
+            # Bottom right, 50pt from the right edge and 30pt from the bottom
+            position = fitz.Matrix(1, 0, 0, 1, page.width - 50, 30) * page.to_user
+            return (f"q 0 g BT /{_STAMP_FONT} 10 Tf {_pdf_matrix(position)} Tm ".encode('ascii')
+                    + _pdf_text(str(page.number + 1)) + b' Tj ET Q')
+        
+        _stamp_pages(pdf_doc, shared, stamp, [('Font', _STAMP_FONT, f"{shared['font']} 0 R")])
         
         pdf_doc.save(output_path)
         pdf_doc.close()
@@ -862,52 +2029,356 @@ def add_page_numbers(pdf_path, output_folder, unique_id):
         raise Exception(f"Adding page numbers failed: {str(e)}")
 
 
-def repair_pdf(pdf_path, output_folder, unique_id):
+# Pages with fewer visible characters than this, or mostly unmappable ones (U+FFFD),
+# count as having no usable text layer
+_OCR_MIN_CHARS = 20
+
+
+def _page_needs_ocr(page):
+    """True if a page has images but no usable text"""
+    chars = [c for c in page.get_text('text') if not c.isspace()]
+    if len(chars) >= _OCR_MIN_CHARS and chars.count('\ufffd') * 2 < len(chars):
+        return False
+    return bool(page.get_images())
+
+
+def _ocr_page_image(pix, language):
+    """
+    Recognize the text of a page image with Tesseract (through PyMuPDF)
+    
+    Returns:
+        Words as [x0, y0, x1, y1, text, block, line], coordinates as fractions of the
+        image size (top-left origin)
+    """
+    fitz = _optional('fitz')
+    try:
+        data = pix.pdfocr_tobytes(compress=False, language=language)
+    except Exception as e:
+        raise Exception(f"Tesseract OCR failed ({str(e)}). Make sure Tesseract is installed and "
+                        f"TESSDATA_PREFIX points to its language data")
+    ocr = fitz.open('pdf', data)
+    try:
+        page = ocr[0]
+        width, height = page.rect.width, page.rect.height
+        return [[round(x0 / width, 5), round(y0 / height, 5), round(x1 / width, 5), round(y1 / height, 5),
+                 text, block, line]
+                for x0, y0, x1, y1, text, block, line, _ in page.get_text('words')]
+    finally:
+        ocr.close()
+
+
+def _ocr_page_range(pdf_path, mode, language, dpi, start, stop):
+    """
+    OCR the pages in [start, stop) that need it
+    Runs in a page worker process (see utils.executor.map_page_ranges).
+    
+    Returns:
+        Dict of 0-based page number -> words (see _ocr_page_image)
+    """
+    fitz = _optional('fitz')
+    doc = fitz.open(pdf_path)
+    results = {}
+    try:
+        for number in range(start, stop):
+            page = doc[number]
+            if mode != 'force' and not _page_needs_ocr(page):
+                continue
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            key = hashlib.sha256(f"{language}:{dpi}:{pix.width}x{pix.height}:".encode()
+                                 + pix.samples).hexdigest()
+            words = ocr_cache.get(key)
+            if words is None:
+                words = _ocr_page_image(pix, language)
+                ocr_cache.put(key, words)
+            results[number] = words
+    finally:
+        doc.close()
+    return results
+
+
+def _ocr_document(pdf_path, mode, language, dpi, progress=None):
+    """
+    OCR the pages of a document that have no usable text layer ('auto') or all of
+    them ('force'), spread across the page worker processes
+    
+    Recognized pages are cached by a hash of their rendered image, so pages seen
+    before (a resubmitted document, a recurring cover sheet) skip Tesseract.
+    
+    Returns:
+        Dict of 0-based page number -> words (see _ocr_page_image)
+    """
+    fitz = _optional('fitz')
+    if fitz is None:
+        raise Exception("PyMuPDF (fitz) is not installed. Install it with: python -m pip install PyMuPDF")
+    if mode not in OCR_MODES:
+        raise ValueError(f"ocr must be one of {', '.join(OCR_MODES)}")
+    if not 72 <= dpi <= 600:
+        raise ValueError("dpi must be between 72 and 600")
+    if not re.fullmatch(r'[A-Za-z_]+(\+[A-Za-z_]+)*', language or ''):
+        raise ValueError("language must be Tesseract language codes joined by '+', e.g. eng+deu")
+    
+    doc = fitz.open(pdf_path)
+    page_count = doc.page_count
+    doc.close()
+    
+    results = {}
+    for part in map_page_ranges(_ocr_page_range, page_count, pdf_path, mode, language, dpi,
+                                parts=PAGE_WORKERS * 4, progress=progress):
+        results.update(part)
+    return results
+
+
+def _ocr_lines(words):
+    """Join OCR words into lines of text"""
+    lines = []
+    current = None
+    for word in words:
+        if (word[5], word[6]) != current:
+            current = (word[5], word[6])
+            lines.append([])
+        lines[-1].append(word[4])
+    return '\n'.join(' '.join(line) for line in lines)
+
+
+def _add_text_layer(doc, ocr_pages):
+    """
+    Add OCR words to pages as invisible text (rendering mode 3)
+    
+    Each word is scaled to cover its box in the page image, so selecting and searching
+    line up with the scan. The layer uses the shared Helvetica font, so text outside
+    WinAnsi comes out as '?'.
+    """
+    fitz = _optional('fitz')
+    shared = _add_stamp_objects(doc)
+    widths = _helvetica_width_table()
+    
+    def layer(page):
+        words = ocr_pages.get(page.number)
+        if not words:
+            return None
+        ops = [f"q BT 3 Tr /{_STAMP_FONT} 1 Tf".encode('ascii')]
+        for x0, y0, x1, y1, text, _, _ in words:
+            width = (x1 - x0) * page.width
+            height = (y1 - y0) * page.height
+            natural = sum(text.encode('cp1252', errors='replace').translate(widths)) * 4 / 1000
+            if width <= 0 or height <= 0 or not natural:
+                continue
+            # Font size = box height, stretched horizontally to the box width; baseline
+            # at about Helvetica's descender above the bottom of the box
+            position = fitz.Matrix(width / natural, 0, 0, height, x0 * page.width,
+                                   (1 - y1) * page.height + 0.2 * height) * page.to_user
+            ops.append(f"{_pdf_matrix(position)} Tm ".encode('ascii') + _pdf_text(text) + b' Tj')
+        ops.append(b'ET Q')
+        return b'\n'.join(ops)
+    
+    _stamp_pages(doc, shared, layer, [('Font', _STAMP_FONT, f"{shared['font']} 0 R")])
+
+
+def _make_searchable(pdf_path, output_path, mode, language, dpi, progress=None):
+    """
+    Write a copy of a PDF with an OCR text layer on the pages that need one
+    
+    Returns:
+        Number of pages that were OCRed
+    """
+    fitz = _optional('fitz')
+    ocr_pages = _ocr_document(pdf_path, mode, language, dpi, progress)
+    doc = fitz.open(pdf_path)
+    try:
+        if ocr_pages:
+            _add_text_layer(doc, ocr_pages)
+        doc.save(output_path, deflate=True)
+    finally:
+        doc.close()
+    return len(ocr_pages)
+
+
+def ocr_pdf(pdf_path, output_folder, unique_id, mode='auto', language=OCR_LANGUAGE, dpi=OCR_DPI,
+            progress=None):
+    """
+    Make a scanned PDF searchable by adding an invisible OCR text layer
+    
+    Args:
+        pdf_path: Path to input PDF file
+        output_folder: Directory to save output file
+        unique_id: Unique identifier for the file
+        mode: 'auto' (only pages without usable text, default) or 'force' (every page)
+        language: Tesseract language(s), e.g. 'eng' or 'eng+deu'
+        dpi: Resolution pages are rendered at for recognition
+        progress: Optional callable(pages_done, page_count)
+    
+    Returns:
+        Path to the searchable PDF file
+    """
+    try:
+        if mode not in ('auto', 'force'):
+            raise ValueError("mode must be auto or force")
+        
+        output_filename = f"{unique_id}_ocr.pdf"
+        output_path = os.path.join(output_folder, output_filename)
+        
+        _make_searchable(pdf_path, output_path, mode, language, dpi, progress)
+        
+        return output_path
+    except Exception as e:
+        raise Exception(f"OCR failed: {str(e)}")
+
+
+# Seconds a single page may take to salvage before its worker is killed
+REPAIR_PAGE_TIMEOUT = 10
+
+_salvage_doc = None
+
+
+def _page_content_xrefs(doc, page_xref):
+    """Xrefs of a page's content streams"""
+    kind, value = doc.xref_get_key(page_xref, 'Contents')
+    if kind == 'xref':
+        xref = int(value.split()[0])
+        if doc.xref_is_stream(xref):
+            return [xref]
+        value = doc.xref_object(xref, compressed=True)
+    elif kind != 'array':
+        return []
+    return [int(ref) for ref in _PDF_REF.findall(value.encode())]
+
+
+def _suspect_pages(doc):
+    """
+    Find pages whose content streams don't decode cleanly
+    
+    A cheap structural check (decompression only, no interpretation) run on the
+    document as PyMuPDF opened it, after any xref rebuild.
+    
+    Returns:
+        Dict of 0-based page number -> reason
+    """
+    fitz = _optional('fitz')
+    try:
+        page_xrefs = [xref for xref, _ in _page_tree(doc)]
+    except Exception:
+        return {number: "page tree is damaged" for number in range(doc.page_count)}
+    
+    suspect = {}
+    fitz.TOOLS.mupdf_warnings(reset=True)
+    for number, page_xref in enumerate(page_xrefs):
+        try:
+            for xref in _page_content_xrefs(doc, page_xref):
+                doc.xref_stream(xref)
+        except Exception as e:
+            suspect[number] = str(e)
+        warnings = fitz.TOOLS.mupdf_warnings(reset=True)
+        if warnings and number not in suspect:
+            suspect[number] = warnings.splitlines()[0]
+    return suspect
+
+
+def _salvage_page(pdf_path, page_number):
+    """
+    Interpret one page in a salvage worker (raises if MuPDF can't)
+    
+    Returns:
+        MuPDF warnings produced by the page, or ''
+    """
+    global _salvage_doc
+    fitz = _optional('fitz')
+    if _salvage_doc is None or _salvage_doc.name != pdf_path:
+        _salvage_doc = fitz.open(pdf_path)
+    fitz.TOOLS.mupdf_warnings(reset=True)
+    _salvage_doc.load_page(page_number).get_displaylist()
+    return fitz.TOOLS.mupdf_warnings(reset=True)
+
+
+def _repair_pypdf2(pdf_path, output_path, report):
+    """Copy every page PyPDF2 can read, recording the ones it can't"""
+    reader = PyPDF2.PdfReader(pdf_path, strict=False)
+    writer = PyPDF2.PdfWriter()
+    report.update(strategy='pypdf2', page_count=len(reader.pages))
+    
+    for page_num in range(len(reader.pages)):
+        try:
+            writer.add_page(reader.pages[page_num])
+            report['recovered'].append(page_num + 1)
+        except Exception as e:
+            report['dropped'].append({'page': page_num + 1, 'reason': str(e)})
+    
+    if report['recovered']:
+        with open(output_path, 'wb') as output_file:
+            writer.write(output_file)
+
+
+def repair_pdf(pdf_path, output_folder, unique_id, page_timeout=REPAIR_PAGE_TIMEOUT, with_report=False):
     """
     Attempt to repair a damaged PDF
     
+    Strategies are tried cheapest first:
+    1. rebuild: PyMuPDF opens the file (rebuilding a broken xref table) and every page's
+       content streams decode cleanly, so the document is simply rewritten
+    2. salvage: pages that failed that check are interpreted one by one in worker
+       processes with a per-page timeout; pages that error, time out or crash their
+       worker are dropped and the rest are kept
+    3. pypdf2: if PyMuPDF can't open the file (or isn't installed), PyPDF2 copies
+       whatever pages it can read
+    
     Args:
         pdf_path: Path to input PDF file
         output_folder: Directory to save output file
         unique_id: Unique identifier for the file
+        page_timeout: Seconds allowed per salvaged page
+        with_report: Also return a report of the outcome: strategy, xref_rebuilt, page_count,
+                     recovered (1-based page numbers), dropped ([{page, reason}]) and warnings
+                     ([{page, reason}] for salvaged pages kept despite damaged content)
     
     Returns:
-        Path to the repaired PDF file
+        Path to the repaired PDF file, or (path, report) with with_report
     """
     try:
         output_filename = f"{unique_id}_repaired.pdf"
         output_path = os.path.join(output_folder, output_filename)
+        report = dict(strategy=None, xref_rebuilt=False, page_count=0, recovered=[], dropped=[],
+                      warnings=[])
         
-        # Try PyPDF2 first for simple repair
-        try:
-            reader = PyPDF2.PdfReader(pdf_path)
-            writer = PyPDF2.PdfWriter()
-            
-            # Copy all readable pages
-            for page_num in range(len(reader.pages)):
-                try:
-                    page = reader.pages[page_num]
-                    writer.add_page(page)
-                except:
-                    # Skip problematic pages
-                    pass
-            
-            with open(output_path, 'wb') as output_file:
-                writer.write(output_file)
-            
-            return output_path
-        except:
-            # If PyPDF2 fails, try PyMuPDF
-            if not HAVE_FITZ:
-                raise Exception("Could not repair PDF with available tools")
-            
-            pdf_doc = fitz.open(pdf_path)
-            pdf_doc.save(output_path)
-            pdf_doc.close()
-            
-            return output_path
+        fitz = _optional('fitz')
+        doc = None
+        if fitz is not None:
+            try:
+                doc = fitz.open(pdf_path)
+                if doc.needs_pass or not doc.page_count:
+                    doc.close()
+                    doc = None
+            except Exception:
+                doc = None
+        
+        if doc is None:
+            _repair_pypdf2(pdf_path, output_path, report)
+        else:
+            try:
+                report.update(strategy='rebuild', xref_rebuilt=doc.is_repaired, page_count=doc.page_count)
+                suspect = _suspect_pages(doc)
+                dropped = {}
+                if suspect:
+                    report['strategy'] = 'salvage'
+                    outcomes = map_pages_isolated(_salvage_page, sorted(suspect), pdf_path,
+                                                  timeout=page_timeout)
+                    dropped = {page: message for page, (status, message) in outcomes.items()
+                               if status != 'ok'}
+                    report['warnings'] = [{'page': page + 1, 'reason': message.splitlines()[0]}
+                                          for page, (status, message) in sorted(outcomes.items())
+                                          if status == 'ok' and message]
+                
+                kept = [number for number in range(doc.page_count) if number not in dropped]
+                report['recovered'] = [number + 1 for number in kept]
+                report['dropped'] = [{'page': number + 1, 'reason': dropped[number]}
+                                     for number in sorted(dropped)]
+                if kept:
+                    if dropped:
+                        doc.select(kept)
+                    doc.save(output_path, garbage=3)
+            finally:
+                doc.close()
+        
+        if not report['recovered']:
+            raise ValueError("no pages could be recovered")
+        return (output_path, report) if with_report else output_path
     except Exception as e:
         raise Exception(f"PDF repair failed: {str(e)}")
-
-    except Exception as e:
-        raise Exception(f"Page removal failed: {str(e)}")
@@ -0,0 +1,151 @@
+"""
+Conversion progress tracking
+Converters that accept a progress callback report (pages_done, page_count) here.
+State is kept in small JSON files so any gunicorn worker on the node can answer
+GET /api/progress/<job_id> or stream /api/jobs/<job_id>/events, not just the one
+running the conversion.
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+
+PROGRESS_DIR = os.getenv('PROGRESS_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_progress'))
+
+# An event stream ends after this many seconds and the client reconnects, so no stream
+# outlives proxy and gunicorn timeouts
+EVENT_STREAM_SECONDS = float(os.getenv('EVENT_STREAM_SECONDS', '55'))
+
+# Seconds between checks for new progress while streaming, and between keep-alive comments
+EVENT_POLL_INTERVAL = 0.25
+EVENT_KEEPALIVE = 15
+
+# Converters may report every page; the state file is rewritten at most this often
+REPORT_INTERVAL = 0.2
+
+# Client-chosen job ids end up in file names
+_JOB_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def valid_job_id(job_id):
+    """True if job_id is safe to use as a progress key"""
+    return bool(job_id and _JOB_ID.match(job_id))
+
+
+def _path(job_id):
+    return os.path.join(PROGRESS_DIR, f"{job_id}.json")
+
+
+def report(job_id, done, total, status='running', **result):
+    """
+    Record progress for a job (atomic replace, so readers never see a partial file)
+
+    Args:
+        job_id: Client-supplied job id
+        done: Units (pages) completed
+        total: Total units
+        status: 'running', 'done' or 'failed'
+        **result: Extra fields for a finished job (download_url, error)
+    """
+    os.makedirs(PROGRESS_DIR, exist_ok=True)
+    now = time.time()
+    previous = get(job_id) if done else None
+    started_at = previous['started_at'] if previous and previous.get('started_at') else now
+    elapsed = now - started_at
+    state = {
+        'job_id': job_id,
+        'status': status,
+        'done': done,
+        'total': total,
+        'percent': round(100.0 * done / total, 1) if total else None,
+        'started_at': started_at,
+        'updated_at': now,
+        'elapsed_seconds': round(elapsed, 1),
+        # Remaining units at the average rate so far
+        'eta_seconds': round(elapsed * (total - done) / done, 1)
+        if status == 'running' and done and total else None,
+        **result,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=PROGRESS_DIR, prefix=f".{job_id}.")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _path(job_id))
+
+
+def get(job_id):
+    """Return the last reported state for a job, or None"""
+    try:
+        with open(_path(job_id), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def finish(job_id, ok=True, **result):
+    """Mark a job finished, keeping the last page counts (result: download_url or error)"""
+    state = get(job_id) or {'done': 0, 'total': 0}
+    total = state['total'] or state['done']
+    report(job_id, total if ok else state['done'], total, 'done' if ok else 'failed', **result)
+
+
+class _Reporter:
+    """Progress callback bound to a job id (a class, so it can be pickled to a job process)"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.last = 0.0
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if done >= total or now - self.last >= REPORT_INTERVAL:
+            self.last = now
+            report(self.job_id, done, total)
+
+
+def callback(job_id):
+    """Progress callback for a converter, bound to a job id"""
+    return _Reporter(job_id)
+
+
+def _event(name, state):
+    return f"id: {state['updated_at']}\nevent: {name}\ndata: {json.dumps(state)}\n\n"
+
+
+def events(job_id, duration=None):
+    """
+    Server-sent events for a job: 'progress' on every update, then 'done' or 'failed'
+
+    The stream waits for the job to appear (the client may subscribe before its
+    conversion request arrives) and ends after the job finishes or after duration
+    seconds, whichever is first; the client's EventSource then reconnects, a second
+    later. A duration of 0 sends the current state only.
+
+    Args:
+        job_id: Client-supplied job id
+        duration: Seconds to stream (default: EVENT_STREAM_SECONDS)
+
+    Yields:
+        Encoded event strings
+    """
+    duration = EVENT_STREAM_SECONDS if duration is None else duration
+    deadline = time.monotonic() + duration
+    keepalive = time.monotonic() + EVENT_KEEPALIVE
+    last_update = None
+    yield "retry: 1000\n\n"
+    while True:
+        state = get(job_id)
+        if state and state['updated_at'] != last_update:
+            last_update = state['updated_at']
+            if state['status'] != 'running':
+                yield _event(state['status'], state)
+                return
+            yield _event('progress', state)
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        if now >= keepalive:
+            keepalive = now + EVENT_KEEPALIVE
+            yield ": keep-alive\n\n"
+        time.sleep(EVENT_POLL_INTERVAL)
@@ -0,0 +1,118 @@
+"""
+Page previews for the UI
+An uploaded PDF is stored once under its content hash, so any gunicorn worker on the
+node can render its pages. Rendered images are kept in a per-process LRU cache keyed
+by (content hash, page, size, format), bounded by RENDER_CACHE_MB.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils.pdf_converter import get_page_count, render_page
+
+RENDER_DIR = os.getenv('RENDER_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_render'))
+RENDER_CACHE_MB = int(os.getenv('RENDER_CACHE_MB', '64'))
+
+# Accepted request ranges
+WIDTH_RANGE = (16, 2000)
+DPI_RANGE = (18, 300)
+QUALITY_RANGE = (1, 100)
+
+_DOCUMENT_ID = re.compile(r'^[0-9a-f]{64}$')
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_bytes = 0
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def valid_document_id(document_id):
+    """True if document_id looks like a stored document's SHA-256"""
+    return bool(document_id and _DOCUMENT_ID.match(document_id))
+
+
+def document_path(document_id):
+    return os.path.join(RENDER_DIR, f"{document_id}.pdf")
+
+
+def store_document(path):
+    """
+    Move an uploaded PDF into the preview store
+    
+    Args:
+        path: Path to the uploaded file (moved, or removed if already stored)
+    
+    Returns:
+        Tuple of (document id, page count)
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    document_id = sha256.hexdigest()
+    
+    os.makedirs(RENDER_DIR, exist_ok=True)
+    target = document_path(document_id)
+    if os.path.exists(target):
+        os.remove(path)
+        os.utime(target)  # keep it away from the cleanup thread
+    else:
+        fd, tmp_path = tempfile.mkstemp(dir=RENDER_DIR, prefix=f".{document_id}.")
+        os.close(fd)
+        shutil.move(path, tmp_path)
+        os.replace(tmp_path, target)
+    return document_id, get_page_count(target)
+
+
+def render(document_id, page, width=None, dpi=None, image_format='jpeg', quality=80):
+    """
+    Render a page of a stored document, from the cache when possible
+    
+    Args:
+        document_id: Id returned by store_document
+        page: 1-based page number
+        width: Target width in pixels (takes precedence over dpi)
+        dpi: Resolution when no width is given
+        image_format: 'jpeg' or 'webp'
+        quality: Lossy quality, 1-100
+    
+    Returns:
+        Image bytes, or None if the document is not stored (expired or never uploaded)
+    """
+    global _cache_bytes
+    key = (document_id, page, width, None if width else dpi, image_format, quality)
+    with _lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return data
+        _stats['misses'] += 1
+    
+    path = document_path(document_id)
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    data = render_page(path, page, width=width, dpi=dpi, image_format=image_format, quality=quality)
+    
+    limit = RENDER_CACHE_MB * 1024 * 1024
+    with _lock:
+        if key not in _cache and len(data) <= limit // 4:
+            _cache[key] = data
+            _cache_bytes += len(data)
+            while _cache_bytes > limit:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= len(evicted)
+                _stats['evictions'] += 1
+    return data
+
+
+def stats():
+    """Cache counters for this worker process"""
+    with _lock:
+        return dict(_stats, entries=len(_cache), bytes=_cache_bytes, limit_mb=RENDER_CACHE_MB)
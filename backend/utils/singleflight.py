@@ -0,0 +1,136 @@
+"""
+Single-flight execution of identical conversions
+Requests for the same operation on the same content with the same parameters that
+arrive while one of them is running wait for it and share its output instead of
+converting again (double-clicks, several services submitting one document). The
+running request holds an flock on a per-key lock file, so this works across all
+gunicorn workers on the node; on platforms without fcntl every request runs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SINGLEFLIGHT_DIR = os.getenv('SINGLEFLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_singleflight'))
+
+# Longest a request waits for an identical one before running on its own
+SINGLEFLIGHT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_TIMEOUT', '120'))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def request_key(operation, form, input_paths, upload_paths=None):
+    """
+    Key identifying a conversion by what it computes
+
+    Args:
+        operation: Operation descriptor from utils.operations
+        form: Request form data holding the operation's parameters
+        input_paths: Saved input files, in order
+        upload_paths: Saved extra uploads, keyed by converter argument
+
+    Returns:
+        Hex digest of the operation id, its raw parameter values and the content of
+        every input
+    """
+    identity = {
+        'operation': operation.id,
+        'params': {param.name: form.get(param.name) for param in operation.params},
+        'inputs': [_file_digest(path) for path in input_paths],
+        'uploads': {arg: _file_digest(path) for arg, path in sorted((upload_paths or {}).items())},
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def _read_result(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_result(path, record):
+    fd, tmp_path = tempfile.mkstemp(dir=SINGLEFLIGHT_DIR, prefix='.result.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+
+def run(key, compute, timeout=None, since=None, on_wait=None, on_resume=None):
+    """
+    Run compute() unless an identical request is already running, then share its result
+
+    The first request for a key runs compute(); requests arriving while it runs wait
+    for it and return its result, as do requests that arrived before it finished (e.g.
+    while queued for admission). If it fails (returns None or raises) or takes longer
+    than the timeout, a waiting request runs compute() itself.
+
+    Args:
+        key: Key from request_key
+        compute: Callable returning a JSON-serializable result, or None on failure
+        timeout: Seconds to wait for a running request (default: SINGLEFLIGHT_TIMEOUT)
+        since: When the request arrived, as a time.time() timestamp (default: now)
+        on_wait: Optional callable, called once if this request has to wait
+                 (e.g. to give back resources it won't need while waiting)
+        on_resume: Optional callable, called before a request that waited runs
+                   compute() itself (e.g. to take back what on_wait gave up)
+
+    Returns:
+        Tuple of (result, shared) where shared is True if the result came from another request
+    """
+    if fcntl is None:
+        return compute(), False
+
+    timeout = SINGLEFLIGHT_TIMEOUT if timeout is None else timeout
+    os.makedirs(SINGLEFLIGHT_DIR, exist_ok=True)
+    result_path = os.path.join(SINGLEFLIGHT_DIR, f"{key}.json")
+    joined = time.time() if since is None else since
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    waited = False
+
+    fd = os.open(os.path.join(SINGLEFLIGHT_DIR, f"{key}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        # Poll rather than block, so gevent workers keep serving while waiting
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not waited:
+                    waited = True
+                    if on_wait:
+                        on_wait()
+                if time.monotonic() >= deadline:
+                    if on_resume:
+                        on_resume()
+                    return compute(), False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.25)
+
+        record = _read_result(result_path)
+        if record and record['finished'] >= joined:
+            return record['result'], True
+
+        if waited and on_resume:
+            on_resume()
+        result = compute()
+        if result is not None:
+            _write_result(result_path, {'finished': time.time(), 'result': result})
+        return result, False
+    finally:
+        os.close(fd)
@@ -0,0 +1,346 @@
+"""
+Resumable chunked uploads
+Large inputs are uploaded in fixed-size chunks that may arrive in any order, in
+parallel and more than once, so a dropped connection only costs the chunks in
+flight. The protocol is: create an upload (file name and size), PUT each chunk at
+its offset, then finalize with a hash of the content. A finalized upload is then
+passed to /api/convert by id in place of a file.
+
+Chunks are written into a spool file on the node, or staged as blocks of a blob
+when Azure storage is in use (so chunks may reach any node). Upload state is a small
+JSON file per upload, shared by every worker on the node.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_uploads'))
+
+# Largest file accepted through chunked uploads, and the chunk size clients must use
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', str(1024 * 1024 * 1024)))
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', str(8 * 1024 * 1024)))
+
+# Uploads not touched for this many seconds are removed by cleanup()
+CHUNKED_UPLOAD_TTL = int(os.getenv('CHUNKED_UPLOAD_TTL', str(24 * 3600)))
+
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def valid_upload_id(upload_id):
+    """True if upload_id has the form of an id issued by create()"""
+    return bool(upload_id and _UPLOAD_ID.match(upload_id))
+
+
+def _meta_path(upload_id):
+    return os.path.join(CHUNKED_UPLOAD_DIR, f"{upload_id}.json")
+
+
+def _data_path(upload_id):
+    return os.path.join(CHUNKED_UPLOAD_DIR, f"{upload_id}.bin")
+
+
+def _blob_name(upload_id, name):
+    return f"uploads/chunked/{upload_id}/{name}"
+
+
+def _block_id(index):
+    # Block ids of one blob must all have the same length
+    return f"{index:08d}"
+
+
+def _chunk_count(meta):
+    return max(1, -(-meta['size'] // meta['chunk_size']))
+
+
+def _chunk_length(meta, index):
+    return min(meta['chunk_size'], meta['size'] - index * meta['chunk_size'])
+
+
+def _save_meta(meta, storage=None):
+    os.makedirs(CHUNKED_UPLOAD_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CHUNKED_UPLOAD_DIR, prefix=f".{meta['upload_id']}.")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    if meta['staging'] == 'blocks' and storage:
+        storage.upload_file(tmp_path, _blob_name(meta['upload_id'], 'upload.json'))
+    os.replace(tmp_path, _meta_path(meta['upload_id']))
+
+
+def _load_meta(upload_id, storage=None):
+    try:
+        with open(_meta_path(upload_id), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    if storage is None:
+        return None
+    # Created on another node: its state lives next to the staged blocks
+    try:
+        meta = json.loads(storage.download_blob_to_bytes(_blob_name(upload_id, 'upload.json')))
+    except Exception:
+        return None
+    _save_meta(meta)
+    return meta
+
+
+def _received(meta, storage=None):
+    if meta['finalized']:
+        return list(range(_chunk_count(meta)))
+    if meta['staging'] == 'blocks':
+        return sorted(int(block_id) for block_id in
+                      storage.get_uncommitted_block_ids(_blob_name(meta['upload_id'], meta['filename'])))
+    return meta['received']
+
+
+def _status(meta, storage=None):
+    received = set(_received(meta, storage))
+    chunk_count = _chunk_count(meta)
+    missing = [index for index in range(chunk_count) if index not in received]
+    return {
+        'upload_id': meta['upload_id'],
+        'filename': meta['filename'],
+        'size': meta['size'],
+        'chunk_size': meta['chunk_size'],
+        'chunk_count': chunk_count,
+        'received_bytes': sum(_chunk_length(meta, index) for index in received if index < chunk_count),
+        'missing': [index * meta['chunk_size'] for index in missing],
+        'complete': not missing,
+        'finalized': meta['finalized'],
+        'sha256': meta.get('sha256'),
+    }
+
+
+def create(filename, size, storage=None):
+    """
+    Start a chunked upload
+
+    Args:
+        filename: Name of the file being uploaded (already passed through secure_filename)
+        size: File size in bytes
+        storage: Blob storage manager to stage chunks in (default: spool file on this node)
+
+    Returns:
+        Upload status (see status())
+    """
+    if not filename:
+        raise ValueError("filename is required")
+    if not isinstance(size, int) or size <= 0:
+        raise ValueError("size must be a positive number of bytes")
+    if size > CHUNKED_UPLOAD_MAX_SIZE:
+        raise ValueError(f"File too large (maximum {CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)} MB)")
+
+    meta = {
+        'upload_id': uuid.uuid4().hex,
+        'filename': filename,
+        'size': size,
+        'chunk_size': CHUNK_SIZE,
+        'staging': 'blocks' if storage else 'spool',
+        'received': [],
+        'finalized': False,
+        'created_at': time.time(),
+    }
+    if not storage:
+        os.makedirs(CHUNKED_UPLOAD_DIR, exist_ok=True)
+        # Sparse spool file, filled in by chunks in any order
+        with open(_data_path(meta['upload_id']), 'wb') as f:
+            f.truncate(size)
+    _save_meta(meta, storage)
+    return _status(meta, storage)
+
+
+def status(upload_id, storage=None):
+    """
+    State of an upload, for resuming it
+
+    Returns:
+        Dict with upload_id, filename, size, chunk_size, chunk_count, received_bytes,
+        missing (offsets of chunks not received yet), complete, finalized and sha256,
+        or None if the upload doesn't exist
+    """
+    meta = _load_meta(upload_id, storage)
+    return _status(meta, storage) if meta else None
+
+
+def write_chunk(upload_id, offset, data, sha256=None, storage=None):
+    """
+    Store one chunk of an upload (idempotent, so a chunk may be resent)
+
+    Args:
+        upload_id: Id from create()
+        offset: Byte offset of the chunk; a multiple of the upload's chunk_size
+        data: Chunk content; chunk_size bytes, except for the last chunk
+        sha256: Optional hex digest of the chunk, checked before it is stored
+        storage: Blob storage manager (as passed to create())
+
+    Returns:
+        Upload status, or None if the upload doesn't exist
+    """
+    meta = _load_meta(upload_id, storage)
+    if meta is None:
+        return None
+    if meta['finalized']:
+        raise ValueError("Upload is already finalized")
+    if offset < 0 or offset % meta['chunk_size'] or offset >= meta['size']:
+        raise ValueError(f"offset must be a multiple of {meta['chunk_size']} below {meta['size']}")
+    index = offset // meta['chunk_size']
+    if len(data) != _chunk_length(meta, index):
+        raise ValueError(f"Chunk at offset {offset} must be {_chunk_length(meta, index)} bytes")
+    if sha256 and hashlib.sha256(data).hexdigest() != sha256.lower():
+        raise ValueError("Chunk checksum mismatch")
+
+    if meta['staging'] == 'blocks':
+        storage.stage_block(_blob_name(upload_id, meta['filename']), _block_id(index), data)
+        # Keeps the upload alive for cleanup()
+        os.utime(_meta_path(upload_id))
+        return _status(meta, storage)
+
+    fd = os.open(_data_path(upload_id), os.O_RDWR)
+    try:
+        os.pwrite(fd, data, offset)
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        # Re-read under the lock: other workers record their chunks concurrently
+        meta = _load_meta(upload_id)
+        if index not in meta['received']:
+            meta['received'] = sorted(meta['received'] + [index])
+        _save_meta(meta)
+    finally:
+        os.close(fd)
+    return _status(meta)
+
+
+def finalize(upload_id, sha256=None, chunks_sha256=None, storage=None):
+    """
+    Check an upload is complete and matches its hash, making it usable as an input
+
+    The hash is either the SHA-256 of the whole file (sha256) or, for clients that
+    can't hash a large file in one pass, the SHA-256 of the concatenated binary
+    SHA-256 digests of every chunk in order (chunks_sha256).
+
+    Returns:
+        Upload status, or None if the upload doesn't exist
+    """
+    meta = _load_meta(upload_id, storage)
+    if meta is None:
+        return None
+    if meta['finalized']:
+        return _status(meta, storage)
+    if not sha256 and not chunks_sha256:
+        raise ValueError("sha256 or chunks_sha256 is required")
+    current = _status(meta, storage)
+    if not current['complete']:
+        raise ValueError(f"Upload is incomplete ({len(current['missing'])} chunks missing)")
+
+    data_path = _data_path(upload_id)
+    if meta['staging'] == 'blocks':
+        blob_name = _blob_name(upload_id, meta['filename'])
+        storage.commit_block_list(blob_name, [_block_id(index) for index in range(current['chunk_count'])])
+        storage.download_file(blob_name, data_path)
+
+    file_digest = hashlib.sha256()
+    chunk_digests = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(meta['chunk_size']), b''):
+            file_digest.update(chunk)
+            chunk_digests.update(hashlib.sha256(chunk).digest())
+    if (sha256 and file_digest.hexdigest() != sha256.lower()) or \
+            (chunks_sha256 and chunk_digests.hexdigest() != chunks_sha256.lower()):
+        # Some chunk was corrupted and there is no telling which: start over
+        delete(upload_id, storage)
+        raise ValueError("Checksum mismatch, upload discarded")
+
+    meta['finalized'] = True
+    meta['sha256'] = file_digest.hexdigest()
+    _save_meta(meta, storage)
+    return _status(meta, storage)
+
+
+def path(upload_id, storage=None):
+    """
+    Local path of a finalized upload's content (fetched from blob storage if needed)
+
+    Returns:
+        File path, or None if the upload doesn't exist or isn't finalized
+    """
+    meta = _load_meta(upload_id, storage)
+    if meta is None or not meta['finalized']:
+        return None
+    local_path = _data_path(upload_id)
+    if not os.path.exists(local_path):
+        if meta['staging'] != 'blocks' or storage is None:
+            return None
+        storage.download_file(_blob_name(upload_id, meta['filename']), local_path)
+    os.utime(_meta_path(upload_id))
+    return local_path
+
+
+def link(upload_id, target, storage=None):
+    """
+    Place a finalized upload's content at target for one conversion
+
+    The upload itself is kept (until cleanup), so it can feed several operations.
+
+    Returns:
+        target, or None if the upload doesn't exist or isn't finalized
+    """
+    source = path(upload_id, storage)
+    if source is None:
+        return None
+    try:
+        os.link(source, target)
+    except OSError:
+        # Different filesystem (or no hard links): copy instead
+        shutil.copyfile(source, target)
+    return target
+
+
+def delete(upload_id, storage=None):
+    """Remove an upload and its staged data"""
+    meta = _load_meta(upload_id, storage)
+    for local_path in (_data_path(upload_id), _meta_path(upload_id)):
+        try:
+            os.remove(local_path)
+        except OSError:
+            pass
+    if meta and meta['staging'] == 'blocks' and storage:
+        for name in ('upload.json', meta['filename']):
+            try:
+                storage.delete_file(_blob_name(upload_id, name))
+            except Exception:
+                pass
+
+
+def cleanup(max_age=None, storage=None):
+    """
+    Remove uploads not touched for max_age seconds
+
+    Returns:
+        Number of uploads removed
+    """
+    max_age = CHUNKED_UPLOAD_TTL if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    if not os.path.isdir(CHUNKED_UPLOAD_DIR):
+        return removed
+    for name in os.listdir(CHUNKED_UPLOAD_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext != '.json' or not valid_upload_id(upload_id):
+            continue
+        try:
+            if os.path.getmtime(_meta_path(upload_id)) < cutoff:
+                delete(upload_id, storage)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,120 @@
+"""
+Worker memory watchdog
+Native converter libraries (PyMuPDF, pdf2docx, Pillow) can keep memory after a call
+returns, so a long-lived worker's RSS creeps up with every bad document. This module
+tracks the worker's RSS and how much each conversion grew it, and tells gunicorn's
+post_request hook (gunicorn.conf.py) when the worker should be recycled: after its
+RSS passes WORKER_MAX_RSS_MB or it has run WORKER_MAX_JOBS conversions. gunicorn then
+lets in-flight requests finish before the worker exits and starts a fresh one.
+"""
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Recycle a worker above this RSS, or after this many conversions (0 disables either)
+WORKER_MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', '1024'))
+WORKER_MAX_JOBS = int(os.getenv('WORKER_MAX_JOBS', '500'))
+
+# Log conversions that leave the worker this much larger than before
+JOB_GROWTH_WARN_MB = int(os.getenv('JOB_GROWTH_WARN_MB', '100'))
+
+_MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+_lock = threading.Lock()
+_max_jobs = 0
+_stats = {}
+
+
+def reset():
+    """
+    Start counting afresh for this process
+
+    Called at import and again by gunicorn's post_fork hook, so workers forked from a
+    preloaded master each get their own start time and recycling jitter.
+    """
+    global _max_jobs
+    with _lock:
+        # Spread job-count recycling so workers started together don't all restart together
+        _max_jobs = WORKER_MAX_JOBS + random.randint(0, WORKER_MAX_JOBS // 10) if WORKER_MAX_JOBS else 0
+        _stats.clear()
+        _stats.update({
+            'jobs': 0,
+            'started_at': time.time(),
+            'largest_growth_mb': 0.0,
+            'largest_growth_operation': None,
+            'growth_warnings': 0,
+        })
+
+
+reset()
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where the current one isn't available)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def track(operation_id):
+    """
+    Count a conversion and measure how much it grew the worker's RSS
+
+    Under async workers conversions overlap, so growth is attributed to whichever
+    job finishes; the RSS limit itself is exact.
+    """
+    before = rss_bytes()
+    try:
+        yield
+    finally:
+        growth = (rss_bytes() - before) / _MB
+        with _lock:
+            _stats['jobs'] += 1
+            if growth > _stats['largest_growth_mb']:
+                _stats['largest_growth_mb'] = round(growth, 1)
+                _stats['largest_growth_operation'] = operation_id
+            if JOB_GROWTH_WARN_MB and growth >= JOB_GROWTH_WARN_MB:
+                _stats['growth_warnings'] += 1
+                logger.warning(f"{operation_id} grew worker {os.getpid()} by {growth:.0f} MB")
+
+
+def recycle_reason():
+    """Why this worker should be recycled, or None"""
+    rss_mb = rss_bytes() / _MB
+    if WORKER_MAX_RSS_MB and rss_mb >= WORKER_MAX_RSS_MB:
+        return f"RSS {rss_mb:.0f} MB over WORKER_MAX_RSS_MB={WORKER_MAX_RSS_MB}"
+    if _max_jobs and _stats['jobs'] >= _max_jobs:
+        return f"ran {_stats['jobs']} conversions (limit {_max_jobs})"
+    return None
+
+
+def stats():
+    """Memory counters for this worker process"""
+    with _lock:
+        return {
+            **_stats,
+            'rss_mb': round(rss_bytes() / _MB, 1),
+            'max_rss_mb': WORKER_MAX_RSS_MB,
+            'max_jobs': _max_jobs,
+        }
@@ -19,21 +19,127 @@ export const getOperations = async () => {
   }
 };
 
+// Files this large (or a batch this large) go through resumable chunked uploads
+const CHUNKED_UPLOAD_MIN_SIZE = 32 * 1024 * 1024;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const toHex = (buffer) =>
+  Array.from(new Uint8Array(buffer)).map(byte => byte.toString(16).padStart(2, '0')).join('');
+
+const fetchJson = async (url, options = {}) => {
+  const response = await fetch(url, options);
+  const data = response.status === 204 ? {} : await response.json();
+  if (!response.ok) {
+    const error = new Error(data.error || `Request failed (${response.status})`);
+    error.status = response.status;
+    throw error;
+  }
+  return data;
+};
+
+/**
+ * Upload a file in chunks, in parallel, resuming where an earlier attempt stopped
+ * @param {File} file - File to upload
+ * @param {Object} options - { concurrency, retries, onProgress(sentBytes, totalBytes) } (optional)
+ * @returns {string} upload_id to pass to convertFiles / /api/convert
+ */
+export const uploadFile = async (file, { concurrency = 4, retries = 5, onProgress } = {}) => {
+  // Remembered across page reloads so an interrupted upload resumes
+  const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+  let state = null;
+  const savedId = localStorage.getItem(resumeKey);
+  if (savedId) {
+    state = await fetchJson(`${API_BASE_URL}/api/uploads/${savedId}`).catch(() => null);
+  }
+  if (!state) {
+    state = await fetchJson(`${API_BASE_URL}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    localStorage.setItem(resumeKey, state.upload_id);
+  }
+  if (state.finalized) return state.upload_id;
+
+  const { upload_id: uploadId, chunk_size: chunkSize, chunk_count: chunkCount } = state;
+  const missing = new Set(state.missing);
+  const digests = new Array(chunkCount);
+  let sent = state.received_bytes;
+  if (onProgress) onProgress(sent, file.size);
+
+  // Every chunk is hashed (for the final checksum), only missing ones are sent
+  let next = 0;
+  const worker = async () => {
+    while (next < chunkCount) {
+      const index = next++;
+      const offset = index * chunkSize;
+      const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer();
+      digests[index] = await crypto.subtle.digest('SHA-256', chunk);
+      if (!missing.has(offset)) continue;
+
+      for (let attempt = 0; ; attempt++) {
+        try {
+          await fetchJson(`${API_BASE_URL}/api/uploads/${uploadId}?offset=${offset}`, {
+            method: 'PUT',
+            headers: { 'X-Chunk-Sha256': toHex(digests[index]) },
+            body: chunk,
+          });
+          break;
+        } catch (error) {
+          if ((error.status && error.status < 500 && error.status !== 429) || attempt >= retries) throw error;
+          await sleep(Math.min(500 * 2 ** attempt, 10000));
+        }
+      }
+      sent += chunk.byteLength;
+      if (onProgress) onProgress(sent, file.size);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(concurrency, chunkCount) }, worker));
+
+  const combined = new Uint8Array(chunkCount * 32);
+  digests.forEach((digest, index) => combined.set(new Uint8Array(digest), index * 32));
+  try {
+    await fetchJson(`${API_BASE_URL}/api/uploads/${uploadId}/finalize`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ chunks_sha256: toHex(await crypto.subtle.digest('SHA-256', combined)) }),
+    });
+  } catch (error) {
+    // A checksum mismatch discards the upload; the next attempt starts over
+    if (error.status === 400) localStorage.removeItem(resumeKey);
+    throw error;
+  }
+  return uploadId;
+};
+
 /**
  * Convert files using specified operation
  * @param {File|File[]} files - File(s) to convert
  * @param {string} operation - Operation ID (e.g., 'pdf_to_text')
  * @param {Object} params - Additional parameters for the operation (optional)
+ * @param {Object} options - { onUploadProgress(sentBytes, totalBytes) } for chunked uploads (optional)
  */
-export const convertFiles = async (files, operation, params = {}) => {
+export const convertFiles = async (files, operation, params = {}, { onUploadProgress } = {}) => {
   try {
     const formData = new FormData();
+    const fileList = Array.isArray(files) ? files : [files];
+    const totalSize = fileList.reduce((total, file) => total + file.size, 0);
     
-    // Handle both single file and multiple files
-    if (Array.isArray(files)) {
-      files.forEach(file => formData.append('files', file));
+    if (totalSize >= CHUNKED_UPLOAD_MIN_SIZE) {
+      // Large inputs: upload in resumable chunks, then convert by upload id (in file order)
+      const sentBytes = fileList.map(() => 0);
+      for (const [index, file] of fileList.entries()) {
+        const uploadId = await uploadFile(file, {
+          onProgress: (sent) => {
+            sentBytes[index] = sent;
+            if (onUploadProgress) onUploadProgress(sentBytes.reduce((a, b) => a + b, 0), totalSize);
+          },
+        });
+        formData.append('upload_id', uploadId);
+      }
     } else {
-      formData.append('files', files);
+      fileList.forEach(file => formData.append('files', file));
     }
     
     formData.append('operation', operation);
@@ -61,6 +167,73 @@ export const convertFiles = async (files, operation, params = {}) => {
   }
 };
 
+/**
+ * Create an id for tracking a conversion's progress
+ */
+export const createJobId = () =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
+/**
+ * Get progress of a conversion started with a job_id param
+ * @param {string} jobId - Id passed as params.job_id to convertFiles
+ * @returns {Object|null} { status, done, total, percent } or null if not known (yet)
+ */
+export const getProgress = async (jobId) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/progress/${jobId}`);
+    if (!response.ok) return null;
+    return await response.json();
+  } catch (error) {
+    return null;
+  }
+};
+
+/**
+ * Follow a conversion started with a job_id param through server-sent events
+ * @param {string} jobId - Id passed as params.job_id to convertFiles
+ * @param {Object} handlers - { onProgress(state), onDone(state), onFailed(state) }; state has
+ *   status, done, total, percent, elapsed_seconds, eta_seconds (and download_url or error when finished)
+ * @returns {Function} Call to stop listening
+ */
+export const subscribeToJob = (jobId, { onProgress, onDone, onFailed } = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events`);
+  const handle = (handler, last) => (event) => {
+    if (last) source.close();
+    if (handler) handler(JSON.parse(event.data));
+  };
+  source.addEventListener('progress', handle(onProgress, false));
+  source.addEventListener('done', handle(onDone, true));
+  source.addEventListener('failed', handle(onFailed, true));
+  // The server ends each stream after a while; EventSource reconnects on its own
+  return () => source.close();
+};
+
+/**
+ * Upload a PDF for page previews
+ * @param {File} file - PDF file
+ * @param {Object} options - { width, dpi, format } for the page images (optional)
+ * @returns {Object} { document, page_count, pages: [{ page, url }] }, with absolute urls
+ */
+export const createPreview = async (file, options = {}) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  Object.keys(options).forEach(key => {
+    formData.append(key, options[key]);
+  });
+
+  const response = await fetch(`${API_BASE_URL}/api/render`, {
+    method: 'POST',
+    body: formData,
+  });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || 'Preview failed');
+  }
+
+  data.pages = data.pages.map(page => ({ ...page, url: `${API_BASE_URL}${page.url}` }));
+  return data;
+};
+
 /**
  * Download a converted file
  * @param {string} filename - Name of file to download
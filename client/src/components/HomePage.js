@@ -25,6 +25,7 @@ const HomePage = ({ operations }) => {
       pdf_to_powerpoint: '🎯',
       add_page_numbers: '🔢',
       repair_pdf: '🔧',
+      ocr_pdf: '🔍',
     };
     return icons[id] || '📋';
   };
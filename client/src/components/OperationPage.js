@@ -1,16 +1,26 @@
-import React, { useState } from 'react';
+import React, { useState, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import './OperationPage.css';
 import FileUploadDropzone from './FileUploadDropzone';
 import OperationParamsForm from './OperationParamsForm';
+import PagePreviewGrid from './PagePreviewGrid';
 import Toast from './Toast';
-import { convertFiles, downloadFile } from '../api';
+import { convertFiles, downloadFile, createJobId, getProgress, subscribeToJob } from '../api';
+
+const formatEta = (seconds) => {
+  if (seconds === null || seconds === undefined) return '';
+  if (seconds < 60) return ` (about ${Math.max(1, Math.round(seconds))}s left)`;
+  return ` (about ${Math.round(seconds / 60)} min left)`;
+};
 
 const OperationPage = ({ operation }) => {
   const [selectedFiles, setSelectedFiles] = useState([]);
   const [loading, setLoading] = useState(false);
   const [toasts, setToasts] = useState([]);
   const [operationParams, setOperationParams] = useState({});
+  const [progress, setProgress] = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(null);
+  const unsubscribeJob = useRef(null);
 
   const getAcceptAttribute = (acceptType) => {
     // Map operation accept types to file extensions
@@ -42,10 +52,44 @@ const OperationPage = ({ operation }) => {
       rotate_pdf: '🔄',
       add_watermark: '💧',
       remove_pages: '🗑️',
+      ocr_pdf: '🔍',
     };
     return icons[id] || '📋';
   };
 
+  // Operations whose page parameters can be picked from thumbnails
+  const pagePickerOperations = ['split_pdf', 'remove_pages'];
+
+  const parsePages = (value) =>
+    String(value || '').split(',').map(p => parseInt(p, 10)).filter(p => !Number.isNaN(p));
+
+  const getSelectedPages = () => {
+    if (operation.id === 'remove_pages') return parsePages(operationParams.pages);
+    if ((operationParams.mode || 'range') !== 'range') return [];
+    const start = parseInt(operationParams.start_page, 10);
+    const end = parseInt(operationParams.end_page, 10);
+    if (Number.isNaN(start) || Number.isNaN(end)) return [];
+    return Array.from({ length: Math.max(end - start + 1, 0) }, (_, i) => start + i);
+  };
+
+  const handlePageClick = (page) => {
+    if (operation.id === 'remove_pages') {
+      const pages = parsePages(operationParams.pages);
+      const next = pages.includes(page) ? pages.filter(p => p !== page) : [...pages, page].sort((a, b) => a - b);
+      setOperationParams({ ...operationParams, pages: next.join(',') });
+      return;
+    }
+    if ((operationParams.mode || 'range') !== 'range') return;
+    // Split: the first click picks the start page, the second extends the range
+    const start = parseInt(operationParams.start_page, 10);
+    const end = parseInt(operationParams.end_page, 10);
+    if (Number.isNaN(start) || start !== end || page < start) {
+      setOperationParams({ ...operationParams, start_page: page, end_page: page });
+    } else {
+      setOperationParams({ ...operationParams, end_page: page });
+    }
+  };
+
   const addToast = (message, type = 'info') => {
     const id = Math.random();
     setToasts(prev => [...prev, { id, message, type }]);
@@ -60,11 +104,28 @@ const OperationPage = ({ operation }) => {
       return;
     }
 
+    const jobId = createJobId();
+    if (operation.progress) {
+      const onProgress = (state) => {
+        if (state && state.total) setProgress(state);
+      };
+      if (operation.progress_stream) {
+        // Progress is pushed by the server while the conversion request is in flight
+        unsubscribeJob.current = subscribeToJob(jobId, { onProgress });
+      } else {
+        // Sync server workers can't hold event streams open: poll instead
+        const progressTimer = setInterval(async () => onProgress(await getProgress(jobId)), 1000);
+        unsubscribeJob.current = () => clearInterval(progressTimer);
+      }
+    }
+
     try {
       setLoading(true);
       addToast('Converting your file...', 'info');
 
-      const result = await convertFiles(selectedFiles, operation.id, operationParams);
+      const result = await convertFiles(selectedFiles, operation.id, { ...operationParams, job_id: jobId }, {
+        onUploadProgress: (sent, total) => setUploadProgress(Math.round((100 * sent) / total)),
+      });
 
       if (result.success && result.download_url) {
         addToast('Conversion completed! Downloading...', 'success');
@@ -83,6 +144,10 @@ const OperationPage = ({ operation }) => {
     } catch (error) {
       addToast(`Error: ${error.message}`, 'error');
     } finally {
+      if (unsubscribeJob.current) unsubscribeJob.current();
+      unsubscribeJob.current = null;
+      setProgress(null);
+      setUploadProgress(null);
       setLoading(false);
     }
   };
@@ -130,14 +195,26 @@ const OperationPage = ({ operation }) => {
           </div>
 
           {/* Parameters Form */}
-          {operation.params && operation.params.length > 0 && (
+          {operation.params && Object.keys(operation.params).length > 0 && (
             <OperationParamsForm
-              operationId={operation.id}
-              params={operation.params}
-              onParamsChange={setOperationParams}
+              operation={operation}
+              params={operationParams}
+              onChange={setOperationParams}
             />
           )}
 
+          {/* Page Thumbnails */}
+          {pagePickerOperations.includes(operation.id) && selectedFiles.length > 0 && (
+            <div className="section">
+              <h2>Select Pages</h2>
+              <PagePreviewGrid
+                file={selectedFiles[0]}
+                selectedPages={getSelectedPages()}
+                onPageClick={handlePageClick}
+              />
+            </div>
+          )}
+
           {/* Selected Files Info */}
           {selectedFiles.length > 0 && (
             <div className="files-info">
@@ -156,7 +233,9 @@ const OperationPage = ({ operation }) => {
             {loading ? (
               <>
                 <span className="spinner"></span>
-                Converting...
+                {uploadProgress !== null && uploadProgress < 100
+                  ? `Uploading... ${uploadProgress}%`
+                  : progress ? `Converting... ${Math.round(progress.percent)}%${formatEta(progress.eta_seconds)}` : 'Converting...'}
               </>
             ) : (
               '🚀 Convert'
@@ -16,6 +16,49 @@ const OperationParamsForm = ({ operation, params, onChange }) => {
       <h2>⚙️ Step 3: Configure Options</h2>
       <div className="params-form">
         {operation.id === 'split_pdf' && (
+          <div className="form-group">
+            <label htmlFor="mode">Split Mode:</label>
+            <select
+              id="mode"
+              value={params.mode || 'range'}
+              onChange={(e) => handleChange('mode', e.target.value)}
+            >
+              <option value="range">Extract one page range</option>
+              <option value="ranges">Several ranges (ZIP)</option>
+              <option value="every">Every N pages (ZIP)</option>
+              <option value="bookmarks">One file per bookmark (ZIP)</option>
+            </select>
+          </div>
+        )}
+
+        {operation.id === 'split_pdf' && params.mode === 'ranges' && (
+          <div className="form-group">
+            <label htmlFor="ranges">Page Ranges:</label>
+            <input
+              id="ranges"
+              type="text"
+              value={params.ranges || ''}
+              onChange={(e) => handleChange('ranges', e.target.value)}
+              placeholder="e.g., 1-3,4-10,11"
+            />
+          </div>
+        )}
+
+        {operation.id === 'split_pdf' && params.mode === 'every' && (
+          <div className="form-group">
+            <label htmlFor="every">Pages per File:</label>
+            <input
+              id="every"
+              type="number"
+              min="1"
+              value={params.every || ''}
+              onChange={(e) => handleChange('every', e.target.value)}
+              placeholder="e.g., 4"
+            />
+          </div>
+        )}
+
+        {operation.id === 'split_pdf' && (params.mode || 'range') === 'range' && (
           <>
             <div className="form-group">
               <label htmlFor="start_page">Start Page:</label>
@@ -72,6 +115,170 @@ const OperationParamsForm = ({ operation, params, onChange }) => {
           </div>
         )}
 
+        {operation.id === 'add_watermark' && (
+          <>
+            <div className="form-group">
+              <label htmlFor="watermark_image">Watermark Image (optional):</label>
+              <input
+                id="watermark_image"
+                type="file"
+                accept=".png,.jpg,.jpeg,.bmp,.gif,.tiff,.tif,.webp"
+                onChange={(e) => handleChange('watermark_image', e.target.files[0] || '')}
+              />
+              <small>Replaces the text when selected</small>
+            </div>
+            <div className="form-group">
+              <label htmlFor="opacity">Opacity:</label>
+              <input
+                id="opacity"
+                type="number"
+                min="0"
+                max="1"
+                step="0.1"
+                value={params.opacity ?? 1}
+                onChange={(e) => handleChange('opacity', e.target.value)}
+              />
+            </div>
+            <div className="form-group">
+              <label htmlFor="watermark_rotation">Rotation (degrees):</label>
+              <input
+                id="watermark_rotation"
+                type="number"
+                min="-180"
+                max="180"
+                value={params.rotation ?? 0}
+                onChange={(e) => handleChange('rotation', e.target.value)}
+              />
+            </div>
+          </>
+        )}
+
+        {operation.id === 'pdf_to_powerpoint' && (
+          <>
+            <div className="form-group">
+              <label htmlFor="image_format">Slide Images:</label>
+              <select
+                id="image_format"
+                value={params.image_format || 'auto'}
+                onChange={(e) => handleChange('image_format', e.target.value)}
+              >
+                <option value="auto">Auto (JPEG for photo pages)</option>
+                <option value="png">PNG (sharpest)</option>
+                <option value="jpeg">JPEG (smallest)</option>
+              </select>
+            </div>
+            <div className="form-group">
+              <label htmlFor="mode">Text:</label>
+              <select
+                id="mode"
+                value={params.mode || 'image'}
+                onChange={(e) => handleChange('mode', e.target.value)}
+              >
+                <option value="image">Keep as picture</option>
+                <option value="text">Editable text boxes</option>
+              </select>
+            </div>
+            <div className="form-group">
+              <label htmlFor="dpi">Resolution (DPI):</label>
+              <input
+                id="dpi"
+                type="number"
+                min="36"
+                max="600"
+                value={params.dpi || 144}
+                onChange={(e) => handleChange('dpi', e.target.value)}
+                placeholder="144"
+              />
+            </div>
+          </>
+        )}
+
+        {operation.id === 'extract_images' && (
+          <>
+            <div className="form-group">
+              <label htmlFor="image_format">Image Format:</label>
+              <select
+                id="image_format"
+                value={params.image_format || 'original'}
+                onChange={(e) => handleChange('image_format', e.target.value)}
+              >
+                <option value="original">Original (as stored in the PDF)</option>
+                <option value="png">PNG</option>
+                <option value="jpeg">JPEG</option>
+              </select>
+            </div>
+            <div className="form-group">
+              <label htmlFor="min_size">Minimum Size (pixels):</label>
+              <input
+                id="min_size"
+                type="number"
+                min="0"
+                value={params.min_size || 0}
+                onChange={(e) => handleChange('min_size', e.target.value)}
+                placeholder="0"
+              />
+              <small>Skip icons and spacers smaller than this on either side</small>
+            </div>
+          </>
+        )}
+
+        {operation.id === 'pdf_to_text' && (
+          <div className="form-group">
+            <label htmlFor="format">Output Format:</label>
+            <select
+              id="format"
+              value={params.format || 'txt'}
+              onChange={(e) => handleChange('format', e.target.value)}
+            >
+              <option value="txt">Plain text (.txt)</option>
+              <option value="json">JSON, lines per page (.json)</option>
+            </select>
+          </div>
+        )}
+
+        {['pdf_to_text', 'pdf_to_word'].includes(operation.id) && (
+          <div className="form-group">
+            <label htmlFor="ocr">OCR (scanned documents):</label>
+            <select
+              id="ocr"
+              value={params.ocr || 'off'}
+              onChange={(e) => handleChange('ocr', e.target.value)}
+            >
+              <option value="off">Off</option>
+              <option value="auto">Pages without text</option>
+              <option value="force">Every page</option>
+            </select>
+          </div>
+        )}
+
+        {operation.id === 'ocr_pdf' && (
+          <div className="form-group">
+            <label htmlFor="mode">Pages:</label>
+            <select
+              id="mode"
+              value={params.mode || 'auto'}
+              onChange={(e) => handleChange('mode', e.target.value)}
+            >
+              <option value="auto">Pages without text</option>
+              <option value="force">Every page</option>
+            </select>
+          </div>
+        )}
+
+        {(operation.id === 'ocr_pdf' || ['auto', 'force'].includes(params.ocr)) && (
+          <div className="form-group">
+            <label htmlFor="language">OCR Language:</label>
+            <input
+              id="language"
+              type="text"
+              value={params.language || 'eng'}
+              onChange={(e) => handleChange('language', e.target.value)}
+              placeholder="eng"
+            />
+            <small>Tesseract language codes, e.g. eng+deu</small>
+          </div>
+        )}
+
         {operation.id === 'remove_pages' && (
           <div className="form-group">
             <label htmlFor="pages">Pages to Remove (comma-separated):</label>
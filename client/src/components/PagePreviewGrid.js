@@ -0,0 +1,42 @@
+import React, { useEffect, useState } from 'react';
+import './PagePreviewGrid.css';
+import { createPreview } from '../api';
+
+/**
+ * Thumbnails of a PDF's pages; clicking one calls onPageClick(pageNumber)
+ */
+const PagePreviewGrid = ({ file, selectedPages = [], onPageClick }) => {
+  const [preview, setPreview] = useState(null);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    setPreview(null);
+    setError(null);
+    createPreview(file, { width: 120 })
+      .then(data => { if (!cancelled) setPreview(data); })
+      .catch(err => { if (!cancelled) setError(err.message); });
+    return () => { cancelled = true; };
+  }, [file]);
+
+  if (error) return <p className="preview-status">Page previews unavailable: {error}</p>;
+  if (!preview) return <p className="preview-status">Loading page previews...</p>;
+
+  return (
+    <div className="preview-grid">
+      {preview.pages.map(({ page, url }) => (
+        <button
+          key={page}
+          type="button"
+          className={`preview-page ${selectedPages.includes(page) ? 'selected' : ''}`}
+          onClick={() => onPageClick(page)}
+        >
+          <img src={url} alt={`Page ${page}`} loading="lazy" />
+          <span>{page}</span>
+        </button>
+      ))}
+    </div>
+  );
+};
+
+export default PagePreviewGrid;